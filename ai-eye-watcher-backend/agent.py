@@ -5,15 +5,33 @@ Collects system telemetry and executes commands from the Central Server.
 """
 
 import os
+import sys
+import socket
 import signal
+import struct
 import time
 import datetime
+import gzip
+import json
+import queue
+import random
 import logging
+import logging.handlers
+import threading
+from collections import deque, OrderedDict, Counter
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
 
 import psutil
 import requests
-import schedule
+
+import telemetry_codec
+
+try:
+    import zstandard
+except ImportError:  # Optional: gzip is used when zstandard isn't installed
+    zstandard = None
 
 # Configuration
 CENTRAL_SERVER_URL = "http://localhost:9000"
@@ -21,48 +39,325 @@ AGENT_HOSTNAME = os.uname().nodename
 COLLECTION_INTERVAL = 15  # seconds
 COMMAND_POLL_INTERVAL = 60  # seconds
 
+# CPU the agent may spend collecting processes, as a fraction of one core
+# over COLLECTION_INTERVAL (0.02 = 0.3s of CPU per 15s cycle). Processes
+# left over when a cycle runs out are refreshed in the next one.
+COLLECTION_CPU_BUDGET = 0.02
+
+# Event-driven capture: a watcher thread reports process starts and exits
+# as they happen (the Linux proc connector when running as root, otherwise
+# a fast PID-list diff), so short-lived processes are seen between
+# collection cycles. Full scans then back off while no processes start or
+# exit, up to COLLECTION_MAX_INTERVAL.
+EVENT_CAPTURE = True
+EVENT_SCAN_INTERVAL = 0.5  # seconds between PID-list diffs (up to 8x longer while quiet)
+EVENT_SEND_DELAY = 2  # seconds to gather process events before sending them
+EVENT_MAX_PENDING = 1000  # oldest unsent events are dropped beyond this
+COLLECTION_MAX_INTERVAL = 120  # seconds
+
+# Long-poll command channel: the server holds each request until a command
+# is queued, so commands arrive immediately. COMMAND_POLL_INTERVAL is only
+# used when COMMAND_LONG_POLL is False.
+COMMAND_LONG_POLL = True
+COMMAND_LONG_POLL_WAIT = 30  # seconds the server may hold a request
+COMMAND_RETRY_MAX_DELAY = 60  # seconds, cap for reconnect backoff
+
+# Commands run on a small thread pool, so a slow one doesn't hold up the
+# others or the command channel, and each result is reported to the
+# server. A process that ignores SIGTERM for KILL_GRACE_PERIOD gets SIGKILL.
+COMMAND_WORKERS = 4
+KILL_GRACE_PERIOD = 2  # seconds
+
+# Collection, upload, the command channel and command execution each run
+# on their own threads, joined by bounded queues, so a slow upload never
+# holds up a scan or a command, and vice versa. Agents started together
+# (say, after a fleet-wide restart) spread their first scan over
+# COLLECTION_SPLAY, and every interval varies by up to COLLECTION_JITTER,
+# so a fleet's uploads don't all land on the same boundary. On SIGTERM or
+# Ctrl+C the agent uploads what it has collected and lets running commands
+# finish, for up to SHUTDOWN_TIMEOUT.
+UPLOAD_QUEUE_SIZE = 16  # snapshots awaiting the uploader; the oldest is dropped beyond this
+COMMAND_QUEUE_SIZE = 64  # commands queued or running; the command channel waits beyond this
+COLLECTION_SPLAY = COLLECTION_INTERVAL  # seconds
+COLLECTION_JITTER = 0.1  # fraction of the interval
+SHUTDOWN_TIMEOUT = 10  # seconds
+
+# Delta telemetry: send only what changed since the last acknowledged
+# snapshot, with a full resync every FULL_RESYNC_EVERY cycles
+DELTA_TELEMETRY = True
+FULL_RESYNC_EVERY = 20  # cycles (5 minutes at a 15s interval)
+DELTA_METRIC_TOLERANCE = 0.5  # percentage points of cpu/memory before a change is sent
+
+# Spooled, batched uploads: snapshots are appended to an on-disk spool and
+# sent several at a time in one compressed request. Set SPOOL_ENABLED to
+# False to send every snapshot immediately.
+SPOOL_ENABLED = True
+SPOOL_DIR = "agent_spool"
+SPOOL_MAX_BYTES = 64 * 1024 * 1024  # oldest segments are evicted beyond this
+SPOOL_SEGMENT_BYTES = 4 * 1024 * 1024
+UPLOAD_BATCH_SIZE = 4  # snapshots per upload in steady state
+UPLOAD_MAX_BATCH = 20  # snapshots per upload when draining a backlog
+
+# Compact wire format: process and connection lists are sent as columns
+# with a shared string table (see telemetry_codec), packed with msgpack
+# when it is installed. If the server doesn't accept it, the agent falls
+# back to plain JSON for the rest of the run.
+COLUMNAR_TELEMETRY = True
+
+# Logging: agent.log rotates at LOG_MAX_BYTES, keeping LOG_BACKUP_COUNT old
+# files, and records beyond LOG_RATE_LIMIT per second (after a burst of
+# LOG_RATE_BURST) are dropped, so a failing server can't fill the disk.
+# The next record logged notes how many were dropped.
+LOG_FILE = "agent.log"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+LOG_RATE_LIMIT = 2  # records per second
+LOG_RATE_BURST = 20
+
+# Sampling profiler, off by default. When enabled, sending PROFILE_SIGNAL to
+# the agent (kill -USR1 <pid>) samples every thread's stack each
+# PROFILE_SAMPLE_INTERVAL for PROFILE_DURATION seconds, then writes the
+# sample counts as folded stacks (input for flamegraph.pl or speedscope)
+# to PROFILE_DIR.
+PROFILER_ENABLED = False
+PROFILE_SIGNAL = signal.SIGUSR1
+PROFILE_DURATION = 30  # seconds
+PROFILE_SAMPLE_INTERVAL = 0.01  # seconds
+PROFILE_DIR = "."
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket over log records, shared by the agent's handlers: a record
+    is passed or dropped once, however many handlers it reaches.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.suppressed = 0  # Records dropped since the agent started
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._dropped = 0  # ...since the last record passed
+        self._last: Optional[tuple] = None  # (record, verdict) for the other handlers
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        with self._lock:
+            if self._last is not None and self._last[0] is record:
+                return self._last[1]
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            passed = self._tokens >= 1
+            if passed:
+                self._tokens -= 1
+                dropped, self._dropped = self._dropped, 0
+            else:
+                self.suppressed += 1
+                self._dropped += 1
+                dropped = 0
+            self._last = (record, passed)
+        if dropped:
+            record.msg = f"{record.getMessage()} ({dropped} earlier log record(s) dropped by the rate limit)"
+            record.args = None
+        return passed
+
+
+log_rate_limit = RateLimitFilter(LOG_RATE_LIMIT, LOG_RATE_BURST)
+log_handlers = [
+    logging.StreamHandler(),
+    logging.handlers.RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+]
+for log_handler in log_handlers:
+    log_handler.addFilter(log_rate_limit)
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler('agent.log')
-    ]
+    handlers=log_handlers
 )
 logger = logging.getLogger(__name__)
 
+# Pooled HTTP session so uploads and polls reuse connections
+http_session = requests.Session()
+http_session.mount("http://", requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4))
+http_session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4))
+http_session.headers["X-Agent-Host"] = AGENT_HOSTNAME
+
+# Server that handles this host. A clustered Central Server redirects each
+# host to the worker that owns it; the agent then talks to that worker
+# directly, and goes back to CENTRAL_SERVER_URL if it becomes unreachable.
+server_url = CENTRAL_SERVER_URL
+
+
+def follow_owner(response: requests.Response):
+    """Remember the worker a redirected request ended up at."""
+    global server_url
+    if response.history:
+        final = urlparse(response.url)
+        server_url = f"{final.scheme}://{final.netloc}"
+        logger.info(f"Central Server redirected this host to {server_url}")
+
+
+def reset_server_url():
+    """Send the next request to CENTRAL_SERVER_URL, which redirects to the current owner."""
+    global server_url
+    server_url = CENTRAL_SERVER_URL
+
+
+class CachedProcess:
+    """A live process: its persistent psutil handle and the fields that never change."""
+    __slots__ = ("handle", "info", "cpu_percent", "memory_percent")
+
+    def __init__(self, handle: psutil.Process, info: Dict[str, Any]):
+        self.handle = handle
+        self.info = info  # pid, create_time, ppid, name, command_line, user
+        self.cpu_percent = 0.0
+        self.memory_percent = 0.0
+
+
+class ProcessCollector:
+    """
+    Collects the process list with a persistent cache of psutil handles.
+    
+    Reusing a handle across cycles lets cpu_percent() measure the CPU used
+    since the previous cycle, and static fields are read only once per
+    process. Each cycle first inspects processes it hasn't seen, then
+    refreshes the metrics of known ones, round-robin, until the cycle has
+    used its CPU budget; processes it didn't get to keep their previous
+    metrics (or, if new, are picked up next cycle).
+    """
+
+    def __init__(self, cpu_budget_seconds: float):
+        self.cpu_budget_seconds = cpu_budget_seconds
+        self._cache: Dict[int, CachedProcess] = {}  # pid -> process
+        self._refresh_offset = 0
+        self._total_memory = psutil.virtual_memory().total
+        self.last_cycle: Dict[str, Any] = {}
+
+    def _inspect(self, pid: int) -> Optional[CachedProcess]:
+        handle = psutil.Process(pid)
+        with handle.oneshot():
+            cmdline = handle.cmdline()
+            cached = CachedProcess(handle, {
+                "pid": pid,
+                "create_time": handle.create_time(),
+                "ppid": handle.ppid(),
+                "name": handle.name() or "unknown",
+                "command_line": ' '.join(cmdline) if cmdline else None,
+                "user": handle.username()
+            })
+            handle.cpu_percent()  # First sample; the next cycle reports the real value
+            cached.memory_percent = round(handle.memory_info().rss * 100 / self._total_memory, 2)
+        return cached
+
+    def _refresh(self, cached: CachedProcess) -> bool:
+        """Update a known process's metrics; False if it exited or its PID was reused."""
+        handle = cached.handle
+        with handle.oneshot():
+            cached.cpu_percent = round(handle.cpu_percent(), 2)
+            cached.memory_percent = round(handle.memory_info().rss * 100 / self._total_memory, 2)
+        return handle.is_running()
+
+    def collect(self) -> List[Dict[str, Any]]:
+        started = time.thread_time()
+        deadline = started + self.cpu_budget_seconds
+        pids = psutil.pids()
+        alive = set(pids)
+        for pid in [pid for pid in self._cache if pid not in alive]:
+            del self._cache[pid]
+        
+        # Unseen processes first, so new activity is reported as soon as possible
+        new_pids = [pid for pid in pids if pid not in self._cache]
+        known_pids = list(self._cache)
+        inspected = deferred = 0
+        for number, pid in enumerate(new_pids):
+            if time.thread_time() > deadline:
+                deferred = len(new_pids) - number
+                break
+            try:
+                self._cache[pid] = self._inspect(pid)
+                inspected += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                # Process disappeared or access denied, skip it
+                continue
+        
+        refreshed = 0
+        for number in range(len(known_pids)):
+            if time.thread_time() > deadline:
+                break
+            pid = known_pids[(self._refresh_offset + number) % len(known_pids)]
+            refreshed += 1
+            try:
+                if self._refresh(self._cache[pid]):
+                    continue
+            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                pass
+            # Gone, or the PID now belongs to a new process that is inspected next cycle
+            del self._cache[pid]
+        if known_pids:
+            self._refresh_offset = (self._refresh_offset + refreshed) % len(known_pids)
+        
+        self.last_cycle = {
+            "processes": len(self._cache),
+            "inspected": inspected,
+            "refreshed": refreshed,
+            "deferred": deferred,
+            "stale": len(known_pids) - refreshed,
+            "cpu_seconds": round(time.thread_time() - started, 4)
+        }
+        # Fresh dicts every cycle: the delta encoder keeps the previous snapshot
+        return [dict(cached.info, cpu_percent=cached.cpu_percent, memory_percent=cached.memory_percent)
+                for cached in self._cache.values()]
+
+
+process_collector: Optional[ProcessCollector] = None
+static_system_info: Optional[Dict[str, Any]] = None
+agent_process = psutil.Process()
+
+# How long each phase of the agent's work took, in milliseconds: the scans
+# for the snapshot being built, and serializing and uploading the last
+# request sent. Reported to the server with each snapshot (agent_health).
+phase_timings: Dict[str, float] = {}
+
+
+def record_phase(phase: str, started: float):
+    phase_timings[f"{phase}_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+
+def agent_health() -> Dict[str, Any]:
+    """The agent's own cost and backlog, sent as a snapshot's agent_health."""
+    cycle = process_collector.last_cycle if process_collector else {}
+    return dict(
+        phase_timings,
+        collection_cpu_seconds=cycle.get("cpu_seconds"),
+        processes_deferred=cycle.get("deferred"),
+        spool_pending=telemetry_spool.pending() if telemetry_spool else 0,
+        log_records_dropped=log_rate_limit.suppressed,
+        rss_bytes=agent_process.memory_info().rss
+    )
+
 
 def collect_system_data() -> Dict[str, Any]:
     """
     Collect process and network connection data using psutil.
     Returns data in the format expected by the Central Server.
     """
+    global process_collector, static_system_info
     try:
         # Collect process information
-        processes = []
-        for proc in psutil.process_iter(['pid', 'ppid', 'name', 'username', 'cmdline']):
-            try:
-                proc_info = proc.info
-                # Get additional metrics
-                cpu_percent = proc.cpu_percent()
-                memory_percent = proc.memory_percent()
-                
-                process_data = {
-                    "pid": proc_info['pid'],
-                    "name": proc_info['name'] or "unknown",
-                    "command_line": ' '.join(proc_info['cmdline']) if proc_info['cmdline'] else None,
-                    "user": proc_info['username'],
-                    "cpu_percent": cpu_percent,
-                    "memory_percent": memory_percent
-                }
-                processes.append(process_data)
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                # Process disappeared or access denied, skip it
-                continue
+        if process_collector is None:
+            process_collector = ProcessCollector(COLLECTION_CPU_BUDGET * COLLECTION_INTERVAL)
+        started = time.perf_counter()
+        processes = process_collector.collect()
+        record_phase("process_scan", started)
         
         # Collect network connections (only ESTABLISHED ones)
         connections = []
+        started = time.perf_counter()
         try:
             for conn in psutil.net_connections(kind='inet'):
                 if conn.status == psutil.CONN_ESTABLISHED:
@@ -77,22 +372,25 @@ def collect_system_data() -> Dict[str, Any]:
                     connections.append(connection_data)
         except psutil.AccessDenied:
             logger.warning("Access denied when collecting network connections")
+        record_phase("connection_scan", started)
         
-        # Collect basic system info
-        system_info = {
-            "cpu_count": psutil.cpu_count(),
-            "memory_total": psutil.virtual_memory().total,
-            "memory_available": psutil.virtual_memory().available,
-            "boot_time": psutil.boot_time(),
-            "platform": os.uname().sysname
-        }
+        # Collect basic system info; only available memory changes between cycles
+        if static_system_info is None:
+            static_system_info = {
+                "cpu_count": psutil.cpu_count(),
+                "memory_total": psutil.virtual_memory().total,
+                "boot_time": psutil.boot_time(),
+                "platform": os.uname().sysname
+            }
+        system_info = dict(static_system_info, memory_available=psutil.virtual_memory().available)
         
         return {
             "hostname": AGENT_HOSTNAME,
             "timestamp": datetime.datetime.now().isoformat(),
             "processes": processes,
             "connections": connections,
-            "system_info": system_info
+            "system_info": system_info,
+            "agent_health": agent_health()
         }
     
     except Exception as e:
@@ -102,41 +400,740 @@ def collect_system_data() -> Dict[str, Any]:
             "timestamp": datetime.datetime.now().isoformat(),
             "processes": [],
             "connections": [],
-            "system_info": {}
+            "system_info": {},
+            "agent_health": agent_health()
         }
 
 
-def collect_and_send():
+class ProcessWatcher:
     """
-    Collect system telemetry and send it to the Central Server.
+    Reports process exec and exit events as they happen.
+    
+    On Linux with root privileges it subscribes to the kernel proc
+    connector over netlink. Elsewhere, or if the subscription fails, it
+    diffs the PID list every EVENT_SCAN_INTERVAL, backing off while nothing
+    changes. Processes are described (name, command line, user) the moment
+    they are seen, so the details survive a process that exits immediately.
+    Exits are only reported for processes the watcher saw start; the rest
+    are covered by the next full scan.
     """
+
+    NETLINK_CONNECTOR = 11
+    CN_IDX_PROC = 1
+    CN_VAL_PROC = 1
+    PROC_CN_MCAST_LISTEN = 1
+    PROC_EVENT_EXEC = 0x00000002
+    PROC_EVENT_EXIT = 0x80000000
+    NLMSG_HEADER = struct.Struct("=IHHII")   # len, type, flags, seq, pid
+    CN_MSG_HEADER = struct.Struct("=IIIIHH")  # idx, val, seq, ack, len, flags
+    PROC_EVENT_HEADER = struct.Struct("=IIQ")  # what, cpu, timestamp_ns
+    NLMSG_DONE = 3
+
+    def __init__(self, max_pending: int = EVENT_MAX_PENDING):
+        self.mode: Optional[str] = None  # "netlink" or "polling" once started
+        self.event_count = 0  # Total events seen, so callers can tell whether anything changed
+        self.dropped = 0
+        self._started: Dict[int, Dict[str, Any]] = {}  # pid -> description, for processes seen starting
+        self._pending = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+
+    def start(self, stop_event: threading.Event) -> threading.Thread:
+        sock = self._open_netlink()
+        self.mode = "netlink" if sock is not None else "polling"
+        target = (lambda: self._run_netlink(sock, stop_event)) if sock else (lambda: self._run_polling(stop_event))
+        thread = threading.Thread(target=target, name="process-watcher", daemon=True)
+        thread.start()
+        logger.info(f"Process event capture: {self.mode}")
+        return thread
+
+    def oldest_pending(self) -> Optional[float]:
+        """Time the oldest unsent event was captured, or None."""
+        with self._lock:
+            return self._pending[0]["timestamp"] if self._pending else None
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Take all unsent events, oldest first."""
+        with self._lock:
+            events = list(self._pending)
+            self._pending.clear()
+        return events
+
+    def _emit(self, event: str, description: Dict[str, Any]):
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(dict(description, event=event, timestamp=time.time()))
+            self.event_count += 1
+
+    @staticmethod
+    def _describe(pid: int) -> Optional[Dict[str, Any]]:
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                cmdline = proc.cmdline()
+                return {
+                    "pid": pid,
+                    "create_time": proc.create_time(),
+                    "ppid": proc.ppid(),
+                    "name": proc.name() or "unknown",
+                    "command_line": ' '.join(cmdline) if cmdline else None,
+                    "user": proc.username()
+                }
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+    def _process_started(self, pid: int):
+        # Called again on every exec, so a process that replaces its image is reported each time
+        description = self._describe(pid)
+        if description is not None:
+            self._started[pid] = description
+            self._emit("exec", description)
+
+    def _process_exited(self, pid: int):
+        description = self._started.pop(pid, None)
+        if description is not None:
+            self._emit("exit", description)
+
+    def _open_netlink(self) -> Optional[socket.socket]:
+        if not sys.platform.startswith("linux") or os.geteuid() != 0:
+            return None
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, self.NETLINK_CONNECTOR)
+            sock.bind((0, self.CN_IDX_PROC))
+            op = struct.pack("=I", self.PROC_CN_MCAST_LISTEN)
+            message = self.CN_MSG_HEADER.pack(self.CN_IDX_PROC, self.CN_VAL_PROC, 0, 0, len(op), 0) + op
+            sock.send(self.NLMSG_HEADER.pack(self.NLMSG_HEADER.size + len(message), self.NLMSG_DONE,
+                                             0, 0, os.getpid()) + message)
+            sock.settimeout(1.0)
+            return sock
+        except OSError as e:
+            logger.warning(f"Proc connector unavailable ({e}), falling back to PID-list polling")
+            return None
+
+    def _run_netlink(self, sock: socket.socket, stop_event: threading.Event):
+        event_start = self.NLMSG_HEADER.size + self.CN_MSG_HEADER.size
+        with sock:
+            while not stop_event.is_set():
+                try:
+                    data = sock.recv(65536)
+                except socket.timeout:
+                    continue
+                except OSError as e:
+                    logger.error(f"Proc connector failed ({e}), falling back to PID-list polling")
+                    self.mode = "polling"
+                    self._run_polling(stop_event)
+                    return
+                offset = 0
+                while offset + event_start + self.PROC_EVENT_HEADER.size + 8 <= len(data):
+                    length = self.NLMSG_HEADER.unpack_from(data, offset)[0]
+                    what = self.PROC_EVENT_HEADER.unpack_from(data, offset + event_start)[0]
+                    pid, tgid = struct.unpack_from("=II", data, offset + event_start + self.PROC_EVENT_HEADER.size)
+                    if pid == tgid:  # Thread group leaders only; threads aren't processes
+                        if what == self.PROC_EVENT_EXEC:
+                            self._process_started(pid)
+                        elif what == self.PROC_EVENT_EXIT:
+                            self._process_exited(pid)
+                    if length <= 0:
+                        break
+                    offset += (length + 3) & ~3  # NLMSG_ALIGN
+
+    def _run_polling(self, stop_event: threading.Event):
+        interval = EVENT_SCAN_INTERVAL
+        previous = set(psutil.pids())
+        while not stop_event.wait(interval):
+            current = set(psutil.pids())
+            started, exited = current - previous, previous - current
+            for pid in sorted(started):
+                self._process_started(pid)
+            for pid in exited:
+                self._process_exited(pid)
+            previous = current
+            # Scan less while nothing is starting or exiting
+            interval = EVENT_SCAN_INTERVAL if started or exited else min(interval * 2, EVENT_SCAN_INTERVAL * 8)
+
+
+def process_key(proc: Dict[str, Any]) -> tuple:
+    """Identify a process across cycles; create_time guards against PID reuse."""
+    return (proc["pid"], proc.get("create_time"))
+
+
+def connection_key(conn: Dict[str, Any]) -> tuple:
+    return (conn["local_address"], conn["local_port"], conn["remote_address"],
+            conn["remote_port"], conn["status"], conn["pid"])
+
+
+class TelemetryDeltaEncoder:
+    """
+    Encodes snapshots as deltas against the last snapshot the Central Server
+    acknowledged. The acknowledged state only advances on commit(), so a
+    failed upload never leaves the agent and server out of step.
+    """
+
+    STATIC_FIELDS = ("name", "command_line", "user", "ppid")
+    METRIC_FIELDS = ("cpu_percent", "memory_percent")
+
+    def __init__(self, full_resync_every: int = FULL_RESYNC_EVERY):
+        self.full_resync_every = full_resync_every
+        self.sequence = 0
+        self._processes: Optional[Dict[tuple, Dict[str, Any]]] = None
+        self._connections: Optional[Dict[tuple, Dict[str, Any]]] = None
+        self._deltas_since_full = 0
+        self._pending = None
+
+    def reset(self):
+        """Forget the acknowledged state; the next encode() is a full snapshot."""
+        self._processes = None
+        self._connections = None
+        self._pending = None
+
+    def _process_changes(self, old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+        changes = {}
+        for field in self.STATIC_FIELDS:
+            if new.get(field) != old.get(field):
+                changes[field] = new.get(field)
+        for field in self.METRIC_FIELDS:
+            old_value, new_value = old.get(field), new.get(field)
+            if old_value is None or new_value is None:
+                if old_value != new_value:
+                    changes[field] = new_value
+            elif abs(new_value - old_value) >= DELTA_METRIC_TOLERANCE:
+                changes[field] = new_value
+        return changes
+
+    def encode(self, data: Dict[str, Any]) -> tuple:
+        """
+        Encode a snapshot from collect_system_data().
+        
+        Returns:
+            tuple: (endpoint path, request body)
+        """
+        sequence = self.sequence + 1
+        processes = {process_key(p): p for p in data["processes"]}
+        connections = {connection_key(c): c for c in data["connections"]}
+        
+        if self._processes is None or self._deltas_since_full >= self.full_resync_every:
+            self._pending = (sequence, processes, connections, True)
+            return "/api/v1/collect", dict(data, sequence=sequence)
+        
+        # Metric changes below the tolerance are not sent, so the acknowledged
+        # state keeps the old values and drift never exceeds the tolerance.
+        acked_processes = {}
+        added, changed = [], []
+        for key, proc in processes.items():
+            old = self._processes.get(key)
+            if old is None:
+                added.append(proc)
+                acked_processes[key] = proc
+                continue
+            changes = self._process_changes(old, proc)
+            if changes:
+                changed.append(dict(changes, pid=proc["pid"], create_time=proc.get("create_time")))
+                acked_processes[key] = dict(old, **changes)
+            else:
+                acked_processes[key] = old
+        removed = [{"pid": key[0], "create_time": key[1]}
+                   for key in self._processes if key not in processes]
+        
+        body = {
+            "hostname": data["hostname"],
+            "timestamp": data["timestamp"],
+            "base_sequence": self.sequence,
+            "sequence": sequence,
+            "processes_added": added,
+            "processes_removed": removed,
+            "processes_changed": changed,
+            "connections_added": [c for k, c in connections.items() if k not in self._connections],
+            "connections_removed": [c for k, c in self._connections.items() if k not in connections],
+            "system_info": data["system_info"]
+        }
+        if data.get("process_events"):
+            body["process_events"] = data["process_events"]
+        if data.get("agent_health"):
+            body["agent_health"] = data["agent_health"]
+        self._pending = (sequence, acked_processes, connections, False)
+        return "/api/v1/collect/delta", body
+
+    def commit(self):
+        """Mark the last encoded snapshot as acknowledged by the server."""
+        if self._pending is None:
+            return
+        self.sequence, self._processes, self._connections, full = self._pending
+        self._deltas_since_full = 0 if full else self._deltas_since_full + 1
+        self._pending = None
+
+
+delta_encoder = TelemetryDeltaEncoder()
+
+
+columnar_accepted: Optional[bool] = None  # None until the server has answered a columnar upload
+zstd_accepted: Optional[bool] = None  # False once the server has refused a zstd-encoded body
+
+
+def telemetry_content_type() -> str:
+    """Content-Type to send telemetry with."""
+    if COLUMNAR_TELEMETRY and columnar_accepted is not False:
+        return telemetry_codec.preferred_content_type()
+    return "application/json"
+
+
+def encode_telemetry(path: str, body: Dict[str, Any], content_type: str) -> bytes:
+    """Serialize a collect, delta or batch body for the given Content-Type."""
+    if content_type not in telemetry_codec.COLUMNAR_TYPES:
+        return json.dumps(body, separators=(",", ":")).encode()
+    if path.endswith("/batch"):
+        document = {"items": [dict(item, payload=telemetry_codec.encode(item["payload"])) for item in body["items"]]}
+    else:
+        document = telemetry_codec.encode(body)
+    return telemetry_codec.dumps(document, content_type)
+
+
+def refuses_media_type(response: requests.Response) -> bool:
+    """
+    Whether an error response means the server can't read the body's
+    Content-Type at all: a 415, or the 422 of a server that predates the
+    columnar format, whose only complaint is that the body as a whole isn't
+    an object. A 422 about the payload's fields is an invalid payload.
+    """
+    if response.status_code == 415:
+        return True
+    if response.status_code != 422 or columnar_accepted:
+        return False
     try:
-        logger.info("Collecting system telemetry...")
-        data = collect_system_data()
+        errors = response.json().get("detail")
+    except ValueError:
+        return False
+    return (isinstance(errors, list) and bool(errors)
+            and all(isinstance(error, dict) and error.get("loc") == ["body"] for error in errors))
+
+
+def post_telemetry(path: str, body: Dict[str, Any], compress: bool = False) -> tuple:
+    """
+    POST a telemetry body in the preferred wire format.
+    
+    A columnar body the server can't read (see refuses_media_type) is
+    resent as JSON, and JSON is used from then on. A 415 for the Content-Encoding
+    (one without the Accept-Post header a Content-Type refusal carries) is
+    resent with gzip, which is used from then on.
+    
+    Returns:
+        tuple: (response, uncompressed body size, Content-Encoding or None)
+    """
+    global columnar_accepted, zstd_accepted
+    while True:
+        content_type = telemetry_content_type()
+        started = time.perf_counter()
+        raw = encode_telemetry(path, body, content_type)
+        headers = {"Content-Type": content_type}
+        data, encoding = raw, None
+        if compress:
+            data, encoding = compress_body(raw)
+            headers["Content-Encoding"] = encoding
+        record_phase("serialize", started)
+        started = time.perf_counter()
+        try:
+            response = http_session.post(f"{server_url}{path}", data=data, headers=headers, timeout=10)
+        except requests.exceptions.ConnectionError:
+            reset_server_url()
+            raise
+        finally:
+            record_phase("upload", started)
+        follow_owner(response)
+        if response.status_code == 415 and encoding is not None and "Accept-Post" not in response.headers:
+            if encoding != "gzip" and "gzip" in response.headers.get("Accept-Encoding", "gzip"):
+                logger.warning(f"Server refused {encoding} telemetry; using gzip")
+                zstd_accepted = False
+                continue
+            return response, len(raw), encoding
+        if content_type == "application/json":
+            return response, len(raw), encoding
+        if refuses_media_type(response):
+            logger.warning(f"Server refused {content_type} telemetry ({response.status_code}); using JSON")
+            columnar_accepted = False
+            continue
+        if response.ok:
+            columnar_accepted = True
+        return response, len(raw), encoding
+
+
+def send_telemetry(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Send a snapshot to the Central Server, as a delta when possible.
+    A 409 from the delta endpoint means the server lost our baseline,
+    so the snapshot is resent in full.
+    """
+    if not DELTA_TELEMETRY:
+        response, _, _ = post_telemetry("/api/v1/collect", data)
+        response.raise_for_status()
+        return response.json()
+    
+    path, body = delta_encoder.encode(data)
+    try:
+        response, _, _ = post_telemetry(path, body)
+        if response.status_code == 409:
+            logger.info("Server requested a full telemetry resync")
+            delta_encoder.reset()
+            path, body = delta_encoder.encode(data)
+            response, _, _ = post_telemetry(path, body)
+        response.raise_for_status()
+    except requests.exceptions.RequestException:
+        # The server may or may not have applied it; resync next cycle
+        delta_encoder.reset()
+        raise
+    
+    delta_encoder.commit()
+    return response.json()
+
+
+class TelemetrySpool:
+    """
+    Append-only on-disk spool of telemetry snapshots.
+    
+    Snapshots are written as JSON lines into numbered segment files. A
+    persisted cursor (segment, byte offset) marks what the server has
+    acknowledged; fully acknowledged segments are deleted, and when the
+    spool exceeds max_bytes the oldest segments are evicted first.
+    """
+
+    CURSOR_FILE = "cursor"
+
+    def __init__(self, directory: str = SPOOL_DIR, max_bytes: int = SPOOL_MAX_BYTES,
+                 segment_bytes: int = SPOOL_SEGMENT_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._cursor = self._load_cursor()
+        self._pending = sum(self._count_records(segment) for segment in self._segments())
+
+    def _segments(self) -> List[int]:
+        return sorted(int(name[:-6]) for name in os.listdir(self.directory) if name.endswith(".jsonl"))
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:012d}.jsonl")
+
+    def _count_records(self, segment: int) -> int:
+        """Unacknowledged records in a segment."""
+        if segment < self._cursor[0]:
+            return 0
+        with open(self._segment_path(segment), "rb") as f:
+            if segment == self._cursor[0]:
+                f.seek(self._cursor[1])
+            return f.read().count(b"\n")
+
+    def _load_cursor(self) -> tuple:
+        try:
+            with open(os.path.join(self.directory, self.CURSOR_FILE)) as f:
+                segment, offset = f.read().split()
+                return int(segment), int(offset)
+        except (OSError, ValueError):
+            return 0, 0
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, self.CURSOR_FILE)
+        with open(path + ".tmp", "w") as f:
+            f.write(f"{self._cursor[0]} {self._cursor[1]}")
+        os.replace(path + ".tmp", path)
+
+    def append(self, record: Dict[str, Any]):
+        """Append a snapshot, rolling segments and evicting the oldest as needed."""
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        segments = self._segments()
+        segment = segments[-1] if segments else self._cursor[0]
+        path = self._segment_path(segment)
+        if os.path.exists(path) and os.path.getsize(path) + len(line) > self.segment_bytes:
+            segment += 1
+            path = self._segment_path(segment)
+        with open(path, "ab") as f:
+            f.write(line)
+        self._pending += 1
+        self._evict()
+
+    def _evict(self):
+        segments = self._segments()
+        total = sum(os.path.getsize(self._segment_path(s)) for s in segments)
+        while total > self.max_bytes and len(segments) > 1:
+            oldest = segments.pop(0)
+            dropped = self._count_records(oldest)
+            total -= os.path.getsize(self._segment_path(oldest))
+            os.remove(self._segment_path(oldest))
+            self._pending -= dropped
+            if dropped:
+                logger.warning(f"Telemetry spool full, dropped {dropped} oldest snapshot(s)")
+            if self._cursor[0] <= oldest:
+                self._cursor = (segments[0], 0)
+                self._save_cursor()
+
+    def peek(self, max_records: int) -> List[tuple]:
+        """
+        Read up to max_records unacknowledged snapshots, oldest first.
         
-        # Send data to Central Server
-        response = requests.post(
-            f"{CENTRAL_SERVER_URL}/api/v1/collect",
-            json=data,
-            timeout=10
-        )
+        Returns:
+            list: (record, position after the record) tuples; pass a position to ack()
+        """
+        records = []
+        for segment in self._segments():
+            if segment < self._cursor[0]:
+                continue
+            offset = self._cursor[1] if segment == self._cursor[0] else 0
+            with open(self._segment_path(segment), "rb") as f:
+                f.seek(offset)
+                for line in f:
+                    offset += len(line)
+                    if not line.endswith(b"\n"):
+                        break  # Torn write from a crash
+                    try:
+                        records.append((json.loads(line), (segment, offset)))
+                    except ValueError:
+                        logger.warning("Skipping corrupt telemetry spool record")
+                        continue
+                    if len(records) >= max_records:
+                        return records
+        return records
+
+    def ack(self, position: tuple, count: int):
+        """Mark the count records up to position as delivered and drop consumed segments."""
+        self._cursor = position
+        self._save_cursor()
+        self._pending = max(self._pending - count, 0)
+        for segment in self._segments()[:-1]:  # The newest segment is still being appended to
+            path = self._segment_path(segment)
+            if segment < position[0] or (segment == position[0] and position[1] >= os.path.getsize(path)):
+                os.remove(path)
+
+    def pending(self) -> int:
+        """Number of unacknowledged snapshots."""
+        return self._pending
+
+
+def compress_body(body: bytes) -> tuple:
+    """Compress a request body with zstd when available and not refused by the server, else gzip."""
+    if zstandard is not None and zstd_accepted is not False:
+        return zstandard.ZstdCompressor(level=3).compress(body), "zstd"
+    return gzip.compress(body, compresslevel=6), "gzip"
+
+
+def flush_spool(spool: "TelemetrySpool") -> int:
+    """
+    Upload spooled snapshots as one compressed batch.
+    
+    Snapshots are delta-encoded in order at flush time, so a resync request
+    from the server only costs re-encoding, never spooled data.
+    
+    Returns:
+        int: Number of snapshots the server accepted
+    """
+    global upload_retry_at
+    records = spool.peek(UPLOAD_MAX_BATCH)
+    if not records:
+        return 0
+    
+    items = []
+    for record, _ in records:
+        if DELTA_TELEMETRY:
+            path, body = delta_encoder.encode(record)
+            delta_encoder.commit()  # Optimistic; reset below if the batch fails
+            kind = "delta" if path.endswith("/delta") else "full"
+        else:
+            kind, body = "full", record
+        items.append({"kind": kind, "payload": body})
+    
+    try:
+        response, raw_size, encoding = post_telemetry("/api/v1/collect/batch", {"items": items}, compress=True)
+        if response.status_code == 429:
+            # Server is shedding load; leave the batch spooled until it asks us back
+            retry_after = response.headers.get("Retry-After", "")
+            upload_retry_at = time.time() + (int(retry_after) if retry_after.isdigit() else COLLECTION_INTERVAL)
         response.raise_for_status()
+    except requests.exceptions.RequestException:
+        delta_encoder.reset()
+        raise
+    
+    results = response.json().get("results", [])
+    accepted = 0
+    consumed = 0
+    position = None
+    for (record, record_position), result in zip(records, results):
+        status = result.get("status")
+        if status == "resync_required":
+            # Server lost our baseline; re-encode the rest from a full snapshot
+            logger.info("Server requested a full telemetry resync")
+            delta_encoder.reset()
+            break
+        if status == "invalid":
+            logger.error(f"Server rejected spooled snapshot: {result.get('detail')}")
+        else:
+            accepted += 1
+        consumed += 1
+        position = record_position
+    
+    if position is not None:
+        spool.ack(position, consumed)
+    logger.info(f"Uploaded {accepted}/{len(records)} spooled snapshot(s), "
+                f"{raw_size} -> {len(response.request.body)} bytes ({response.request.headers['Content-Type']}, {encoding})")
+    return accepted
+
+
+telemetry_spool: Optional[TelemetrySpool] = None
+upload_retry_at = 0.0  # Set from the server's Retry-After when it answers 429
+process_watcher: Optional[ProcessWatcher] = None
+last_snapshot: Optional[Dict[str, Any]] = None
+
+
+def jittered(interval: float) -> float:
+    """interval, varied by up to COLLECTION_JITTER either way."""
+    return interval * random.uniform(1 - COLLECTION_JITTER, 1 + COLLECTION_JITTER)
+
+
+def collect_snapshot(full_scan: bool = True) -> Dict[str, Any]:
+    """
+    Collect a snapshot with the process events captured since the last one.
+    
+    Args:
+        full_scan: False to skip the scan and resend the last snapshot,
+                   only to deliver newly captured process events
+    """
+    global last_snapshot
+    if full_scan or last_snapshot is None:
+        logger.debug("Collecting system telemetry...")
+        data = last_snapshot = collect_system_data()
+        cycle = process_collector.last_cycle if process_collector else {}
+        if cycle.get("deferred") or cycle.get("stale"):
+            logger.warning(f"Collection CPU budget reached: {cycle['deferred']} new process(es) deferred, "
+                           f"{cycle['stale']} reported with previous metrics")
+    else:
+        data = dict(last_snapshot, timestamp=datetime.datetime.now().isoformat())
+    
+    events = process_watcher.drain() if process_watcher else []
+    if events:
+        data = dict(data, process_events=events)
+    return data
+
+
+def upload_snapshot(data: Dict[str, Any]):
+    """
+    Send a snapshot to the Central Server. With spooling enabled the
+    snapshot is persisted first and uploaded in batches, so a server
+    outage costs disk rather than data.
+    """
+    global telemetry_spool
+    try:
+        if SPOOL_ENABLED:
+            if telemetry_spool is None:
+                telemetry_spool = TelemetrySpool()
+            telemetry_spool.append(data)
+            # Process events are uploaded straight away rather than waiting for a full batch
+            if ((telemetry_spool.pending() >= UPLOAD_BATCH_SIZE or data.get("process_events"))
+                    and time.time() >= upload_retry_at):
+                # Drain the backlog a batch at a time
+                while flush_spool(telemetry_spool) and telemetry_spool.pending() >= UPLOAD_BATCH_SIZE:
+                    pass
+            return
         
-        result = response.json()
+        # Send data to Central Server
+        result = send_telemetry(data)
         logger.info(f"Telemetry sent successfully. Server response: {result}")
         
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to send telemetry to Central Server: {e}")
     except Exception as e:
-        logger.error(f"Unexpected error during telemetry collection: {e}")
+        logger.error(f"Unexpected error during telemetry upload: {e}")
+
+
+def collect_and_send(full_scan: bool = True):
+    """Collect a snapshot and upload it on the calling thread (a one-off run)."""
+    upload_snapshot(collect_snapshot(full_scan))
+
+
+def queue_snapshot(snapshots: "queue.Queue", data: Dict[str, Any]):
+    """
+    Hand a snapshot to the uploader. When the queue is full the oldest
+    snapshot is dropped, its process events carried over to this one.
+    """
+    while True:
+        try:
+            snapshots.put_nowait(data)
+            return
+        except queue.Full:
+            try:
+                dropped = snapshots.get_nowait()
+            except queue.Empty:
+                continue
+            logger.warning("Upload queue full, dropping the oldest unsent snapshot")
+            if dropped and dropped.get("process_events"):
+                data = dict(data, process_events=dropped["process_events"] + data.get("process_events", []))
+
+
+def collection_loop(stop_event: threading.Event, snapshots: "queue.Queue"):
+    """
+    Collect snapshots on schedule and queue them for upload, until stop_event is set.
+    
+    The first full scan runs within COLLECTION_SPLAY of starting, then every
+    COLLECTION_INTERVAL, jittered. With event capture, process events are
+    sent EVENT_SEND_DELAY after the first one is captured, and the interval
+    doubles (up to COLLECTION_MAX_INTERVAL) after each scan during which no
+    process started or exited, dropping back to COLLECTION_INTERVAL when one did.
+    """
+    interval = COLLECTION_INTERVAL
+    next_full_scan = time.time() + random.uniform(0, COLLECTION_SPLAY)
+    events_at_last_scan = 0
+    while not stop_event.is_set():
+        now = time.time()
+        try:
+            if now >= next_full_scan:
+                quiet = process_watcher is not None and process_watcher.event_count == events_at_last_scan
+                if process_watcher is not None:
+                    events_at_last_scan = process_watcher.event_count
+                queue_snapshot(snapshots, collect_snapshot())
+                interval = min(interval * 2, COLLECTION_MAX_INTERVAL) if quiet else COLLECTION_INTERVAL
+                next_full_scan = now + jittered(interval)
+            elif process_watcher is not None:
+                oldest = process_watcher.oldest_pending()
+                if oldest is not None and now - oldest >= EVENT_SEND_DELAY:
+                    queue_snapshot(snapshots, collect_snapshot(full_scan=False))
+                    if interval > COLLECTION_INTERVAL:
+                        # Activity: bring the next full scan forward
+                        interval = COLLECTION_INTERVAL
+                        next_full_scan = min(next_full_scan, now + jittered(COLLECTION_INTERVAL))
+        except Exception as e:
+            logger.error(f"Unexpected error during telemetry collection: {e}")
+        stop_event.wait(max(0.0, min(next_full_scan - time.time(), 1.0)))
+
+
+def upload_loop(snapshots: "queue.Queue"):
+    """Upload queued snapshots until a None is queued, then flush what is spooled."""
+    while True:
+        data = snapshots.get()
+        if data is None:
+            break
+        upload_snapshot(data)
+    if telemetry_spool is not None and telemetry_spool.pending():
+        try:
+            while flush_spool(telemetry_spool) and telemetry_spool.pending():
+                pass
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Final upload failed ({e}); {telemetry_spool.pending()} snapshot(s) stay spooled")
+
+
+def wait_for_exit(pid: int, timeout: float) -> bool:
+    """Wait up to timeout seconds for a process to exit; True if it did."""
+    try:
+        psutil.Process(pid).wait(timeout=timeout)
+    except psutil.NoSuchProcess:
+        pass
+    except psutil.TimeoutExpired:
+        return False
+    return True
 
 
-def execute_kill_process(pid_str: str) -> bool:
+def execute_kill_process(pid_str: str, create_time: Optional[float] = None) -> bool:
     """
     Execute kill process command for the given PID.
     
     Args:
         pid_str: Process ID as string
+        create_time: Creation time of the targeted process, if known; a
+                     process with a different one has reused the PID and
+                     is left alone
         
     Returns:
         bool: True if successful, False otherwise
@@ -154,6 +1151,9 @@ def execute_kill_process(pid_str: str) -> bool:
         try:
             proc = psutil.Process(pid)
             proc_name = proc.name()
+            if create_time is not None and abs(proc.create_time() - create_time) > 0.01:
+                logger.warning(f"PID {pid} now belongs to another process ({proc_name}); target already exited")
+                return True
             logger.info(f"Killing process: {proc_name} (PID: {pid})")
         except (psutil.NoSuchProcess, psutil.AccessDenied):
             proc_name = "unknown"
@@ -161,11 +1161,8 @@ def execute_kill_process(pid_str: str) -> bool:
         # Send SIGTERM first (graceful termination)
         os.kill(pid, signal.SIGTERM)
         
-        # Wait a bit to see if process terminates gracefully
-        time.sleep(2)
-        
-        # Check if process is still running
-        if psutil.pid_exists(pid):
+        # Give it up to KILL_GRACE_PERIOD to exit; returns as soon as it does
+        if not wait_for_exit(pid, KILL_GRACE_PERIOD):
             logger.warning(f"Process {pid} still running after SIGTERM, sending SIGKILL")
             os.kill(pid, signal.SIGKILL)
         
@@ -186,46 +1183,161 @@ def execute_kill_process(pid_str: str) -> bool:
         return False
 
 
-def poll_and_execute_commands():
+def fetch_commands(session: requests.Session, wait: float = 0) -> List[Dict[str, Any]]:
+    """
+    Fetch pending commands from the Central Server.
+    With wait > 0 the server holds the request until a command arrives or
+    the wait expires.
+    """
+    try:
+        response = session.get(
+            f"{server_url}/api/v1/commands",
+            params={"host": AGENT_HOSTNAME, "wait": wait},
+            timeout=wait + 10
+        )
+    except requests.exceptions.ConnectionError:
+        reset_server_url()
+        raise
+    follow_owner(response)
+    response.raise_for_status()
+    return response.json()
+
+
+def execute_command(command: Dict[str, Any]) -> tuple:
+    """
+    Run one command from the Central Server.
+    
+    Returns:
+        tuple: (status, detail) - status is "succeeded" or "failed"
+    """
+    command_id = command.get("command_id", "unknown")
+    action = command.get("action")
+    target = command.get("target")
+    parameters = command.get("parameters", {})
+    
+    logger.info(f"Executing command {command_id}: {action} on {target}")
+    
+    if action == "kill_process":
+        if execute_kill_process(target, parameters.get("create_time")):
+            logger.info(f"Command {command_id} executed successfully")
+            return "succeeded", None
+        logger.error(f"Command {command_id} failed to execute")
+        return "failed", f"Could not kill process {target}"
+    logger.warning(f"Unknown command action: {action}")
+    return "failed", f"Unknown command action: {action}"
+
+
+def report_command_result(session: requests.Session, command_id: str, status: str, detail: Optional[str] = None):
+    """Report a command's result, which stops the server handing it out again."""
+    response = session.post(
+        f"{server_url}/api/v1/commands/{command_id}/result",
+        json={"host": AGENT_HOSTNAME, "status": status, "detail": detail,
+              "finished_at": datetime.datetime.now().isoformat()},
+        timeout=10
+    )
+    response.raise_for_status()
+
+
+class CommandExecutor:
+    """
+    Runs commands on a thread pool and reports each result.
+    
+    The server hands a command out again when its result doesn't arrive in
+    time, so a command already running is skipped and a finished one is
+    only reported again, never re-run. At most max_queued commands are
+    queued or running; submit() blocks beyond that, so the command channel
+    stops fetching until there is room.
+    """
+    
+    def __init__(self, workers: int = COMMAND_WORKERS, remember: int = 1000, max_queued: int = COMMAND_QUEUE_SIZE):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="command")
+        self._slots = threading.BoundedSemaphore(max_queued)
+        self._running = set()
+        self._finished: "OrderedDict[str, tuple]" = OrderedDict()  # command id -> (status, detail)
+        self._remember = remember
+        self._local = threading.local()
+        self._lock = threading.Lock()
+    
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()  # Sessions aren't shared across threads
+            session.headers["X-Agent-Host"] = AGENT_HOSTNAME
+        return session
+    
+    def submit(self, commands: List[Dict[str, Any]]):
+        for command in commands:
+            command_id = command.get("command_id", "unknown")
+            with self._lock:
+                if command_id in self._running:
+                    continue
+                finished = self._finished.get(command_id)
+                if finished is None:
+                    self._running.add(command_id)
+            self._slots.acquire()
+            if finished is not None:
+                self._pool.submit(self._report, command_id, *finished)
+            else:
+                self._pool.submit(self._run, command)
+    
+    def _run(self, command: Dict[str, Any]):
+        command_id = command.get("command_id", "unknown")
+        try:
+            status, detail = execute_command(command)
+        except Exception as e:
+            logger.error(f"Unexpected error executing command {command_id}: {e}")
+            status, detail = "failed", str(e)
+        with self._lock:
+            self._running.discard(command_id)
+            self._finished[command_id] = (status, detail)
+            while len(self._finished) > self._remember:
+                self._finished.popitem(last=False)
+        self._report(command_id, status, detail)
+    
+    def _report(self, command_id: str, status: str, detail: Optional[str]):
+        try:
+            report_command_result(self._session(), command_id, status, detail)
+        except requests.exceptions.RequestException as e:
+            # The server hands the command out again; its result is reported then
+            logger.warning(f"Failed to report result of command {command_id}: {e}")
+        finally:
+            self._slots.release()
+    
+    def shutdown(self, timeout: float) -> bool:
+        """Let queued and running commands finish and report, for up to timeout seconds."""
+        deadline = time.monotonic() + timeout
+        waiter = threading.Thread(target=self._pool.shutdown, name="command-shutdown", daemon=True)
+        waiter.start()
+        waiter.join(max(0.0, deadline - time.monotonic()))
+        return not waiter.is_alive()
+
+
+command_executor = CommandExecutor()
+
+
+def execute_commands(commands: List[Dict[str, Any]]):
+    """
+    Execute commands received from the Central Server, without waiting for them.
+    """
+    logger.info(f"Received {len(commands)} command(s)")
+    command_executor.submit(commands)
+
+
+def poll_and_execute_commands(session: Optional[requests.Session] = None):
     """
     Poll the Central Server for pending commands and execute them.
     """
     try:
-        logger.info("Polling for commands...")
+        logger.debug("Polling for commands...")
         
         # Get commands from Central Server
-        response = requests.get(
-            f"{CENTRAL_SERVER_URL}/api/v1/commands",
-            params={"host": AGENT_HOSTNAME},
-            timeout=10
-        )
-        response.raise_for_status()
-        
-        commands = response.json()
+        commands = fetch_commands(session or http_session)
         
         if not commands:
             logger.debug("No pending commands")
             return
         
-        logger.info(f"Received {len(commands)} command(s)")
-        
-        # Execute each command
-        for command in commands:
-            command_id = command.get("command_id", "unknown")
-            action = command.get("action")
-            target = command.get("target")
-            parameters = command.get("parameters", {})
-            
-            logger.info(f"Executing command {command_id}: {action} on {target}")
-            
-            if action == "kill_process":
-                success = execute_kill_process(target)
-                if success:
-                    logger.info(f"Command {command_id} executed successfully")
-                else:
-                    logger.error(f"Command {command_id} failed to execute")
-            else:
-                logger.warning(f"Unknown command action: {action}")
+        execute_commands(commands)
     
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to poll commands from Central Server: {e}")
@@ -233,34 +1345,144 @@ def poll_and_execute_commands():
         logger.error(f"Unexpected error during command polling: {e}")
 
 
+def command_listener(stop_event: threading.Event):
+    """
+    Long-poll the Central Server for commands until stop_event is set.
+    Reconnects after errors with jittered exponential backoff so a fleet of
+    agents doesn't reconnect in lockstep after a server restart.
+    """
+    session = requests.Session()  # Sessions aren't shared across threads
+    session.headers["X-Agent-Host"] = AGENT_HOSTNAME
+    failures = 0
+    while not stop_event.is_set():
+        try:
+            commands = fetch_commands(session, wait=COMMAND_LONG_POLL_WAIT)
+            failures = 0
+            if commands:
+                execute_commands(commands)
+        except Exception as e:
+            failures += 1
+            delay = random.uniform(0, min(COMMAND_RETRY_MAX_DELAY, 2 ** failures))
+            logger.error(f"Command long-poll failed ({e}), retrying in {delay:.1f}s")
+            stop_event.wait(delay)
+
+
+def command_poll_loop(stop_event: threading.Event):
+    """Poll for commands every COMMAND_POLL_INTERVAL, jittered, until stop_event is set."""
+    session = requests.Session()  # Sessions aren't shared across threads
+    session.headers["X-Agent-Host"] = AGENT_HOSTNAME
+    while not stop_event.wait(jittered(COMMAND_POLL_INTERVAL)):
+        poll_and_execute_commands(session)
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the agent's threads on a background thread and
+    writes how often each stack was seen, one "thread;outer;...;inner count"
+    line per stack. Costs nothing until started.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL, duration: float = PROFILE_DURATION,
+                 directory: str = PROFILE_DIR):
+        self.interval = interval
+        self.duration = duration
+        self.directory = directory
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def start(self) -> bool:
+        """Start a profile unless one is running; safe to call from a signal handler."""
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return True
+
+    def sample(self) -> Counter:
+        """Sample for the profile's duration; returns the count of each folded stack."""
+        own = threading.get_ident()
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + self.duration
+        while time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(self._frame_name(frame))
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, str(thread_id)))
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(self.interval)
+        return stacks
+
+    def _run(self):
+        logger.info(f"Profiling for {self.duration}s")
+        stacks = self.sample()
+        path = os.path.join(self.directory, f"agent-profile-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Wrote profile of {sum(stacks.values())} samples to {path}")
+
+
 def main():
     """
-    Main agent loop with scheduled tasks.
+    Run the agent until SIGTERM or Ctrl+C, then send what has been collected
+    and let running commands finish, for up to SHUTDOWN_TIMEOUT.
     """
+    global process_watcher
     logger.info(f"AI-Eye Watcher Agent starting on {AGENT_HOSTNAME}")
     logger.info(f"Central Server URL: {CENTRAL_SERVER_URL}")
     logger.info(f"Collection interval: {COLLECTION_INTERVAL}s")
-    logger.info(f"Command poll interval: {COMMAND_POLL_INTERVAL}s")
     
-    # Schedule periodic tasks
-    schedule.every(COLLECTION_INTERVAL).seconds.do(collect_and_send)
-    schedule.every(COMMAND_POLL_INTERVAL).seconds.do(poll_and_execute_commands)
+    stop_event = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda signum, frame: stop_event.set())
+    if PROFILER_ENABLED:
+        profiler = SamplingProfiler()
+        signal.signal(PROFILE_SIGNAL, lambda signum, frame: profiler.start())
+        logger.info(f"Profiler armed: send signal {int(PROFILE_SIGNAL)} to PID {os.getpid()}")
     
-    # Run initial collection immediately
-    logger.info("Running initial telemetry collection...")
-    collect_and_send()
+    if EVENT_CAPTURE:
+        process_watcher = ProcessWatcher()
+        process_watcher.start(stop_event)
+    snapshots: queue.Queue = queue.Queue(maxsize=UPLOAD_QUEUE_SIZE)
+    collector = threading.Thread(target=collection_loop, args=(stop_event, snapshots), name="collector", daemon=True)
+    uploader = threading.Thread(target=upload_loop, args=(snapshots,), name="uploader", daemon=True)
+    collector.start()
+    uploader.start()
+    if COMMAND_LONG_POLL:
+        logger.info(f"Command channel: long-poll ({COMMAND_LONG_POLL_WAIT}s)")
+        threading.Thread(target=command_listener, args=(stop_event,), name="commands", daemon=True).start()
+    else:
+        logger.info(f"Command poll interval: {COMMAND_POLL_INTERVAL}s")
+        threading.Thread(target=command_poll_loop, args=(stop_event,), name="commands", daemon=True).start()
     
-    # Main loop
     logger.info("Agent started successfully. Press Ctrl+C to stop.")
+    while not stop_event.wait(1.0):
+        pass
+    
+    logger.info("Agent stopping")
+    deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+    collector.join(max(0.0, deadline - time.monotonic()))
+    # Process events captured since the last snapshot go out with the final upload
+    if process_watcher is not None and process_watcher.oldest_pending() is not None:
+        queue_snapshot(snapshots, collect_snapshot(full_scan=False))
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
-    except KeyboardInterrupt:
-        logger.info("Agent stopped by user")
-    except Exception as e:
-        logger.error(f"Agent crashed: {e}")
-        raise
+        snapshots.put(None, timeout=max(0.0, deadline - time.monotonic()))
+    except queue.Full:
+        pass
+    uploader.join(max(0.0, deadline - time.monotonic()))
+    drained = command_executor.shutdown(max(0.0, deadline - time.monotonic()))
+    if uploader.is_alive() or not drained:
+        logger.warning(f"Shutdown timed out after {SHUTDOWN_TIMEOUT}s; unsent snapshots stay spooled")
+    logger.info("Agent stopped")
 
 
 if __name__ == "__main__":
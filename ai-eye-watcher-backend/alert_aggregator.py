@@ -0,0 +1,104 @@
+"""
+AI-Eye Watcher alert aggregation
+Coalesces repeated detections into one open alert per incident. Every
+collection cycle detects a still-running bad process again; rather than
+recording a new alert each time, the repeat bumps the open alert's
+last_seen and count. An incident is identified by host, finding type and
+the process (and indicator or endpoint) involved. It stays open until it
+has been quiet for the suppression window or until it is evicted from the
+bounded LRU of open incidents; the next detection after that opens a new
+alert.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class AlertAggregator:
+    """
+    Open alerts by incident key, least recently seen first.
+
+    The aggregator holds references to alerts owned by the alert buffer;
+    call close() when the buffer evicts one.
+    """
+
+    def __init__(self, suppression_window: float = 900.0, max_open: int = 1000):
+        self.suppression_window = suppression_window
+        self.max_open = max_open
+        self._open: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._seen_at: Dict[tuple, float] = {}
+        self.coalesced = 0  # repeats folded into an open alert since startup
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    @staticmethod
+    def key(alert: Dict[str, Any]) -> tuple:
+        indicator = alert.get("indicator") or {}
+        return (alert.get("host"), alert.get("finding_type"), alert.get("process_name"),
+                alert.get("process_pid"), indicator.get("value") or alert.get("endpoint"))
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        return self._open.get(key)
+
+    def coalesce(self, alert: Dict[str, Any], now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Fold a new detection into its incident's open alert.
+
+        Returns:
+            The open alert, with last_seen and count updated, or None when
+            the detection opens a new incident (the caller records it and
+            calls open()).
+        """
+        now = now or time.time()
+        key = self.key(alert)
+        existing = self._open.get(key)
+        if existing is None:
+            return None
+        if now - self._seen_at[key] > self.suppression_window:
+            self._close_key(key)
+            return None
+        existing["last_seen"] = alert.get("timestamp")
+        existing["count"] = existing.get("count", 1) + 1
+        self._seen_at[key] = now
+        self._open.move_to_end(key)
+        self.coalesced += 1
+        return existing
+
+    def open(self, alert: Dict[str, Any], now: Optional[float] = None):
+        """Start tracking a newly recorded alert as its incident's open alert."""
+        alert.setdefault("first_seen", alert.get("timestamp"))
+        alert.setdefault("last_seen", alert.get("timestamp"))
+        alert.setdefault("count", 1)
+        key = self.key(alert)
+        self._open[key] = alert
+        self._open.move_to_end(key)
+        self._seen_at[key] = now or time.time()
+        while len(self._open) > self.max_open:
+            self._close_key(next(iter(self._open)))
+
+    def update(self, key: tuple, last_seen: Optional[str], count: int) -> Optional[Dict[str, Any]]:
+        """Apply a repeat counted elsewhere (another worker) to the open alert, if this worker has it."""
+        existing = self._open.get(key)
+        if existing is None:
+            return None
+        existing["last_seen"] = last_seen
+        existing["count"] = max(existing.get("count", 1), count)
+        self._seen_at[key] = time.time()
+        self._open.move_to_end(key)
+        return existing
+
+    def close(self, alert: Dict[str, Any]):
+        """Stop tracking an alert, e.g. one evicted from the alert buffer."""
+        key = self.key(alert)
+        if self._open.get(key) is alert:
+            self._close_key(key)
+
+    def _close_key(self, key: tuple):
+        self._open.pop(key, None)
+        self._seen_at.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"open_alerts": len(self._open), "coalesced": self.coalesced,
+                "suppression_window_seconds": self.suppression_window}
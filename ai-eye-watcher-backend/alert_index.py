@@ -0,0 +1,125 @@
+"""
+AI-Eye Watcher alert index
+Secondary indexes over the Central Server's bounded alert buffer, maintained
+as alerts are recorded and evicted, so filtered and paginated alert queries
+cost time proportional to the page rather than the buffer.
+"""
+
+import time
+from bisect import bisect_left, bisect_right
+from typing import List, Dict, Any, Optional, Tuple
+
+
+class PostingList:
+    """
+    Ascending alert ids with their record times.
+
+    Alerts are evicted oldest first, so removal only ever happens at the
+    front; it advances a start offset and compacts the lists lazily.
+    """
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self.times: List[float] = []
+        self.start = 0
+
+    def __len__(self) -> int:
+        return len(self.ids) - self.start
+
+    def append(self, alert_id: int, timestamp: float):
+        self.ids.append(alert_id)
+        self.times.append(timestamp)
+
+    def discard_front(self, alert_id: int):
+        if self.start < len(self.ids) and self.ids[self.start] == alert_id:
+            self.start += 1
+            if self.start > 1024 and self.start * 2 > len(self.ids):
+                del self.ids[:self.start]
+                del self.times[:self.start]
+                self.start = 0
+
+    def iter_desc(self, since: Optional[float] = None, until: Optional[float] = None,
+                  before: Optional[int] = None):
+        """Alert ids within the time range and below `before`, newest first."""
+        lo = bisect_left(self.times, since, self.start) if since is not None else self.start
+        hi = bisect_right(self.times, until, self.start) if until is not None else len(self.ids)
+        if before is not None:
+            hi = min(hi, bisect_left(self.ids, before, self.start))
+        return (self.ids[i] for i in range(hi - 1, lo - 1, -1))
+
+
+class AlertIndex:
+    """
+    Alerts by id plus posting lists per host, severity and finding_type.
+
+    Every alert gets an increasing "alert_id", which doubles as the
+    pagination cursor: a page continues with the alerts older than the
+    last id it returned.
+    """
+
+    FIELDS = ("host", "severity", "finding_type")
+
+    def __init__(self):
+        self.alerts: Dict[int, Dict[str, Any]] = {}
+        self.all = PostingList()
+        self.by_field: Dict[str, Dict[str, PostingList]] = {field: {} for field in self.FIELDS}
+        self._next_id = 1
+        self._last_time = 0.0
+
+    def add(self, alert: Dict[str, Any]) -> int:
+        alert_id = self._next_id
+        self._next_id += 1
+        # Times are kept non-decreasing so the posting lists stay bisectable
+        timestamp = self._last_time = max(time.time(), self._last_time)
+        alert["alert_id"] = alert_id
+        self.alerts[alert_id] = alert
+        self.all.append(alert_id, timestamp)
+        for field in self.FIELDS:
+            value = alert.get(field)
+            if value is not None:
+                self.by_field[field].setdefault(value, PostingList()).append(alert_id, timestamp)
+        return alert_id
+
+    def remove(self, alert: Dict[str, Any]):
+        """Drop an alert; must be the oldest one still indexed."""
+        alert_id = alert["alert_id"]
+        self.alerts.pop(alert_id, None)
+        self.all.discard_front(alert_id)
+        for field in self.FIELDS:
+            postings = self.by_field[field].get(alert.get(field))
+            if postings is not None:
+                postings.discard_front(alert_id)
+                if not postings:
+                    del self.by_field[field][alert.get(field)]
+
+    def query(self, host: Optional[str] = None, severity: Optional[str] = None,
+              finding_type: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, before: Optional[int] = None,
+              limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Return matching alerts, most recent first, and the cursor for the
+        next page (None when there are no more alerts).
+
+        The smallest posting list among the requested filters drives the
+        scan; the remaining filters are checked on each candidate.
+        """
+        filters = {field: value for field, value in
+                   (("host", host), ("severity", severity), ("finding_type", finding_type))
+                   if value is not None}
+        candidates = [self.all]
+        for field, value in filters.items():
+            postings = self.by_field[field].get(value)
+            if postings is None:
+                return [], None
+            candidates.append(postings)
+        driver = min(candidates, key=len)
+
+        results = []
+        for alert_id in driver.iter_desc(since, until, before):
+            alert = self.alerts[alert_id]
+            if any(alert.get(field) != value for field, value in filters.items()):
+                continue
+            if len(results) >= limit:
+                return results, results[-1]["alert_id"]
+            results.append(alert)
+        return results, None
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+AI-Eye Watcher event memory benchmark
+Measures the memory held by stored telemetry events as model_dump() dicts
+and as CompactEvents, and the cost of converting between the two. Events
+are built the way the server builds them (JSON body -> TelemetryPayload ->
+model_dump()), so every event carries its own copies of its strings.
+
+The dict form needs several GB at 100k events, so by default it is
+measured on --dict-sample events and scaled up; the compact form is
+measured at the full --events count. Sizes are the sum of sys.getsizeof()
+over every object reachable from the stored events, shared ones counted
+once (interpreter allocator overhead is not included).
+
+Usage:
+    python benchmark_memory.py --events 100000 --hosts 50 --processes 50 --connections 10
+"""
+
+import os
+import gc
+import sys
+import json
+import time
+import types
+import argparse
+import datetime
+import tempfile
+
+from benchmark_server import TelemetryGenerator
+from compact_events import EventCompactor
+
+
+def event_stream(generator: TelemetryGenerator, model, count: int):
+    for _ in range(count):
+        event = model.model_validate_json(json.dumps(generator.payload())).model_dump()
+        event["received_at"] = datetime.datetime.now().isoformat()
+        yield event
+
+
+def deep_size(root) -> int:
+    """Bytes held by root and everything it references, counting shared objects once."""
+    seen = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, (type, types.ModuleType, types.FunctionType)):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI-Eye Watcher event memory benchmark")
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--dict-sample", type=int, default=5_000, help="Events to measure in dict form")
+    parser.add_argument("--hosts", type=int, default=50)
+    parser.add_argument("--processes", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=10)
+    args = parser.parse_args()
+
+    # The server keeps an event store in the working directory
+    os.chdir(tempfile.mkdtemp(prefix="aieye-memory-"))
+    from central_server import TelemetryPayload
+
+    def generator():
+        return TelemetryGenerator(hosts=args.hosts, processes=args.processes,
+                                  connections=args.connections, bad_rate=0)
+
+    sample = min(args.dict_sample, args.events)
+    dict_bytes = deep_size(list(event_stream(generator(), TelemetryPayload, sample))) / sample
+
+    compactor = EventCompactor()
+    stored = [compactor.compact(event) for event in event_stream(generator(), TelemetryPayload, args.events)]
+    compact_bytes = deep_size(stored) / args.events
+    del stored
+
+    events = list(event_stream(generator(), TelemetryPayload, 1000))
+    compactor = EventCompactor()
+    started = time.perf_counter()
+    compact_events = [compactor.compact(event) for event in events]
+    compact_ms = (time.perf_counter() - started) / len(events) * 1000
+    started = time.perf_counter()
+    restored = [event.to_dict() for event in compact_events]
+    to_dict_ms = (time.perf_counter() - started) / len(events) * 1000
+
+    print("AI-Eye Watcher Event Memory Benchmark")
+    print("=" * 50)
+    print(f"Events: {args.events:,} from {args.hosts} hosts, {args.processes} processes and "
+          f"{args.connections} connections each")
+    print(f"  dicts (model_dump)   {dict_bytes:>9,.0f} bytes/event   "
+          f"{dict_bytes * args.events / 2**20:>8,.1f} MB total (measured on {sample:,}, scaled)")
+    print(f"  CompactEvent         {compact_bytes:>9,.0f} bytes/event   "
+          f"{compact_bytes * args.events / 2**20:>8,.1f} MB total ({dict_bytes / compact_bytes:.1f}x smaller)")
+    print(f"  compact()            {compact_ms:.3f}ms/event   to_dict() {to_dict_ms:.3f}ms/event   "
+          f"round trip {'exact' if restored == events else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
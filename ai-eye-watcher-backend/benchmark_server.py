@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+AI-Eye Watcher Central Server benchmark
+Load generator for the ingest hot path and the read endpoints. Synthesizes
+realistic telemetry, drives the server in-process (ASGI, no network) or
+over HTTP at a fixed concurrency, and reports throughput, p50/p99 latency
+and RSS growth. Results can be saved as a baseline and later runs are
+compared against it, so regressions show up as a non-zero exit status.
+
+Usage:
+    python benchmark_server.py                       # in-process, compare to baseline
+    python benchmark_server.py --save-baseline       # record a new baseline
+    python benchmark_server.py --mode http --url http://localhost:9000 --server-pid <pid>
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import datetime
+import tempfile
+from typing import List, Dict, Any, Optional
+
+import httpx
+
+try:
+    import psutil
+except ImportError:  # Optional: RSS is reported as n/a without it
+    psutil = None
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+COMMON_PROCESSES = [
+    "launchd", "kernel_task", "WindowServer", "Finder", "Dock", "sshd", "bash", "zsh",
+    "python3", "node", "chrome", "Google Chrome Helper", "Slack", "postgres", "nginx",
+    "java", "dockerd", "containerd", "mds_stores", "cloudd", "Code Helper", "syslogd"
+]
+BAD_PROCESSES = ["nc.exe", "mimikatz.exe", "ncat", "netcat"]
+
+# Increases smaller than these are timer/allocator noise, not regressions
+LATENCY_SLACK_MS = 2.0
+RSS_SLACK_MB = 32.0
+
+
+class TelemetryGenerator:
+    """
+    Deterministic synthetic telemetry. Every host keeps a stable process
+    list (so anomaly detection sees realistic repeat snapshots) whose
+    metrics drift between snapshots; a fraction of snapshots carry a
+    known bad process.
+    """
+
+    def __init__(self, hosts: int = 50, processes: int = 300, connections: int = 40,
+                 bad_rate: float = 0.01, seed: int = 42):
+        self.rng = random.Random(seed)
+        self.bad_rate = bad_rate
+        self.hostnames = [f"bench-host-{number:04d}" for number in range(hosts)]
+        self.host_processes = {hostname: self._processes(processes) for hostname in self.hostnames}
+        self.host_connections = {hostname: self._connections(connections, processes) for hostname in self.hostnames}
+        self._next_host = 0
+
+    def _processes(self, count: int) -> List[Dict[str, Any]]:
+        processes = []
+        for pid in range(100, 100 + count):
+            name = self.rng.choice(COMMON_PROCESSES)
+            processes.append({
+                "pid": pid,
+                "create_time": 1700000000.0 + pid,
+                "ppid": 1 if pid < 110 else 100 + (pid - 100) // 10,  # A shallow tree of parents
+                "name": name,
+                "command_line": f"/usr/bin/{name} --profile default --port {self.rng.randrange(1024, 65536)}",
+                "user": self.rng.choice(["root", "_windowserver", "testuser"]),
+                "cpu_percent": 0.0,
+                "memory_percent": 0.0
+            })
+        return processes
+
+    def _connections(self, count: int, processes: int) -> List[Dict[str, Any]]:
+        return [{
+            "local_address": "10.0.0.5",
+            "local_port": self.rng.randrange(49152, 65536),
+            "remote_address": f"{self.rng.randrange(1, 224)}.{self.rng.randrange(256)}."
+                              f"{self.rng.randrange(256)}.{self.rng.randrange(1, 255)}",
+            "remote_port": self.rng.choice([443, 443, 443, 80, 22, 5432]),
+            "status": "ESTABLISHED",
+            "pid": self.rng.randrange(100, 100 + processes)
+        } for _ in range(count)]
+
+    def payload(self) -> Dict[str, Any]:
+        """Next snapshot, cycling through the hosts."""
+        hostname = self.hostnames[self._next_host]
+        self._next_host = (self._next_host + 1) % len(self.hostnames)
+        processes = [dict(process, cpu_percent=round(self.rng.random() * 10, 1),
+                          memory_percent=round(self.rng.random() * 5, 1))
+                     for process in self.host_processes[hostname]]
+        if self.rng.random() < self.bad_rate:
+            processes.append({"pid": 99999, "name": self.rng.choice(BAD_PROCESSES),
+                              "command_line": "nc -l -p 4444", "user": "attacker"})
+        return {
+            "hostname": hostname,
+            "timestamp": datetime.datetime.now().isoformat(),
+            "processes": processes,
+            "connections": self.host_connections[hostname],
+            "system_info": {"platform": "Darwin", "cpu_count": 8, "memory_total": 17179869184}
+        }
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def rss_bytes(pid: Optional[int]) -> Optional[int]:
+    if psutil is None or pid is None:
+        return None
+    return psutil.Process(pid).memory_info().rss
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, requests_count: int,
+                       concurrency: int, make_request, rss_pid: Optional[int]) -> Dict[str, Any]:
+    """
+    Issue requests_count requests from `concurrency` concurrent workers.
+    make_request(number) returns (method, path, kwargs).
+    """
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests_count))
+
+    async def worker():
+        nonlocal errors
+        for number in counter:
+            method, path, kwargs = make_request(number)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    rss_before = rss_bytes(rss_pid)
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    rss_after = rss_bytes(rss_pid)
+
+    latencies.sort()
+    return {
+        "scenario": name,
+        "requests": requests_count,
+        "errors": errors,
+        "throughput": round(requests_count / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "rss_growth_mb": round((rss_after - rss_before) / 1048576, 1) if rss_before is not None else None
+    }
+
+
+async def run_benchmarks(client: httpx.AsyncClient, args, rss_pid: Optional[int]) -> List[Dict[str, Any]]:
+    generator = TelemetryGenerator(args.hosts, args.processes, args.connections, args.bad_rate, args.seed)
+    # Payloads are built up front so generation isn't part of the measurement
+    payloads = [generator.payload() for _ in range(args.requests)]
+    hostnames = generator.hostnames
+
+    scenarios = [
+        ("collect", args.requests,
+         lambda n: ("POST", "/api/v1/collect", {"json": payloads[n]})),
+        ("commands", args.read_requests,
+         lambda n: ("GET", "/api/v1/commands", {"params": {"host": hostnames[n % len(hostnames)]}})),
+        ("alerts", args.read_requests,
+         lambda n: ("GET", "/api/v1/alerts", {"params": {"limit": 100, "include_event": "false"}})),
+        ("alerts_by_host", args.read_requests,
+         lambda n: ("GET", "/api/v1/alerts", {"params": {"host": hostnames[n % len(hostnames)], "limit": 20}})),
+        ("events", args.read_requests,
+         lambda n: ("GET", "/api/v1/events", {"params": {"host": hostnames[n % len(hostnames)], "limit": 10}})),
+        ("dashboard_stats", args.read_requests,
+         lambda n: ("GET", "/api/v1/dashboard/stats", {})),
+    ]
+    results = []
+    for name, count, make_request in scenarios:
+        result = await run_scenario(client, name, count, args.concurrency, make_request, rss_pid)
+        results.append(result)
+        rss = "n/a" if result["rss_growth_mb"] is None else f"{result['rss_growth_mb']:+.1f}MB"
+        print(f"  {name:<16} {result['throughput']:>9.1f} req/s   p50 {result['p50_ms']:>8.2f}ms   "
+              f"p99 {result['p99_ms']:>8.2f}ms   errors {result['errors']:<4} RSS {rss}")
+    return results
+
+
+def compare_to_baseline(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+                        tolerance: float) -> List[str]:
+    """Scenarios whose throughput dropped, or p99 or RSS growth rose, by more than tolerance."""
+    regressions = []
+    for result in results:
+        expected = baseline.get(result["scenario"])
+        if expected is None:
+            continue
+        if result["throughput"] < expected["throughput"] * (1 - tolerance):
+            regressions.append(f"{result['scenario']}: throughput {result['throughput']} req/s "
+                               f"vs baseline {expected['throughput']}")
+        if result["p99_ms"] > expected["p99_ms"] * (1 + tolerance) + LATENCY_SLACK_MS:
+            regressions.append(f"{result['scenario']}: p99 {result['p99_ms']}ms vs baseline {expected['p99_ms']}ms")
+        if (result["rss_growth_mb"] is not None and expected.get("rss_growth_mb") is not None
+                and result["rss_growth_mb"] > expected["rss_growth_mb"] * (1 + tolerance) + RSS_SLACK_MB):
+            regressions.append(f"{result['scenario']}: RSS grew {result['rss_growth_mb']}MB "
+                               f"vs baseline {expected['rss_growth_mb']}MB")
+        if result["errors"] > expected.get("errors", 0):
+            regressions.append(f"{result['scenario']}: {result['errors']} errors vs baseline {expected.get('errors', 0)}")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="AI-Eye Watcher Central Server benchmark")
+    parser.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    parser.add_argument("--url", default="http://localhost:9000", help="Server URL for --mode http")
+    parser.add_argument("--server-pid", type=int, help="Server process to measure RSS of in --mode http")
+    parser.add_argument("--hosts", type=int, default=50)
+    parser.add_argument("--processes", type=int, default=300, help="Processes per host")
+    parser.add_argument("--connections", type=int, default=40, help="Connections per host")
+    parser.add_argument("--bad-rate", type=float, default=0.01, help="Fraction of payloads with a bad process")
+    parser.add_argument("--requests", type=int, default=1000, help="Telemetry payloads to ingest")
+    parser.add_argument("--read-requests", type=int, default=500, help="Requests per read scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed relative regression")
+    return parser.parse_args()
+
+
+async def main_async(args) -> List[Dict[str, Any]]:
+    if args.mode == "http":
+        async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+            return await run_benchmarks(client, args, args.server_pid)
+
+    # In-process: run against a scratch event store so the benchmark starts
+    # empty and leaves no data behind
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(tempfile.mkdtemp(prefix="aieye-bench-"))
+    import central_server
+    transport = httpx.ASGITransport(app=central_server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=60) as client:
+        return await run_benchmarks(client, args, os.getpid())
+
+
+def main():
+    args = parse_args()
+    print("AI-Eye Watcher Central Server Benchmark")
+    print("=" * 50)
+    print(f"Mode: {args.mode}, {args.hosts} hosts x {args.processes} processes, "
+          f"{args.connections} connections, bad rate {args.bad_rate}, concurrency {args.concurrency}")
+
+    results = asyncio.run(main_async(args))
+    baseline_key = f"{args.mode}:{args.hosts}x{args.processes}x{args.connections}:c{args.concurrency}"
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines[baseline_key] = {result["scenario"]: result for result in results}
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nSaved baseline '{baseline_key}' to {args.baseline}")
+        return 0
+
+    if baseline_key not in baselines:
+        print(f"\nNo baseline for '{baseline_key}'; run with --save-baseline to record one")
+        return 0
+    regressions = compare_to_baseline(results, baselines[baseline_key], args.tolerance)
+    print("\n" + "=" * 50)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"   - {regression}")
+        return 1
+    print(f"✅ Within {args.tolerance:.0%} of baseline '{baseline_key}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
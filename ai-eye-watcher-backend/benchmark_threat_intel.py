@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+AI-Eye Watcher threat intel benchmark
+Compiles a large synthetic indicator set and measures the cost of matching
+realistic payloads against it.
+"""
+
+import random
+import time
+import statistics
+from types import SimpleNamespace
+
+from threat_intel import Indicator, ThreatIntelEngine
+
+INDICATOR_COUNT = 100_000
+PAYLOAD_PROCESSES = 400
+PAYLOAD_CONNECTIONS = 150
+ROUNDS = 200
+
+COMMON_PROCESSES = [
+    "systemd", "sshd", "bash", "python3", "chrome", "node", "postgres",
+    "nginx", "java", "dockerd", "containerd", "kworker/0:1", "zsh", "code"
+]
+
+
+def random_token(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(length))
+
+
+def synthetic_indicators(count: int, rng: random.Random):
+    """Indicator mix weighted roughly like a commercial feed."""
+    indicators = []
+    for number in range(count):
+        roll = number % 20
+        if roll < 6:
+            indicators.append(Indicator("sha256", "%064x" % rng.getrandbits(256)))
+        elif roll < 10:
+            indicators.append(Indicator("ip", f"{rng.randrange(1, 224)}.{rng.randrange(256)}."
+                                              f"{rng.randrange(256)}.{rng.randrange(256)}"))
+        elif roll < 12:
+            indicators.append(Indicator("cidr", f"{rng.randrange(1, 224)}.{rng.randrange(256)}."
+                                                f"{rng.randrange(256)}.0/{rng.choice([16, 20, 24])}"))
+        elif roll < 15:
+            indicators.append(Indicator("process_name", random_token(rng, 10) + ".exe"))
+        elif roll < 19:
+            indicators.append(Indicator("cmdline_substring", "-" + random_token(rng, 12)))
+        elif number % 100 == 19:
+            indicators.append(Indicator("port", str(rng.randrange(20000, 65536)), "MEDIUM"))
+        else:
+            indicators.append(Indicator("process_glob", f"*{random_token(rng, 8)}*"))
+    return indicators
+
+
+def synthetic_payload(rng: random.Random):
+    processes = []
+    for pid in range(PAYLOAD_PROCESSES):
+        name = rng.choice(COMMON_PROCESSES)
+        processes.append(SimpleNamespace(
+            pid=pid,
+            name=name,
+            command_line=f"/usr/bin/{name} --config /etc/{name}/{random_token(rng, 6)}.conf "
+                         f"--workers {rng.randrange(1, 16)} --log-level info",
+            sha256="%064x" % rng.getrandbits(256)
+        ))
+    connections = [
+        SimpleNamespace(
+            pid=rng.randrange(PAYLOAD_PROCESSES),
+            remote_address=f"{rng.randrange(1, 224)}.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}",
+            remote_port=rng.choice([80, 443, 5432, 8080, rng.randrange(1024, 65536)])
+        )
+        for _ in range(PAYLOAD_CONNECTIONS)
+    ]
+    return processes, connections
+
+
+def main():
+    rng = random.Random(42)
+    indicators = synthetic_indicators(INDICATOR_COUNT, rng)
+
+    started = time.perf_counter()
+    engine = ThreatIntelEngine(indicators)
+    compile_seconds = time.perf_counter() - started
+
+    payloads = [synthetic_payload(rng) for _ in range(20)]
+    timings = []
+    match_count = 0
+    for round_number in range(ROUNDS):
+        processes, connections = payloads[round_number % len(payloads)]
+        started = time.perf_counter()
+        match_count += len(engine.match(processes, connections))
+        timings.append(time.perf_counter() - started)
+
+    timings.sort()
+    print("AI-Eye Watcher Threat Intel Benchmark")
+    print("=" * 50)
+    print(f"Indicators:           {INDICATOR_COUNT:,} ({', '.join(f'{k}={v}' for k, v in engine.counts.items() if v)})")
+    print(f"Compile time:         {compile_seconds:.2f}s")
+    print(f"Payload size:         {PAYLOAD_PROCESSES} processes, {PAYLOAD_CONNECTIONS} connections")
+    print(f"Match per payload:    median {statistics.median(timings) * 1000:.2f}ms, "
+          f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:.2f}ms")
+    print(f"Per process:          {statistics.median(timings) / PAYLOAD_PROCESSES * 1e6:.1f}us")
+    print(f"Matches (random hits): {match_count}")
+
+
+if __name__ == "__main__":
+    main()
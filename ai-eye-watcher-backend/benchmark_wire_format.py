@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+AI-Eye Watcher wire format benchmark
+Compares plain JSON telemetry with the columnar encodings in
+telemetry_codec: bytes on the wire (raw and compressed) and the server's
+cost to turn a body into a validated TelemetryPayload. Consecutive
+snapshots of a host keep most processes' metrics unchanged (--churn sets
+the fraction that change), as idle processes do on a real host.
+
+Usage:
+    python benchmark_wire_format.py --processes 400 --connections 60 --churn 0.2
+"""
+
+import os
+import gzip
+import json
+import time
+import random
+import argparse
+import statistics
+import tempfile
+
+import telemetry_codec
+from benchmark_server import TelemetryGenerator
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd sizes are reported as n/a without it
+    zstandard = None
+
+
+def snapshots(processes: int, connections: int, churn: float, count: int, seed: int):
+    """Successive snapshots of one host, with `churn` of the processes' metrics changing each time."""
+    generator = TelemetryGenerator(hosts=1, processes=processes, connections=connections, bad_rate=0, seed=seed)
+    rng = random.Random(seed)
+    previous = generator.payload()
+    result = [previous]
+    for _ in range(count - 1):
+        current = generator.payload()
+        current["processes"] = [
+            new if rng.random() < churn else old
+            for old, new in zip(previous["processes"], current["processes"])
+        ]
+        result.append(current)
+        previous = current
+    return result
+
+
+def sizes(body: bytes) -> str:
+    zstd = len(zstandard.ZstdCompressor(level=3).compress(body)) if zstandard else None
+    return (f"{len(body):>8,} raw  {len(gzip.compress(body, compresslevel=6)):>7,} gzip  "
+            f"{zstd if zstd is not None else 'n/a':>7} zstd")
+
+
+def median_ms(decode, bodies) -> float:
+    timings = []
+    for body in bodies:
+        started = time.perf_counter()
+        decode(body)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI-Eye Watcher wire format benchmark")
+    parser.add_argument("--processes", type=int, default=400)
+    parser.add_argument("--connections", type=int, default=60)
+    parser.add_argument("--churn", type=float, default=0.2, help="Fraction of processes whose metrics change per snapshot")
+    parser.add_argument("--snapshots", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # The server keeps an event store in the working directory
+    os.chdir(tempfile.mkdtemp(prefix="aieye-wire-"))
+    import central_server
+
+    payloads = snapshots(args.processes, args.connections, args.churn, args.snapshots, args.seed)
+    model = central_server.TelemetryPayload
+
+    print("AI-Eye Watcher Wire Format Benchmark")
+    print("=" * 50)
+    print(f"Payload: {args.processes} processes, {args.connections} connections, "
+          f"{args.churn:.0%} of processes changing per snapshot")
+    json_bodies = [json.dumps(payload).encode() for payload in payloads]
+    print(f"  {'application/json':<40} {sizes(json_bodies[-1])}")
+    json_ms = median_ms(model.model_validate_json, json_bodies)
+    print(f"  {'':<40} parse {json_ms:.2f}ms")
+
+    for content_type in telemetry_codec.supported_content_types():
+        bodies = [telemetry_codec.dumps(telemetry_codec.encode(payload), content_type) for payload in payloads]
+
+        def decode(body):
+            return central_server.decode_columnar(telemetry_codec.loads(body, content_type), model)
+
+        def decode_cold(body):
+            central_server.columnar_row_cache.clear()
+            return decode(body)
+
+        cold_ms = median_ms(decode_cold, bodies)
+        steady_ms = median_ms(decode, bodies)
+        print(f"  {content_type:<40} {sizes(bodies[-1])}")
+        print(f"  {'':<40} parse {cold_ms:.2f}ms first snapshot, {steady_ms:.2f}ms steady "
+              f"({json_ms / steady_ms:.1f}x JSON)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,96 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from fastapi.responses import StreamingResponse, RedirectResponse, JSONResponse
+from pydantic import BaseModel, ValidationError
+import httpx
+from typing import List, Dict, Any, Optional, Callable
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+import asyncio
 import datetime
+import os
+import json
+import logging
+import threading
+import time
+import uuid
+import zlib
+
+from alert_index import AlertIndex
+from alert_aggregator import AlertAggregator
+from connection_index import ConnectionIndex
+from process_tree import ProcessTrees
+from metric_rollups import MetricRollups, RESOLUTIONS
+from host_baselines import HostBaselines
+from dashboard_stats import DashboardCounters
+from live_stream import LiveStream, format_sse
+from threat_intel import Indicator, ThreatIntel
+from event_store import SegmentedEventStore
+from ingest_pipeline import IngestPipeline, PipelineFull
+from metrics import Registry, Counter, Gauge, Histogram
+import telemetry_codec
+from state_backend import BackendError, create_backend, owner
+
+try:
+    import zstandard
+except ImportError:  # Optional: zstd-encoded batches are rejected without it
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Shared state for running several workers (one process each, on one or
+# more nodes). "local" keeps all state in this process; a redis:// URL
+# points at Redis or at state_broker.py. Each worker advertises WORKER_URL,
+# and every host is owned by one worker (rendezvous hashing over the live
+# workers): requests for a host reaching another worker are redirected to it.
+STATE_BACKEND_URL = os.environ.get("AIEYE_STATE_BACKEND", "local")
+WORKER_URL = os.environ.get("AIEYE_WORKER_URL", "http://localhost:9000")
+WORKER_ID = urlparse(WORKER_URL).netloc
+CLUSTER_SYNC_INTERVAL = 0.2  # seconds between reads of the cluster log
+CLUSTER_HEARTBEAT_INTERVAL = 2.0  # seconds; a worker silent for 10s is considered gone
+CLUSTER_QUERY_TIMEOUT = 5.0  # seconds to wait for other workers' parts of a fleet-wide query
+state_backend = create_backend(STATE_BACKEND_URL)
+# Backend calls may go over the network, so the event loop hands them to
+# one thread: the backend has a single connection anyway, and one thread
+# keeps published log entries in order.
+backend_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-backend")
+
+
+async def backend_call(call: Callable[..., Any], *args) -> Any:
+    """Run a state backend call off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(backend_executor, call, *args)
+
+
+def publish_entry(entry: Dict[str, Any]):
+    """Append an entry to the cluster log without waiting for it; failures are logged."""
+    if state_backend.shared:
+        backend_executor.submit(publish_now, entry)
+
+
+def publish_now(entry: Dict[str, Any]):
+    try:
+        state_backend.publish(entry)
+    except BackendError as e:
+        logger.warning(f"Publishing {entry['type']} to the cluster log failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = [asyncio.create_task(network_analysis()), asyncio.create_task(count_pending_commands())]
+    if state_backend.shared:
+        tasks.append(asyncio.create_task(cluster_sync()))
+    yield
+    for task in tasks:
+        task.cancel()
+    backend_executor.shutdown()
+    state_backend.close()
+
 
 # Initialize FastAPI app
-app = FastAPI(title="AI-Eye Watcher Central Server", version="1.0.0")
+app = FastAPI(title="AI-Eye Watcher Central Server", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware to allow frontend connections
 app.add_middleware(
@@ -15,24 +99,553 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Pagination cursor for list endpoints
+)
+
+# Persistent event log. Its newest HOT_CACHE_EVENTS events are held in
+# memory (as CompactEvents) and serve recent pages of /api/v1/events.
+# With a shared state backend each worker logs the events of the hosts it
+# owns to its own subdirectory.
+EVENT_STORE_DIR = "event_store"
+if state_backend.shared:
+    EVENT_STORE_DIR = os.path.join(EVENT_STORE_DIR, WORKER_ID.replace(":", "-"))
+EVENT_RETENTION_SECONDS = 7 * 24 * 3600  # Drop events older than a week
+EVENT_RETENTION_BYTES = 1024 * 1024 * 1024  # ...or once the log exceeds 1 GB
+HOT_CACHE_EVENTS = 1000
+event_store = SegmentedEventStore(
+    EVENT_STORE_DIR,
+    retention_seconds=EVENT_RETENTION_SECONDS,
+    retention_bytes=EVENT_RETENTION_BYTES,
+    cache_events=HOT_CACHE_EVENTS
 )
 
 # Global in-memory data stores
-recent_events = deque(maxlen=1000)  # Store last 1000 events
-recent_alerts = deque(maxlen=100)   # Store last 100 alerts
-pending_commands: Dict[str, List[Dict[str, Any]]] = {}  # Commands keyed by hostname
+recent_events = deque(maxlen=HOT_CACHE_EVENTS)  # Hostnames of the hot cache's events, for the dashboard
+recent_alerts = deque(maxlen=100)   # Store last 100 alerts, from every worker
+# Pending commands are kept by state_backend, keyed by hostname
+
+# Metrics served at /metrics in the Prometheus text format, per worker.
+# Hot paths record into counters and histograms; everything the server
+# already keeps count of is read by a callback when scraped.
+PAYLOAD_SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+PAYLOAD_PROCESS_BUCKETS = (10, 50, 100, 200, 300, 500, 1000, 2000, 5000)
+COMMAND_DELIVERY_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 15, 30, 60, 120, 300, 600)
+metrics_registry = Registry()
+ingest_stage_seconds = Histogram(metrics_registry, "aieye_ingest_stage_seconds",
+                                 "Time spent per payload in each ingest stage", labelnames=("stage",))
+ingest_queue_wait_seconds = Histogram(metrics_registry, "aieye_ingest_queue_wait_seconds",
+                                      "Time payloads wait in the ingest queue")
+payload_bytes = Histogram(metrics_registry, "aieye_payload_bytes", "Request body size of telemetry uploads",
+                          buckets=PAYLOAD_SIZE_BUCKETS, labelnames=("endpoint",))
+payload_processes = Histogram(metrics_registry, "aieye_payload_processes", "Processes per telemetry snapshot",
+                              buckets=PAYLOAD_PROCESS_BUCKETS)
+hot_cache_evictions = Counter(metrics_registry, "aieye_hot_cache_evictions_total",
+                              "Events and alerts evicted from the in-memory buffers", labelnames=("buffer",))
+alerts_total = Counter(metrics_registry, "aieye_alerts_total", "Alerts raised by this worker",
+                       labelnames=("finding_type", "severity"))
+alert_repeats_total = Counter(metrics_registry, "aieye_alert_repeats_total",
+                              "Detections coalesced into an open alert", labelnames=("finding_type",))
+command_delivery_seconds = Histogram(metrics_registry, "aieye_command_delivery_seconds",
+                                     "Time from a command being queued to an agent receiving it",
+                                     buckets=COMMAND_DELIVERY_BUCKETS)
+Gauge(metrics_registry, "aieye_hot_cache_items", "Items in the in-memory buffers", labelnames=("buffer",),
+      callback=lambda: {("events",): len(recent_events), ("alerts",): len(recent_alerts)})
+Gauge(metrics_registry, "aieye_hot_cache_capacity", "Capacity of the in-memory buffers", labelnames=("buffer",),
+      callback=lambda: {("events",): recent_events.maxlen, ("alerts",): recent_alerts.maxlen})
+Gauge(metrics_registry, "aieye_ingest_queue_depth", "Payloads waiting in the ingest queue",
+      callback=lambda: ingest_pipeline.depth)
+Counter(metrics_registry, "aieye_ingest_payloads_total", "Payloads by ingest outcome", labelnames=("outcome",),
+        callback=lambda: {("accepted",): ingest_pipeline.accepted, ("rejected",): ingest_pipeline.rejected,
+                          ("invalid",): ingest_pipeline.invalid, ("errors",): ingest_pipeline.errors})
+Gauge(metrics_registry, "aieye_pending_commands", "Outstanding commands per host", labelnames=("host",),
+      callback=lambda: pending_command_counts)
+Gauge(metrics_registry, "aieye_open_alerts", "Open alert incidents", callback=lambda: len(alert_aggregator))
+Gauge(metrics_registry, "aieye_event_store_bytes", "Size of the persistent event log",
+      callback=lambda: event_store.stats()["bytes"])
 
-# Known bad processes for threat intel matching
+# Upper bound on a decompressed /api/v1/collect/batch body
+MAX_BATCH_BYTES = 64 * 1024 * 1024
+
+# Ingest pipeline: payloads are queued and detection runs on worker threads,
+# keeping the event loop free for other requests. A full queue answers 429.
+INGEST_QUEUE_SIZE = 1000  # payloads waiting for detection
+INGEST_WORKERS = 2
+INGEST_BATCH_SIZE = 32  # payloads a worker takes from the queue at once
+ingest_pipeline = IngestPipeline(INGEST_QUEUE_SIZE, INGEST_WORKERS, INGEST_BATCH_SIZE,
+                                 on_wait=ingest_queue_wait_seconds.observe,
+                                 invalid=(HTTPException, RequestValidationError))
+
+# Longest an agent may park on /api/v1/commands waiting for a command
+MAX_COMMAND_WAIT = 60  # seconds
+
+# Command delivery: a polled command is leased to the agent and handed out
+# again if no result is reported within COMMAND_LEASE_SECONDS. Commands
+# without a result expire after COMMAND_TTL_SECONDS; until then a detection
+# repeating an outstanding (or failed) command queues nothing new.
+COMMAND_LEASE_SECONDS = 60
+COMMAND_TTL_SECONDS = 600
+COMMAND_RESULT_STATUSES = ("succeeded", "failed")
+
+# Live stream (/api/v1/stream) pacing
+STREAM_STATS_INTERVAL = 1.0  # seconds between stats deltas
+STREAM_HEARTBEAT_INTERVAL = 15.0  # seconds of silence before a keep-alive comment
+STREAM_SNAPSHOT_ALERTS = 100  # alerts sent in a stream snapshot
+
+# Known bad processes for threat intel matching, always loaded in addition
+# to the indicators in THREAT_INTEL_FILE
 KNOWN_BAD_PROCESSES = {'nc.exe', 'mimikatz.exe', 'evil.sh', 'netcat', 'ncat'}
+THREAT_INTEL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "threat_intel.csv")
+threat_intel = ThreatIntel(
+    THREAT_INTEL_FILE,
+    builtin=[Indicator("process_name", name) for name in KNOWN_BAD_PROCESSES]
+)
+
+# Anomaly detection against per-host behavioural baselines (process names,
+# parent/child pairs, remote endpoints per process), kept in a fixed memory
+# budget by host_baselines. A host is only checked once it has sent
+# ANOMALY_WARMUP_EVENTS snapshots, so a newly enrolled host doesn't flag
+# everything; what it hasn't done for one to two BASELINE_DECAY_SECONDS
+# periods is forgotten. With BASELINE_MIN_FLEET hosts profiled, a new process
+# or pair already running on BASELINE_RARE_PREVALENCE of the fleet isn't
+# flagged and a rarer one is raised to MEDIUM.
+ANOMALY_WARMUP_EVENTS = 10
+BASELINE_MAX_HOSTS = 20000
+BASELINE_DECAY_SECONDS = 7 * 86400
+BASELINE_MIN_FLEET = 20
+BASELINE_RARE_PREVALENCE = 0.05
+BASELINE_MAX_ENDPOINT_DIVERSITY = 256  # distinct endpoints beyond which new ones aren't flagged
+host_baselines = HostBaselines(
+    max_hosts=BASELINE_MAX_HOSTS,
+    max_age=BASELINE_DECAY_SECONDS,
+    warmup_snapshots=ANOMALY_WARMUP_EVENTS,
+    min_fleet=BASELINE_MIN_FLEET,
+    rare_prevalence=BASELINE_RARE_PREVALENCE,
+    max_endpoint_diversity=BASELINE_MAX_ENDPOINT_DIVERSITY
+)
+
+
+def observe_baseline(event_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Score a stored-form event against its host's baseline and learn from it.
+    Processes the agent saw start count along with the snapshot's.
+    """
+    processes = [(proc["pid"], proc.get("ppid"), proc["name"].lower()) for proc in event_data.get("processes", ())]
+    in_snapshot = {pid for pid, _, _ in processes}
+    processes += [(proc["pid"], proc.get("ppid"), proc["name"].lower())
+                  for proc in event_data.get("process_events", ())
+                  if proc.get("event") == "exec" and proc["pid"] not in in_snapshot]
+    connections = [(conn.get("pid"), conn.get("remote_address"), conn.get("remote_port"))
+                   for conn in event_data.get("connections") or ()]
+    return host_baselines.observe(event_data["hostname"], processes, connections)
+
+
+# Connection analytics: an index of which hosts connected to which remote
+# addresses, in CONNECTION_BUCKET_SECONDS buckets over the retention window.
+# A public address no other host has contacted raises a rare destination
+# alert (once the index has run for RARE_DESTINATION_WARMUP seconds with
+# RARE_DESTINATION_MIN_FLEET hosts). Every CONNECTION_ANALYSIS_INTERVAL the
+# connection open times are checked for beaconing: BEACON_MIN_OPENS opens at
+# regular intervals, jitter (std / mean) at most BEACON_MAX_JITTER.
+CONNECTION_BUCKET_SECONDS = 300
+CONNECTION_RETENTION_SECONDS = 86400
+CONNECTION_MAX_SERIES = 200000  # (host, address, port) open histories kept
+CONNECTION_ANALYSIS_INTERVAL = 60  # seconds
+RARE_DESTINATION_MIN_FLEET = 20
+RARE_DESTINATION_WARMUP = 3600  # seconds
+BEACON_MIN_OPENS = 6
+BEACON_MAX_JITTER = 0.2
+BEACON_MIN_INTERVAL = 10  # seconds; faster than agents report is indistinguishable from noise
+connection_index = ConnectionIndex(
+    bucket_seconds=CONNECTION_BUCKET_SECONDS,
+    retention=CONNECTION_RETENTION_SECONDS,
+    max_series=CONNECTION_MAX_SERIES,
+    rare_min_fleet=RARE_DESTINATION_MIN_FLEET,
+    rare_warmup=RARE_DESTINATION_WARMUP
+)
+
+
+def observe_connections(event_data: Dict[str, Any], now: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Add a stored-form event's connections to the connection index; returns rare destination findings."""
+    connections = [(conn.get("pid"), conn.get("remote_address"), conn.get("remote_port"), conn.get("local_port"))
+                   for conn in event_data.get("connections") or ()]
+    return connection_index.observe(event_data["hostname"], connections, now)
+
+
+# Process trees for lineage queries, kept for the PROCESS_TREE_MAX_HOSTS most
+# recently reporting hosts (about 140 KB each at 300 processes). Exited
+# processes stay for PROCESS_TREE_RETENTION seconds. A host whose tree was
+# dropped gets it back, minus exited processes, from its next snapshot.
+PROCESS_TREE_MAX_HOSTS = 1000
+PROCESS_TREE_RETENTION = 3600
+process_trees = ProcessTrees(max_hosts=PROCESS_TREE_MAX_HOSTS, retention=PROCESS_TREE_RETENTION)
+
+# Metric rollups: per-host and per-process-name CPU and memory statistics
+# (min/max/avg/p95) at 1m, 5m and 1h resolution, for an hour, a day and a
+# week, so capacity questions don't need the raw snapshots. A process name
+# gets a series on a host once it uses ROLLUP_MIN_CPU percent CPU or
+# ROLLUP_MIN_MEMORY percent memory there. About 28 KB per host and 19 KB
+# per process series, allocated as they appear.
+ROLLUP_MAX_HOSTS = 2000
+ROLLUP_MAX_PROCESS_SERIES = 10000
+ROLLUP_MIN_CPU = 1.0
+ROLLUP_MIN_MEMORY = 1.0
+ROLLUP_RESOLUTIONS = "|".join(name for name, _, _, _ in RESOLUTIONS)
+ROLLUP_MAX_MINUTES = max(seconds * size for _, seconds, size, _ in RESOLUTIONS) // 60
+metric_rollups = MetricRollups(max_hosts=ROLLUP_MAX_HOSTS, max_process_series=ROLLUP_MAX_PROCESS_SERIES,
+                               min_cpu=ROLLUP_MIN_CPU, min_memory=ROLLUP_MIN_MEMORY)
+
+
+# Per-host event and alert rates are kept for the most recently reporting
+# DASHBOARD_MAX_HOSTS hosts, about 2 KB each.
+DASHBOARD_MAX_HOSTS = 20000
+dashboard_counters = DashboardCounters(max_hosts=DASHBOARD_MAX_HOSTS)
+
+
+def persist_event(event_data: Dict[str, Any]):
+    """
+    Append an event to the event store, and so to its hot cache. Runs on the
+    ingest worker thread, so encoding and compacting the payload and writing
+    the segment stay off the event loop.
+    """
+    started = time.perf_counter()
+    event_store.append(event_data)
+    ingest_stage_seconds.observe(time.perf_counter() - started, ("store",))
+
+
+def store_event(event_data: Dict[str, Any], replayed: bool = False):
+    """
+    Count an event that is in the event store's hot cache, keeping the
+    dashboard counters in sync with whatever the bounded deque evicts to
+    make room. The event must already be in the event store.
+    """
+    if len(recent_events) == recent_events.maxlen:
+        evicted = recent_events[0]
+        hot_cache_evictions.inc(labels=("events",))
+        dashboard_counters.event_evicted(evicted)
+    recent_events.append(event_data["hostname"])
+    # Events replayed from the store on startup don't count towards current rates
+    dashboard_counters.event_added(event_data["hostname"], count_rate=not replayed)
+
+# Alert aggregation: a detection repeating an open alert (same host, finding
+# type, process and indicator) within ALERT_SUPPRESSION_WINDOW of its last
+# occurrence updates that alert's last_seen/count instead of adding another.
+ALERT_SUPPRESSION_WINDOW = 900  # seconds
+ALERT_MAX_OPEN = 1000  # open incidents tracked; the least recently seen is closed beyond this
+
+alert_index = AlertIndex()
+alert_aggregator = AlertAggregator(ALERT_SUPPRESSION_WINDOW, ALERT_MAX_OPEN)
+live_stream = LiveStream()
+
+
+def slim_alert(alert: Dict[str, Any]) -> Dict[str, Any]:
+    """Alert without its copy of the original event, for list views and the live stream."""
+    return {key: value for key, value in alert.items() if key != "original_event"}
+
+
+def alert_update(alert: Dict[str, Any]) -> Dict[str, Any]:
+    return {"alert_id": alert["alert_id"], "last_seen": alert["last_seen"], "count": alert["count"]}
+
+
+def record_alert(alert: Dict[str, Any], publish: bool = True) -> Dict[str, Any]:
+    """
+    Record a detection. A repeat of an open alert only updates that alert's
+    last_seen and count; anything else is appended to recent_alerts,
+    keeping alert_index, the aggregator and counters in sync with
+    evictions. Either way the change is published to the other workers
+    (without the original event) unless it came from one of them.
+    
+    Returns:
+        dict: The alert the detection was recorded as
+    """
+    # Another worker has already decided whether its alert is a repeat
+    existing = alert_aggregator.coalesce(alert) if publish else None
+    if existing is not None:
+        alert_repeats_total.inc(labels=(alert["finding_type"],))
+        if publish:
+            publish_entry({"type": "alert_repeat", "worker": WORKER_ID, "key": alert_aggregator.key(existing),
+                           "last_seen": existing["last_seen"], "count": existing["count"]})
+        live_stream.publish("alert", alert_update(existing), event="alert_update")
+        return existing
+    alert_aggregator.open(alert)
+    if publish:
+        alerts_total.inc(labels=(alert["finding_type"], alert["severity"]))
+        publish_entry({"type": "alert", "worker": WORKER_ID, "alert": slim_alert(alert)})
+    if len(recent_alerts) == recent_alerts.maxlen:
+        evicted = recent_alerts[0]
+        hot_cache_evictions.inc(labels=("alerts",))
+        alert_index.remove(evicted)
+        alert_aggregator.close(evicted)
+        dashboard_counters.alert_evicted(evicted)
+    alert_index.add(alert)
+    dashboard_counters.alert_added(alert)
+    recent_alerts.append(alert)
+    live_stream.publish("alert", slim_alert(alert))
+    return alert
+
+
+def parse_time(value: Optional[str], name: str) -> Optional[float]:
+    """Convert an ISO 8601 query parameter to a POSIX timestamp."""
+    if value is None:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid ISO 8601 timestamp for '{name}': {value}")
+
+
+class CommandNotifier:
+    """
+    Per-host asyncio events that wake agents long-polling /api/v1/commands
+    as soon as a command is queued for them. notify() may be called from
+    worker threads; it hands off to the event loop when needed.
+    """
+
+    def __init__(self):
+        self._events: Dict[str, asyncio.Event] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def wait(self, hostname: str, timeout: float) -> bool:
+        """Wait up to timeout seconds for a command; True if one was queued."""
+        self._loop = asyncio.get_running_loop()
+        event = self._events.get(hostname)
+        if event is None:
+            event = self._events[hostname] = asyncio.Event()
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def notify(self, hostname: str):
+        if self._loop is None:
+            return  # No agent has ever long-polled
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._wake(hostname)
+        else:
+            self._loop.call_soon_threadsafe(self._wake, hostname)
+
+    def _wake(self, hostname: str):
+        # Each event is used once, so waiters arriving later get a fresh one
+        event = self._events.pop(hostname, None)
+        if event is not None:
+            event.set()
+
+
+command_notifier = CommandNotifier()
+
+
+def queue_command(hostname: str, command: Dict[str, Any]) -> bool:
+    """
+    Queue a command for a host; called on an ingest worker, since the
+    backend may be remote. A command with the same action and target as
+    one still in effect for the host is dropped; returns whether it was
+    queued. announce_commands() then wakes the agent.
+    """
+    dedup_key = f"{command['action']}:{command['target']}"
+    return state_backend.queue_command(hostname, command, COMMAND_TTL_SECONDS, dedup_key)
+
+
+def announce_commands(hostname: str):
+    """Flag a host as having pending commands and wake any agent long-polling for it, on any worker."""
+    publish_entry({"type": "command_queued", "worker": WORKER_ID, "host": hostname})
+    dashboard_counters.commands_pending(hostname, True)
+    command_notifier.notify(hostname)
+
+
+async def settle_commands(hostname: str):
+    """Clear a host's pending-commands flag, on every worker, once nothing is outstanding."""
+    if hostname not in dashboard_counters.pending_command_hosts:
+        return
+    if not await backend_call(state_backend.outstanding_commands, hostname):
+        dashboard_counters.commands_pending(hostname, False)
+        publish_entry({"type": "commands_settled", "worker": WORKER_ID, "host": hostname})
+
+
+# Outstanding commands of each host flagged as having some, for /metrics;
+# counted in the background so a scrape makes no backend calls
+PENDING_COMMANDS_INTERVAL = 15.0  # seconds
+pending_command_counts: Dict[tuple, int] = {}
+
+
+def count_outstanding(hostnames: List[str]) -> Dict[tuple, int]:
+    counts = {(hostname,): state_backend.outstanding_commands(hostname) for hostname in hostnames}
+    return {labels: count for labels, count in counts.items() if count}
+
+
+async def count_pending_commands():
+    """Background task: refresh pending_command_counts."""
+    global pending_command_counts
+    while True:
+        try:
+            pending_command_counts = await backend_call(count_outstanding,
+                                                        list(dashboard_counters.pending_command_hosts))
+        except BackendError as e:
+            logger.warning(f"Counting pending commands failed: {e}")
+        await asyncio.sleep(PENDING_COMMANDS_INTERVAL)
+
+
+cluster_workers: Dict[str, Dict[str, Any]] = {}  # Live workers' heartbeat info, by worker id
+
+
+def worker_info() -> Dict[str, Any]:
+    """This worker's heartbeat: where to reach it, and the event figures only it knows."""
+    return {
+        "url": WORKER_URL,
+        "stats": {
+            "event_count": len(recent_events),
+            "unique_hosts": len(dashboard_counters.host_events),
+            "events_last_5_minutes": dashboard_counters.events_per_minute.total(5)
+        }
+    }
+
+
+def apply_log_entry(entry: Dict[str, Any]):
+    """Replay another worker's change into this worker's indexes and counters."""
+    if entry.get("worker") == WORKER_ID:
+        return
+    kind = entry.get("type")
+    if kind == "alert":
+        record_alert(entry["alert"], publish=False)
+    elif kind == "alert_repeat":
+        alert = alert_aggregator.update(tuple(entry["key"]), entry["last_seen"], entry["count"])
+        if alert is not None:
+            live_stream.publish("alert", alert_update(alert), event="alert_update")
+    elif kind == "command_queued":
+        dashboard_counters.commands_pending(entry["host"], True)
+        command_notifier.notify(entry["host"])
+    elif kind == "commands_settled":
+        dashboard_counters.commands_pending(entry["host"], False)
+
+
+async def cluster_sync():
+    """
+    Background task for shared backends: heartbeat this worker, refresh the
+    live worker list, and replay the cluster log. Backend calls run on
+    backend_executor; the log is applied on the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    cursor = None
+    next_heartbeat = 0.0
+    while True:
+        try:
+            if cursor is None:
+                cursor = await backend_call(state_backend.log_position)
+            if loop.time() >= next_heartbeat:
+                next_heartbeat = loop.time() + CLUSTER_HEARTBEAT_INTERVAL
+                await backend_call(state_backend.heartbeat, WORKER_ID, worker_info())
+                workers = await backend_call(state_backend.workers)
+                cluster_workers.clear()
+                cluster_workers.update(workers)
+            entries, cursor = await backend_call(state_backend.read_log, cursor)
+            for entry in entries:
+                apply_log_entry(entry)
+        except BackendError as e:
+            logger.warning(f"Cluster sync failed: {e}")
+            await asyncio.sleep(1.0)
+        await asyncio.sleep(CLUSTER_SYNC_INTERVAL)
+
+
+async def network_analysis():
+    """Background task: look for beaconing in the connection index and raise alerts for it."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(CONNECTION_ANALYSIS_INTERVAL)
+        try:
+            findings = await loop.run_in_executor(
+                None, lambda: connection_index.analyze(min_opens=BEACON_MIN_OPENS, max_jitter=BEACON_MAX_JITTER,
+                                                       min_interval=BEACON_MIN_INTERVAL))
+        except Exception:
+            logger.exception("Connection analysis failed")
+            continue
+        for finding in findings:
+            endpoint = f"{finding['address']}:{finding['port']}"
+            rare = ", an address no other host has contacted" if finding["rare"] else ""
+            record_alert({
+                "finding_type": "network_beaconing",
+                "severity": "HIGH" if finding["rare"] else "MEDIUM",
+                "timestamp": datetime.datetime.now().isoformat(),
+                "details": (f"Connections to {endpoint} opened every {finding['interval_seconds']}s "
+                            f"(jitter {finding['jitter']:.0%}, {finding['opens']} opens){rare}."),
+                "host": finding["host"],
+                "process_pid": finding["pid"],
+                "endpoint": endpoint,
+                "beacon": {key: finding[key] for key in ("interval_seconds", "jitter", "opens")}
+            })
+
+
+async def gather_from_workers(path: str, params: Dict[str, Any]) -> List[Any]:
+    """
+    GET path from every other live worker, for queries over data each
+    worker only holds for its own hosts. Workers that fail to answer are
+    logged and left out.
+    """
+    urls = [info["url"].rstrip("/") + path for worker_id, info in cluster_workers.items() if worker_id != WORKER_ID]
+    if not urls:
+        return []
+    async with httpx.AsyncClient(timeout=CLUSTER_QUERY_TIMEOUT) as client:
+        responses = await asyncio.gather(*(client.get(url, params=params) for url in urls), return_exceptions=True)
+    results = []
+    for url, response in zip(urls, responses):
+        if isinstance(response, Exception) or response.status_code != 200:
+            logger.warning(f"Cluster query {url} failed: {response}")
+            continue
+        results.append(response.json())
+    return results
+
+
+def owner_redirect(request: Request, hostname: Optional[str]) -> Optional[RedirectResponse]:
+    """307 to the worker that owns hostname, or None when it is this worker (or unknown)."""
+    if not hostname or not state_backend.shared or WORKER_ID not in cluster_workers:
+        return None
+    owner_id = owner(hostname, list(cluster_workers))
+    if owner_id == WORKER_ID:
+        return None
+    target = cluster_workers[owner_id]["url"].rstrip("/") + request.url.path
+    if request.url.query:
+        target += "?" + request.url.query
+    return RedirectResponse(target, status_code=307)
+
+
+@app.exception_handler(BackendError)
+async def backend_error_handler(request: Request, exc: BackendError):
+    return JSONResponse(status_code=503, content={"detail": f"State backend unavailable: {exc}"})
+
+
+def warm_hot_cache():
+    """Reload the hot cache (and the indexes derived from it) from the event store, and relearn baselines from it."""
+    for event in event_store.recent(recent_events.maxlen):
+        store_event(event, replayed=True)
+        observe_baseline(event)
+        received_at = event.get("received_at")
+        received_at = datetime.datetime.fromisoformat(received_at).timestamp() if received_at else None
+        observe_connections(event, received_at)
+        process_trees.update(event["hostname"], event.get("processes") or [], event.get("process_events") or [],
+                             received_at)
+        metric_rollups.observe(event["hostname"], event.get("processes") or [], event.get("system_info"), received_at)
+
+
+warm_hot_cache()
 
 # Pydantic Models
 class ProcessEvent(BaseModel):
     pid: int
+    create_time: Optional[float] = None
     name: str
     command_line: Optional[str] = None
     user: Optional[str] = None
     cpu_percent: Optional[float] = None
     memory_percent: Optional[float] = None
+    sha256: Optional[str] = None  # Executable hash, matched against sha256 indicators
+    ppid: Optional[int] = None
+
+class ProcessLifecycleEvent(ProcessEvent):
+    """A process start ("exec") or exit ("exit") captured by the agent between snapshots."""
+    event: str
+    timestamp: float
 
 class ConnectionEvent(BaseModel):
     local_address: str
@@ -48,6 +661,42 @@ class TelemetryPayload(BaseModel):
     processes: List[ProcessEvent]
     connections: Optional[List[ConnectionEvent]] = []
     system_info: Optional[Dict[str, Any]] = {}
+    sequence: Optional[int] = None  # Set by delta-capable agents to establish a baseline
+    process_events: List[ProcessLifecycleEvent] = []  # Starts/exits since the previous payload
+    agent_health: Optional[Dict[str, Any]] = None  # The agent's phase timings and backlog
+
+class ProcessKey(BaseModel):
+    pid: int
+    create_time: Optional[float] = None
+
+class ProcessChange(BaseModel):
+    """A changed process; only the fields that changed are sent."""
+    pid: int
+    create_time: Optional[float] = None
+    name: Optional[str] = None
+    command_line: Optional[str] = None
+    user: Optional[str] = None
+    cpu_percent: Optional[float] = None
+    memory_percent: Optional[float] = None
+    ppid: Optional[int] = None
+
+class TelemetryDelta(BaseModel):
+    hostname: str
+    timestamp: str
+    base_sequence: int
+    sequence: int
+    processes_added: List[ProcessEvent] = []
+    processes_removed: List[ProcessKey] = []
+    processes_changed: List[ProcessChange] = []
+    connections_added: List[ConnectionEvent] = []
+    connections_removed: List[ConnectionEvent] = []
+    system_info: Optional[Dict[str, Any]] = None  # None means unchanged
+    process_events: List[ProcessLifecycleEvent] = []  # Not part of the baseline; passed through
+    agent_health: Optional[Dict[str, Any]] = None  # Passed through too
+
+class BatchItem(BaseModel):
+    kind: str  # "full" or "delta"
+    payload: Dict[str, Any]
 
 class Command(BaseModel):
     command_id: str
@@ -55,82 +704,525 @@ class Command(BaseModel):
     target: str
     parameters: Optional[Dict[str, Any]] = {}
 
-# API Endpoints
-@app.post("/api/v1/collect")
-async def collect_telemetry(payload: TelemetryPayload):
+class CommandResult(BaseModel):
+    """An agent's report of running a command."""
+    host: str
+    status: str  # "succeeded" or "failed"
+    detail: Optional[str] = None
+    finished_at: Optional[str] = None
+
+def connection_key(conn: ConnectionEvent) -> tuple:
+    return (conn.local_address, conn.local_port, conn.remote_address,
+            conn.remote_port, conn.status, conn.pid)
+
+
+class HostState:
     """
-    Ingestion endpoint for telemetry data.
-    Stores events, performs threat intel checks, and generates alerts/commands.
+    Last known full snapshot of a delta-capable host, keyed the same way
+    the agent keys its deltas: processes by (pid, create_time), connections
+    by their address tuple.
+    """
+
+    def __init__(self, payload: TelemetryPayload):
+        self.sequence = payload.sequence
+        self.processes = {(p.pid, p.create_time): p for p in payload.processes}
+        self.connections = {connection_key(c): c for c in payload.connections or []}
+        self.system_info = payload.system_info or {}
+
+    def apply(self, delta: TelemetryDelta):
+        for key in delta.processes_removed:
+            self.processes.pop((key.pid, key.create_time), None)
+        for proc in delta.processes_added:
+            self.processes[(proc.pid, proc.create_time)] = proc
+        for change in delta.processes_changed:
+            key = (change.pid, change.create_time)
+            current = self.processes.get(key)
+            if current is None:
+                continue
+            # Only the fields the agent actually sent are applied
+            updates = change.model_dump(exclude_unset=True, exclude={"pid", "create_time"})
+            self.processes[key] = current.model_copy(update=updates)
+        for conn in delta.connections_removed:
+            self.connections.pop(connection_key(conn), None)
+        for conn in delta.connections_added:
+            self.connections[connection_key(conn)] = conn
+        if delta.system_info is not None:
+            self.system_info = delta.system_info
+        self.sequence = delta.sequence
+
+    def to_payload(self, hostname: str, timestamp: str,
+                   process_events: Optional[List[ProcessLifecycleEvent]] = None,
+                   agent_health: Optional[Dict[str, Any]] = None) -> TelemetryPayload:
+        # Every part of the state was validated when it arrived
+        return TelemetryPayload.model_construct(
+            hostname=hostname,
+            timestamp=timestamp,
+            processes=list(self.processes.values()),
+            connections=list(self.connections.values()),
+            system_info=self.system_info,
+            sequence=self.sequence,
+            process_events=process_events or [],
+            agent_health=agent_health,
+        )
+
+
+host_states: Dict[str, HostState] = {}  # Delta baselines keyed by hostname
+host_states_lock = threading.Lock()  # Baselines are updated by ingest workers
+
+
+def detect(payload: TelemetryPayload) -> Callable[[], Dict[str, Any]]:
     """
-    # Store the event
+    Detection stage for a full telemetry snapshot: serialize it once,
+    match it against threat intel and score it against the host's
+    baseline, update the host's process tree and the connection index,
+    and append it to the event store. Touches no shared state other than
+    those (which lock themselves), so it can run on an ingest worker thread.
+    
+    Returns:
+        callable: The commit step, which must run on the event loop; it
+                  records alerts and commands, counts the event in the
+                  dashboard and returns the ingest result
+    """
+    hostname = payload.hostname
+    payload_processes.observe(len(payload.processes))
     event_data = payload.model_dump()
     event_data["received_at"] = datetime.datetime.now().isoformat()
-    recent_events.append(event_data)
-    
-    # Basic threat intel check on processes
-    for process in payload.processes:
-        if process.name.lower() in KNOWN_BAD_PROCESSES:
-            # Create alert
-            alert = {
-                "finding_type": "threat_intel_match_process",
-                "severity": "HIGH",
+    alerts: List[Dict[str, Any]] = []
+    commands: List[Dict[str, Any]] = []
+    
+    # Processes the agent saw start since its last scan are checked too, so a
+    # short-lived process is caught even though no snapshot ever contained it
+    snapshot_keys = {(process.pid, process.create_time) for process in payload.processes}
+    started = [event for event in payload.process_events
+               if event.event == "exec" and (event.pid, event.create_time) not in snapshot_keys]
+    
+    started_at = time.perf_counter()
+    process_trees.update(hostname, event_data["processes"], event_data["process_events"])
+    metric_rollups.observe(hostname, event_data["processes"], event_data["system_info"])
+    index_seconds = time.perf_counter() - started_at
+    
+    # Threat intel check on processes and connections, in one pass over the payload.
+    # Alerts share the stored event rather than each dumping the payload again.
+    started_at = time.perf_counter()
+    for match in threat_intel.engine.match(payload.processes + started, payload.connections or []):
+        indicator = match["indicator"]
+        if match["kind"] == "connection":
+            connection = match["item"]
+            alerts.append({
+                "finding_type": "threat_intel_match_connection",
+                "severity": indicator.severity,
                 "timestamp": datetime.datetime.now().isoformat(),
-                "details": f"Known bad process '{process.name}' detected.",
-                "host": payload.hostname,
-                "process_pid": process.pid,
+                "details": (f"Connection to known bad {indicator.type} '{indicator.value}' "
+                            f"({connection.remote_address}:{connection.remote_port})."),
+                "host": hostname,
+                "process_pid": connection.pid,
+                "indicator": indicator.to_dict(),
+                "original_event": event_data
+            })
+            continue
+        
+        process = match["item"]
+        if indicator.type == "process_name":
+            details = f"Known bad process '{process.name}' detected."
+        else:
+            details = f"Process '{process.name}' matched {indicator.type} indicator '{indicator.value}'."
+        # Create alert
+        alert = {
+            "finding_type": "threat_intel_match_process",
+            "severity": indicator.severity,
+            "timestamp": datetime.datetime.now().isoformat(),
+            "details": details,
+            "host": hostname,
+            "process_pid": process.pid,
+            "process_name": process.name,
+            "ancestry": process_trees.ancestry(hostname, process.pid, process.create_time),
+            "indicator": indicator.to_dict(),
+            "original_event": event_data
+        }
+        if isinstance(process, ProcessLifecycleEvent):
+            alert["source"] = "process_event"
+        alerts.append(alert)
+        
+        # Generate kill command; the agent checks create_time so a reused PID is never killed
+        commands.append({
+            "command_id": f"cmd_{uuid.uuid4().hex}",
+            "action": "kill_process",
+            "target": str(process.pid),
+            "parameters": {
                 "process_name": process.name,
-                "original_event": payload.model_dump()
-            }
-            recent_alerts.append(alert)
-            
-            # Generate kill command
-            host_cmds = pending_commands.setdefault(payload.hostname, [])
-            command = {
-                "command_id": f"cmd_{datetime.datetime.now().timestamp()}",
-                "action": "kill_process",
-                "target": str(process.pid),
-                "parameters": {
-                    "process_name": process.name,
-                    "reason": "threat_intel_match"
-                }
-            }
-            host_cmds.append(command)
-    
-    # Basic anomaly check (placeholder)
-    # Check for processes not seen recently
-    recent_process_names = set()
-    for event in list(recent_events)[-50:]:  # Check last 50 events
-        if "processes" in event:
-            for proc in event["processes"]:
-                recent_process_names.add(proc.get("name", "").lower())
-    
-    for process in payload.processes:
-        if process.name.lower() not in recent_process_names and len(recent_events) > 10:
-            alert = {
-                "finding_type": "anomaly_new_process",
-                "severity": "LOW",
-                "timestamp": datetime.datetime.now().isoformat(),
-                "details": f"New/unusual process '{process.name}' detected.",
-                "host": payload.hostname,
-                "process_pid": process.pid,
-                "process_name": process.name
+                "create_time": process.create_time,
+                "reason": "threat_intel_match"
             }
-            recent_alerts.append(alert)
+        })
+    
+    ingest_stage_seconds.observe(time.perf_counter() - started_at, ("threat_match",))
+    
+    # Anomaly check against the host's baseline, which then learns this payload
+    started_at = time.perf_counter()
+    for finding in observe_baseline(event_data):
+        alert = {
+            "finding_type": f"anomaly_new_{finding['kind']}",
+            "severity": "MEDIUM" if finding["rarity"] == "rare" else "LOW",
+            "timestamp": datetime.datetime.now().isoformat(),
+            "host": hostname,
+            "process_pid": finding["pid"],
+            "process_name": finding["name"]
+        }
+        rare = " (rare across the fleet)" if finding["rarity"] == "rare" else ""
+        if finding["kind"] == "process":
+            alert["details"] = f"New/unusual process '{finding['name']}' detected{rare}."
+        elif finding["kind"] == "lineage":
+            alert["details"] = f"Process '{finding['name']}' started by '{finding['parent']}', new for this host{rare}."
+            alert["parent_process_name"] = finding["parent"]
+        else:
+            alert["details"] = f"Process '{finding['name']}' connected to new endpoint {finding['endpoint']}{rare}."
+            alert["endpoint"] = finding["endpoint"]
+        alerts.append(alert)
     
-    return {"status": "processed", "events_stored": len(recent_events)}
+    ingest_stage_seconds.observe(time.perf_counter() - started_at, ("anomaly",))
+    
+    started_at = time.perf_counter()
+    for finding in observe_connections(event_data):
+        alerts.append({
+            "finding_type": "network_rare_destination",
+            "severity": "LOW",
+            "timestamp": datetime.datetime.now().isoformat(),
+            "details": (f"Connection to {finding['address']}:{finding['port']}, "
+                        f"an address no other host has contacted."),
+            "host": hostname,
+            "process_pid": finding["pid"],
+            "endpoint": f"{finding['address']}:{finding['port']}"
+        })
+    ingest_stage_seconds.observe(index_seconds + time.perf_counter() - started_at, ("index",))
+    
+    persist_event(event_data)
+    queued = [command for command in commands if queue_command(hostname, command)]
+    
+    def commit() -> Dict[str, Any]:
+        for alert in alerts:
+            record_alert(alert)
+        if queued:
+            announce_commands(hostname)
+        
+        store_event(event_data)
+        return {"status": "processed", "events_stored": len(recent_events)}
+    
+    return commit
+
+
+def ingest_full(payload: TelemetryPayload) -> Callable[[], Dict[str, Any]]:
+    """Detection stage for a full snapshot; a sequenced one becomes the host's delta baseline."""
+    if payload.sequence is not None:
+        with host_states_lock:
+            host_states[payload.hostname] = HostState(payload)
+    return detect(payload)
+
+
+def ingest_delta(delta: TelemetryDelta) -> Callable[[], Dict[str, Any]]:
+    """Detection stage for a delta: apply it to the host's baseline and detect on the result."""
+    with host_states_lock:
+        state = host_states.get(delta.hostname)
+        if state is None or state.sequence != delta.base_sequence:
+            raise HTTPException(status_code=409, detail="Delta baseline out of sync, full resync required")
+        state.apply(delta)
+        snapshot = state.to_payload(delta.hostname, delta.timestamp, delta.process_events, delta.agent_health)
+        sequence = state.sequence
+    
+    commit = detect(snapshot)
+    
+    def commit_delta() -> Dict[str, Any]:
+        result = commit()
+        result["sequence"] = sequence
+        return result
+    
+    return commit_delta
+
+
+# Validated models from each host's last columnar payload, keyed by
+# (hostname, table, field names) and then by row values. Rows repeated in
+# the next payload (most processes, most cycles) skip validation entirely.
+COLUMNAR_CACHED_TABLES = ("processes", "connections")
+columnar_row_cache: Dict[tuple, Dict[tuple, BaseModel]] = {}
+
+
+def decode_columnar(document: Dict[str, Any], model):
+    """
+    Validate a columnar document (see telemetry_codec) as model.
+
+    Raises:
+        ValueError: the document is malformed
+        ValidationError: the decoded payload is invalid
+    """
+    hostname = document.get("hostname")
+    decoded_rows = {}
+
+    def builder(table: str):
+        def build(names: List[str], rows) -> list:
+            key = (hostname, table, tuple(names))
+            rows = list(rows)
+            decoded_rows[table] = (key, rows)
+            cached = columnar_row_cache.get(key, {})
+            # Cached models pass through validation as-is; new rows are validated as dicts
+            return [cached.get(row) or dict(zip(names, row)) for row in rows]
+        return build
+
+    payload = model.model_validate(telemetry_codec.decode(
+        document, {table: builder(table) for table in COLUMNAR_CACHED_TABLES}
+    ))
+    for table, (key, rows) in decoded_rows.items():
+        columnar_row_cache[key] = dict(zip(rows, getattr(payload, table, None) or []))
+    return payload
+
+
+def parse_body(model, body: bytes, content_type: str = "application/json"):
+    """
+    Validate a raw request body, JSON or columnar per its Content-Type,
+    reporting errors the way FastAPI does.
+    """
+    media_type, columnar = telemetry_codec.parse_content_type(content_type)
+    started = time.perf_counter()
+    try:
+        if not columnar:
+            return model.model_validate_json(body)
+        check_content_type(media_type)
+        return decode_columnar(telemetry_codec.loads(body, media_type), model)
+    except ValidationError as e:
+        raise RequestValidationError([
+            dict(error, loc=("body",) + tuple(error["loc"])) for error in e.errors(include_url=False)
+        ])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed {media_type} body: {e}")
+    finally:
+        ingest_stage_seconds.observe(time.perf_counter() - started, ("parse",))
+
+
+def check_content_type(media_type: str):
+    """415 for a columnar encoding this server can't decode (msgpack not installed)."""
+    if media_type not in telemetry_codec.supported_content_types():
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported Content-Type: {media_type}",
+            headers={"Accept-Post": ", ".join(["application/json"] + telemetry_codec.supported_content_types())}
+        )
+
+
+DECOMPRESSION_ERRORS = (zlib.error, ValueError) + ((zstandard.ZstdError,) if zstandard else ())
+
+
+def decompress_body(body: bytes, encoding: str) -> bytes:
+    """Decode a request body per its Content-Encoding, bounded by MAX_BATCH_BYTES."""
+    encoding = encoding.lower()
+    try:
+        if encoding in ("", "identity"):
+            data = body
+        elif encoding == "gzip":
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            data = decompressor.decompress(body, MAX_BATCH_BYTES + 1)
+        elif encoding == "zstd" and zstandard is not None:
+            reader = zstandard.ZstdDecompressor().stream_reader(body)
+            data = reader.read(MAX_BATCH_BYTES + 1)
+        else:
+            # Accept-Encoding (RFC 7694) tells the client which codings to fall back to
+            raise HTTPException(status_code=415, detail=f"Unsupported Content-Encoding: {encoding}",
+                                headers={"Accept-Encoding": "gzip, zstd" if zstandard else "gzip"})
+    except DECOMPRESSION_ERRORS as e:
+        raise HTTPException(status_code=400, detail=f"Corrupt {encoding} body: {e}")
+    
+    if len(data) > MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail="Decompressed batch too large")
+    return data
+
+def ingest_batch(body: bytes, encoding: str,
+                 content_type: str = "application/json") -> Callable[[], Dict[str, Any]]:
+    """
+    Detection stage for a batch: decode it and run each item's stage in order.
+    With a columnar Content-Type, each item's payload is a columnar document.
+    """
+    media_type, columnar = telemetry_codec.parse_content_type(content_type)
+    if columnar:
+        check_content_type(media_type)
+    started = time.perf_counter()
+    data = decompress_body(body, encoding)
+    try:
+        document = telemetry_codec.loads(data, media_type) if columnar else json.loads(data)
+        items = [BatchItem.model_validate(item) for item in document["items"]]
+    except (ValueError, KeyError, TypeError, ValidationError) as e:
+        raise HTTPException(status_code=400, detail=f"Malformed batch: {e}")
+    ingest_stage_seconds.observe(time.perf_counter() - started, ("parse",))
+    
+    def validate(model, payload: Dict[str, Any]):
+        started = time.perf_counter()
+        try:
+            return decode_columnar(payload, model) if columnar else model.model_validate(payload)
+        finally:
+            ingest_stage_seconds.observe(time.perf_counter() - started, ("parse",))
+    
+    steps = []  # Commit step, or the final result for items that failed detection
+    for item in items:
+        try:
+            if item.kind == "delta":
+                steps.append(ingest_delta(validate(TelemetryDelta, item.payload)))
+            elif item.kind == "full":
+                steps.append(ingest_full(validate(TelemetryPayload, item.payload)))
+            else:
+                steps.append({"status": "invalid", "detail": f"Unknown batch item kind: {item.kind}"})
+        except (ValidationError, ValueError) as e:
+            steps.append({"status": "invalid", "detail": str(e)})
+        except HTTPException as e:
+            steps.append({"status": "resync_required" if e.status_code == 409 else "invalid",
+                          "detail": e.detail})
+    
+    def commit() -> Dict[str, Any]:
+        results = [step() if callable(step) else step for step in steps]
+        return {"status": "processed", "items": len(results), "results": results}
+    
+    return commit
+
+
+async def run_ingest(stage: Callable[[], Callable[[], Dict[str, Any]]]) -> Dict[str, Any]:
+    """Run an ingest stage on the worker pool; 429 with Retry-After when the queue is full."""
+    threat_intel.maybe_reload()
+    try:
+        future = ingest_pipeline.submit(stage)
+    except PipelineFull as e:
+        raise HTTPException(
+            status_code=429,
+            detail="Ingest queue full, retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return await future
+
+# API Endpoints
+@app.post("/api/v1/collect")
+async def collect_telemetry(request: Request):
+    """
+    Ingestion endpoint for telemetry data (a TelemetryPayload).
+    Stores events, performs threat intel checks, and generates alerts/commands.
+    A payload carrying a sequence number also becomes the host's delta baseline.
+    Validation and detection run on the ingest worker pool. The body is JSON,
+    or a columnar document when Content-Type is one of telemetry_codec's.
+    """
+    redirect = owner_redirect(request, request.headers.get("x-agent-host"))
+    if redirect is not None:
+        return redirect
+    body = await request.body()
+    payload_bytes.observe(len(body), ("collect",))
+    content_type = request.headers.get("content-type", "application/json")
+    return await run_ingest(lambda: ingest_full(parse_body(TelemetryPayload, body, content_type)))
+
+@app.post("/api/v1/collect/delta")
+async def collect_telemetry_delta(request: Request):
+    """
+    Delta ingestion endpoint (a TelemetryDelta).
+    Applies the delta to the host's baseline and ingests the reconstructed
+    snapshot. Returns 409 when the baseline is missing or out of sequence,
+    telling the agent to resync with a full payload.
+    """
+    redirect = owner_redirect(request, request.headers.get("x-agent-host"))
+    if redirect is not None:
+        return redirect
+    body = await request.body()
+    payload_bytes.observe(len(body), ("delta",))
+    content_type = request.headers.get("content-type", "application/json")
+    return await run_ingest(lambda: ingest_delta(parse_body(TelemetryDelta, body, content_type)))
+
+@app.post("/api/v1/collect/batch")
+async def collect_telemetry_batch(request: Request):
+    """
+    Batched ingestion endpoint for spooling agents.
+    Accepts a gzip- or zstd-compressed {"items": [{"kind", "payload"}, ...]}
+    body and ingests the items in order, returning a result per item.
+    The body is JSON, or columnar msgpack/JSON per its Content-Type.
+    """
+    redirect = owner_redirect(request, request.headers.get("x-agent-host"))
+    if redirect is not None:
+        return redirect
+    body = await request.body()
+    payload_bytes.observe(len(body), ("batch",))
+    encoding = request.headers.get("content-encoding", "identity")
+    content_type = request.headers.get("content-type", "application/json")
+    return await run_ingest(lambda: ingest_batch(body, encoding, content_type))
 
 @app.get("/api/v1/commands")
-async def get_commands(host: str = Query(..., description="Hostname to get commands for")):
+async def get_commands(
+    request: Request,
+    host: str = Query(..., description="Hostname to get commands for"),
+    wait: float = Query(0, ge=0, le=MAX_COMMAND_WAIT, description="Seconds to wait for a command if none are pending")
+):
     """
     Command polling endpoint for agents.
-    Returns pending commands for the specified host.
+    Returns pending commands for the specified host, each leased to this
+    poll: a command is returned again if its result isn't reported (POST
+    /api/v1/commands/{command_id}/result) within COMMAND_LEASE_SECONDS.
+    With wait > 0 this is a long poll: the request is held until a command
+    is queued for the host or the wait expires, so commands reach agents as
+    soon as they are generated. With a shared state backend, polls for a
+    host owned by another worker are redirected there.
     """
-    if host in pending_commands and pending_commands[host]:
-        commands_to_send = pending_commands[host].copy()
-        pending_commands[host] = []  # Clear commands after sending
-        return commands_to_send
-    
-    return []
+    redirect = owner_redirect(request, host)
+    if redirect is not None:
+        return redirect
+    # Leased atomically, so a command goes to exactly one poll across all workers
+    commands_to_send = await backend_call(state_backend.lease_commands, host, COMMAND_LEASE_SECONDS)
+    if not commands_to_send and wait > 0:
+        await command_notifier.wait(host, wait)
+        if await request.is_disconnected():
+            return []  # Keep the commands for the agent's next poll
+        commands_to_send = await backend_call(state_backend.lease_commands, host, COMMAND_LEASE_SECONDS)
+    if not commands_to_send:
+        await settle_commands(host)  # Outstanding commands may have expired
+    now = time.time()
+    for command in commands_to_send:
+        if not command["redelivered"]:
+            command_delivery_seconds.observe(now - command["queued_at"])
+    return commands_to_send
+
+@app.post("/api/v1/commands/{command_id}/result")
+async def report_command_result(command_id: str, result: CommandResult):
+    """
+    Result endpoint for agents: records how a command went and stops its
+    redelivery. Reporting a result again is accepted and ignored.
+    """
+    if result.status not in COMMAND_RESULT_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Invalid status '{result.status}'; "
+                                                    f"expected one of {', '.join(COMMAND_RESULT_STATUSES)}")
+    command = await backend_call(state_backend.command_status, command_id)
+    if command is None or command["host"] != result.host:
+        raise HTTPException(status_code=404, detail=f"Unknown command {command_id} for host {result.host}")
+    report = result.model_dump()
+    report["reported_at"] = datetime.datetime.now().isoformat()
+    recorded = await backend_call(state_backend.complete_command, command_id, report)
+    if recorded:
+        await settle_commands(result.host)
+    return {"status": "recorded" if recorded else "duplicate", "command_id": command_id}
+
+@app.get("/api/v1/commands/{command_id}")
+async def get_command(command_id: str):
+    """
+    Command status: "pending", "delivered" (leased to an agent), "succeeded",
+    "failed" or "expired", with the agent's result once reported.
+    """
+    command = await backend_call(state_backend.command_status, command_id)
+    if command is None:
+        raise HTTPException(status_code=404, detail=f"Unknown command {command_id}")
+    return command
+
+@app.get("/api/v1/threat-intel")
+async def get_threat_intel():
+    """
+    Threat intel status endpoint.
+    Returns indicator counts per type and when they were last loaded.
+    """
+    return threat_intel.stats()
+
+@app.post("/api/v1/threat-intel/reload")
+async def reload_threat_intel():
+    """
+    Recompile the indicator file in the background.
+    Ingestion keeps using the current indicators until the new set is ready.
+    """
+    started = threat_intel.reload()
+    return {"status": "reloading" if started else "already_reloading"}
 
 @app.get("/api/v1/dashboard/stats")
 async def get_dashboard_stats():
@@ -138,45 +1230,319 @@ async def get_dashboard_stats():
     Dashboard statistics endpoint.
     Returns basic counts and metrics for the UI.
     """
-    # Calculate unique hosts
-    unique_hosts = set()
-    for event in recent_events:
-        if "hostname" in event:
-            unique_hosts.add(event["hostname"])
-    
-    # Calculate alert severity breakdown
-    alert_severity_counts = {"HIGH": 0, "MEDIUM": 0, "LOW": 0}
-    for alert in recent_alerts:
-        severity = alert.get("severity", "LOW")
-        alert_severity_counts[severity] = alert_severity_counts.get(severity, 0) + 1
-    
+    return current_dashboard_stats()
+
+def current_dashboard_stats() -> Dict[str, Any]:
+    # All counts are maintained at ingest/eviction time. Alerts and commands
+    # are replayed from the other workers; their event figures come from
+    # their last heartbeat.
+    events = worker_info()["stats"]
+    if state_backend.shared:
+        for worker_id, info in cluster_workers.items():
+            if worker_id != WORKER_ID:
+                for key, value in info.get("stats", {}).items():
+                    events[key] = events.get(key, 0) + value
     return {
-        "event_count": len(recent_events),
+        "event_count": events["event_count"],
         "alert_count": len(recent_alerts),
-        "unique_hosts": len(unique_hosts),
-        "pending_command_hosts": len([h for h, cmds in pending_commands.items() if cmds]),
-        "alert_severity_breakdown": alert_severity_counts
+        "unique_hosts": events["unique_hosts"],
+        "pending_command_hosts": len(dashboard_counters.pending_command_hosts),
+        "alert_severity_breakdown": dict(dashboard_counters.severity_counts),
+        "events_per_minute": round(events["events_last_5_minutes"] / 5, 1),
+        "alerts_per_minute": round(dashboard_counters.alerts_per_minute.total(5) / 5, 1),
+        "alerts_last_hour": dashboard_counters.alerts_per_minute.total(60)
     }
 
+def stream_snapshot(topics: set) -> str:
+    """Full state for a (re)connecting stream client, tagged with the current sequence."""
+    snapshot = {}
+    if "stats" in topics:
+        snapshot["stats"] = current_dashboard_stats()
+    if "alert" in topics:
+        alerts_list, _ = alert_index.query(limit=STREAM_SNAPSHOT_ALERTS)
+        snapshot["alerts"] = [slim_alert(alert) for alert in alerts_list]
+    return format_sse("snapshot", snapshot, live_stream.sequence)
+
+@app.get("/api/v1/stream")
+async def stream(
+    request: Request,
+    topics: str = Query("alert,stats", description="Comma-separated topics: alert, stats"),
+    since: Optional[int] = Query(None, description="Resume after this sequence number (or send Last-Event-ID)")
+):
+    """
+    Live Server-Sent Events stream for the UI.
+    Starts with a 'snapshot' event (recent alerts and full stats), then pushes
+    'alert' events as alerts are recorded and 'stats' events holding only the
+    stats fields that changed. Reconnecting clients resume from Last-Event-ID;
+    if that is too old, or the client falls too far behind, a new snapshot is sent.
+    """
+    wanted = {topic.strip() for topic in topics.split(",")} & {"alert", "stats"}
+    last_id = request.headers.get("last-event-id")
+    last_id = int(last_id) if last_id and last_id.isdigit() else since
+    
+    # Subscribing and replaying/snapshotting happen without yielding to the
+    # event loop, so no alert is missed or delivered twice in between
+    subscriber = live_stream.subscribe(wanted)
+    initial = None
+    if last_id is None or not live_stream.replay(subscriber, last_id):
+        subscriber.reset()
+        initial = stream_snapshot(wanted)
+    
+    async def events():
+        try:
+            if initial is not None:
+                yield initial
+            last_stats = current_dashboard_stats()
+            loop = asyncio.get_running_loop()
+            last_stats_time = last_sent_time = loop.time()
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), timeout=STREAM_STATS_INTERVAL)
+                except asyncio.TimeoutError:
+                    message = None
+                if subscriber.overflowed:
+                    # Client fell behind: replace the backlog with a snapshot
+                    subscriber.reset()
+                    last_stats = current_dashboard_stats()
+                    message = stream_snapshot(wanted)
+                if message is not None:
+                    last_sent_time = loop.time()
+                    yield message
+                
+                now = loop.time()
+                if "stats" in wanted and now - last_stats_time >= STREAM_STATS_INTERVAL:
+                    last_stats_time = now
+                    stats = current_dashboard_stats()
+                    changed = {key: value for key, value in stats.items() if last_stats.get(key) != value}
+                    if changed:
+                        last_stats = stats
+                        last_sent_time = now
+                        yield format_sse("stats", changed)
+                if now - last_sent_time >= STREAM_HEARTBEAT_INTERVAL:
+                    last_sent_time = now
+                    yield ": keep-alive\n\n"
+        finally:
+            live_stream.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/v1/dashboard/timeseries")
+async def get_dashboard_timeseries(
+    minutes: int = Query(60, ge=1, le=60, description="Number of minutes of history"),
+    host: Optional[str] = Query(None, description="Only count events and alerts for this host")
+):
+    """
+    Dashboard trend endpoint.
+    Returns per-minute event and alert counts, oldest first, overall or for one host.
+    """
+    return dashboard_counters.timeseries(minutes, host)
+
 @app.get("/api/v1/alerts")
-async def get_alerts():
+async def get_alerts(
+    response: Response,
+    host: Optional[str] = Query(None, description="Only alerts for this host"),
+    severity: Optional[str] = Query(None, description="Only alerts of this severity (CRITICAL, HIGH, MEDIUM, LOW)"),
+    finding_type: Optional[str] = Query(None, description="Only alerts of this finding type"),
+    since: Optional[str] = Query(None, description="Only alerts recorded at or after this ISO 8601 time"),
+    until: Optional[str] = Query(None, description="Only alerts recorded at or before this ISO 8601 time"),
+    cursor: Optional[int] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of alerts to return"),
+    include_event: bool = Query(True, description="Include each alert's copy of the original event")
+):
     """
     Alerts endpoint for the UI.
-    Returns recent alerts in reverse chronological order.
+    Returns recent alerts in reverse chronological order, optionally filtered.
+    When more alerts match, the X-Next-Cursor header holds the cursor for the next page.
     """
-    alerts_list = list(recent_alerts)
-    alerts_list.reverse()  # Most recent first
+    alerts_list, next_cursor = alert_index.query(
+        host=host,
+        severity=severity.upper() if severity else None,
+        finding_type=finding_type,
+        since=parse_time(since, "since"),
+        until=parse_time(until, "until"),
+        before=cursor,
+        limit=limit
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = str(next_cursor)
+    if not include_event:
+        return [slim_alert(alert) for alert in alerts_list]
     return alerts_list
 
 @app.get("/api/v1/events")
-async def get_events(limit: int = Query(50, description="Number of recent events to return")):
+async def get_events(
+    request: Request,
+    response: Response,
+    host: Optional[str] = Query(None, description="Only events from this host"),
+    since: Optional[str] = Query(None, description="Only events received at or after this ISO 8601 time"),
+    until: Optional[str] = Query(None, description="Only events received at or before this ISO 8601 time"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    limit: int = Query(50, ge=1, le=1000, description="Number of recent events to return")
+):
     """
     Events endpoint for debugging/monitoring.
-    Returns recent events.
+    Returns recent events from the event store, most recent first, optionally filtered.
+    When more events match, the X-Next-Cursor header holds the cursor for the next page.
+    With a shared state backend each worker stores the events of the hosts it
+    owns, so a host-filtered query is redirected to the host's owner.
     """
-    events_list = list(recent_events)
-    events_list.reverse()  # Most recent first
-    return events_list[:limit]
+    redirect = owner_redirect(request, host)
+    if redirect is not None:
+        return redirect
+    try:
+        events_list, next_cursor = event_store.page(
+            hostname=host,
+            since=parse_time(since, "since"),
+            until=parse_time(until, "until"),
+            limit=limit,
+            before=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return events_list
+
+@app.get("/api/v1/network/destinations/{address}")
+async def get_destination_hosts(
+    address: str,
+    minutes: int = Query(60, ge=1, le=CONNECTION_RETENTION_SECONDS // 60, description="How far back to look"),
+    local: bool = Query(False, description="Only this worker's hosts (used between cluster workers)")
+):
+    """
+    Hosts that connected to a remote address in the last `minutes`, most
+    recent first, from the connection index. Each lists the ports and PIDs
+    involved and the time buckets it was active in. With a shared state
+    backend every worker answers for the hosts it owns and the results are
+    merged.
+    """
+    since = datetime.datetime.now().timestamp() - minutes * 60
+    hosts = connection_index.hosts_for(address, since)
+    if state_backend.shared and not local:
+        for result in await gather_from_workers(f"/api/v1/network/destinations/{address}",
+                                                {"minutes": minutes, "local": "true"}):
+            hosts.extend(result["hosts"])
+        hosts.sort(key=lambda host: host["last_seen"], reverse=True)
+    return {"address": address, "since": datetime.datetime.fromtimestamp(since).isoformat(), "hosts": hosts}
+
+@app.get("/api/v1/network/hosts/{hostname}")
+async def get_host_destinations(
+    request: Request,
+    hostname: str,
+    minutes: int = Query(60, ge=1, le=CONNECTION_RETENTION_SECONDS // 60, description="How far back to look")
+):
+    """
+    Remote addresses a host connected to in the last `minutes`, most recent
+    first, with how many hosts have contacted each address. Redirected to
+    the host's owner with a shared state backend.
+    """
+    redirect = owner_redirect(request, hostname)
+    if redirect is not None:
+        return redirect
+    since = datetime.datetime.now().timestamp() - minutes * 60
+    return {"host": hostname, "since": datetime.datetime.fromtimestamp(since).isoformat(),
+            "destinations": connection_index.endpoints_for(hostname, since)}
+
+@app.get("/api/v1/hosts/{hostname}/processes/{pid}")
+async def get_process_lineage(
+    request: Request,
+    hostname: str,
+    pid: int,
+    create_time: Optional[float] = Query(None, description="Process create time, to pick one holder of a reused PID"),
+    depth: int = Query(3, ge=0, le=32, description="Generations of descendants to include")
+):
+    """
+    Process lineage from the host's process tree: the process, its
+    ancestors (parent first) and its descendants up to `depth`
+    generations, each with its depth. Without create_time, the running
+    process with this PID (or else the latest to exit) is used.
+    Redirected to the host's owner with a shared state backend.
+    """
+    redirect = owner_redirect(request, hostname)
+    if redirect is not None:
+        return redirect
+    lineage = process_trees.lineage(hostname, pid, create_time, depth)
+    if lineage is None:
+        raise HTTPException(status_code=404, detail=f"Process {pid} not known on host {hostname}")
+    return dict(host=hostname, **lineage)
+
+@app.get("/api/v1/rollups/hosts/{hostname}")
+async def get_host_rollups(
+    request: Request,
+    hostname: str,
+    resolution: str = Query("5m", pattern=f"^({ROLLUP_RESOLUTIONS})$", description="Bucket size"),
+    minutes: int = Query(1440, ge=1, le=ROLLUP_MAX_MINUTES, description="How far back to look")
+):
+    """
+    A host's CPU, memory and available memory statistics per bucket over
+    the last `minutes`, oldest first. Buckets older than the resolution
+    keeps (an hour of 1m, a day of 5m, a week of 1h) are not returned.
+    Redirected to the host's owner with a shared state backend.
+    """
+    redirect = owner_redirect(request, hostname)
+    if redirect is not None:
+        return redirect
+    since = datetime.datetime.now().timestamp() - minutes * 60
+    return {"host": hostname, "resolution": resolution, "since": datetime.datetime.fromtimestamp(since).isoformat(),
+            "buckets": metric_rollups.host_series(hostname, resolution, since)}
+
+@app.get("/api/v1/rollups/hosts/{hostname}/processes/{name}")
+async def get_process_rollups(
+    request: Request,
+    hostname: str,
+    name: str,
+    resolution: str = Query("5m", pattern=f"^({ROLLUP_RESOLUTIONS})$", description="Bucket size"),
+    minutes: int = Query(1440, ge=1, le=ROLLUP_MAX_MINUTES, description="How far back to look")
+):
+    """
+    CPU and memory statistics per bucket of the processes with this name
+    on a host, oldest first. Only names that reached the rollup thresholds
+    have a series. Redirected to the host's owner with a shared state
+    backend.
+    """
+    redirect = owner_redirect(request, hostname)
+    if redirect is not None:
+        return redirect
+    since = datetime.datetime.now().timestamp() - minutes * 60
+    return {"host": hostname, "process_name": name, "resolution": resolution,
+            "since": datetime.datetime.fromtimestamp(since).isoformat(),
+            "buckets": metric_rollups.process_series(hostname, name, resolution, since)}
+
+@app.get("/api/v1/rollups/top")
+async def get_top_processes(
+    request: Request,
+    metric: str = Query("cpu_percent", pattern="^(cpu_percent|memory_percent)$", description="Metric to rank by"),
+    resolution: str = Query("1h", pattern=f"^({ROLLUP_RESOLUTIONS})$", description="Bucket size"),
+    minutes: int = Query(1440, ge=1, le=ROLLUP_MAX_MINUTES, description="How far back to look"),
+    host: Optional[str] = Query(None, description="Only this host's processes"),
+    limit: int = Query(10, ge=1, le=1000, description="Maximum entries to return"),
+    local: bool = Query(False, description="Only this worker's hosts (used between cluster workers)")
+):
+    """
+    Process names with the highest average `metric` over the last
+    `minutes`, per host, with their sample count, maximum and peak p95.
+    With a host, redirected to its owner; otherwise every worker answers
+    for the hosts it owns and the results are merged.
+    """
+    if host is not None:
+        redirect = owner_redirect(request, host)
+        if redirect is not None:
+            return redirect
+    since = datetime.datetime.now().timestamp() - minutes * 60
+    processes = metric_rollups.top(metric, resolution, since, host, limit)
+    if host is None and state_backend.shared and not local:
+        for result in await gather_from_workers("/api/v1/rollups/top",
+                                                {"metric": metric, "resolution": resolution, "minutes": minutes,
+                                                 "limit": limit, "local": "true"}):
+            processes.extend(result["processes"])
+        processes.sort(key=lambda process: process["avg"], reverse=True)
+        del processes[limit:]
+    return {"metric": metric, "resolution": resolution, "since": datetime.datetime.fromtimestamp(since).isoformat(),
+            "processes": processes}
 
 # Root endpoint
 @app.get("/")
@@ -188,14 +1554,29 @@ async def root():
         "status": "running",
         "endpoints": {
             "dashboard_stats": "/api/v1/dashboard/stats",
+            "dashboard_timeseries": "/api/v1/dashboard/timeseries",
+            "stream": "/api/v1/stream",
+            "threat_intel": "/api/v1/threat-intel",
             "alerts": "/api/v1/alerts",
             "events": "/api/v1/events",
+            "network": "/api/v1/network/destinations/{address}",
+            "process_lineage": "/api/v1/hosts/{hostname}/processes/{pid}",
+            "rollups": "/api/v1/rollups/top",
             "commands": "/api/v1/commands",
             "health": "/health",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """
+    This worker's metrics in the Prometheus text exposition format; in a
+    cluster, scrape every worker.
+    """
+    return Response(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -203,7 +1584,20 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.datetime.now().isoformat(),
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "event_store": event_store.stats(),
+        "ingest": ingest_pipeline.stats(),
+        "alerts": alert_aggregator.stats(),
+        "baselines": host_baselines.stats(),
+        "connections": connection_index.stats(),
+        "process_trees": process_trees.stats(),
+        "rollups": metric_rollups.stats(),
+        "telemetry_content_types": ["application/json"] + telemetry_codec.supported_content_types(),
+        "cluster": {
+            "worker_id": WORKER_ID,
+            "state_backend": state_backend.stats(),
+            "workers": {worker_id: info["url"] for worker_id, info in cluster_workers.items()}
+        }
     }
 
 if __name__ == "__main__":
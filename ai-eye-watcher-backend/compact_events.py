@@ -0,0 +1,195 @@
+"""
+AI-Eye Watcher compact event records
+Memory-efficient form of the telemetry events kept in the Central Server's
+hot cache. A stored event is a model_dump() dict holding one dict per
+process and connection, several hundred bytes each. CompactEvent keeps the
+processes as columns instead: pids, create times and metrics in typed
+arrays, names, users and command lines as interned strings. Connections
+become __slots__ records. Columns and records identical to the host's
+previous event are shared rather than copied. Events are turned back into
+dicts only when a response needs them.
+"""
+
+import sys
+import math
+import threading
+from array import array
+from typing import List, Dict, Any, Optional
+
+PROCESS_FIELDS = ("pid", "create_time", "name", "command_line", "user", "cpu_percent", "memory_percent",
+                  "sha256", "ppid")
+EVENT_FIELDS = ("hostname", "timestamp", "processes", "connections", "system_info",
+                "sequence", "process_events", "received_at")
+MISSING = float("nan")  # None in a float column
+NO_PARENT = -1  # None in the ppid column
+
+
+def intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def float_column(values) -> array:
+    return array("d", [MISSING if value is None else value for value in values])
+
+
+def float_values(column: array) -> List[Optional[float]]:
+    return [None if math.isnan(value) else value for value in column]
+
+
+class ConnectionRecord:
+    """One connection of a stored event."""
+
+    __slots__ = ("local_address", "local_port", "remote_address", "remote_port", "status", "pid")
+
+    def __init__(self, local_address: str, local_port: int, remote_address: Optional[str],
+                 remote_port: Optional[int], status: str, pid: Optional[int]):
+        self.local_address = local_address
+        self.local_port = local_port
+        self.remote_address = remote_address
+        self.remote_port = remote_port
+        self.status = status
+        self.pid = pid
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class CompactEvent:
+    """
+    A stored telemetry event in columnar form.
+
+    Columns that are None for every process are stored as None. Keys an
+    event carries beyond EVENT_FIELDS are kept in `extra`, and `keys`
+    records the original key order so to_dict() reproduces the event.
+    """
+
+    __slots__ = ("keys", "hostname", "timestamp", "received_at", "sequence", "system_info",
+                 "pids", "create_times", "names", "command_lines", "users",
+                 "cpu_percents", "memory_percents", "sha256s", "ppids",
+                 "connections", "process_events", "extra")
+
+    def __len__(self) -> int:
+        return len(self.pids)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """dict.get() for the event's scalar fields, so callers can treat it like the stored dict."""
+        if key in ("hostname", "timestamp", "received_at", "sequence", "system_info"):
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        return default
+
+    def processes(self) -> List[Dict[str, Any]]:
+        columns = (
+            self.pids,
+            float_values(self.create_times),
+            self.names or (None,) * len(self.pids),
+            self.command_lines or (None,) * len(self.pids),
+            self.users or (None,) * len(self.pids),
+            float_values(self.cpu_percents),
+            float_values(self.memory_percents),
+            self.sha256s or (None,) * len(self.pids),
+            [None if ppid == NO_PARENT else ppid for ppid in self.ppids] if self.ppids is not None
+            else (None,) * len(self.pids),
+        )
+        return [dict(zip(PROCESS_FIELDS, row)) for row in zip(*columns)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The event as originally stored."""
+        event = {}
+        for key in self.keys:
+            if key == "processes":
+                event[key] = self.processes()
+            elif key == "connections":
+                event[key] = [connection.to_dict() for connection in self.connections]
+            elif key == "process_events":
+                event[key] = [dict(process_event) for process_event in self.process_events]
+            elif key == "system_info":
+                event[key] = dict(self.system_info) if self.system_info is not None else None
+            elif key in EVENT_FIELDS:
+                event[key] = getattr(self, key)
+            else:
+                event[key] = self.extra[key]
+        return event
+
+
+class EventCompactor:
+    """
+    Builds CompactEvents, sharing unchanged data between consecutive events
+    of a host: string columns, connection records and system_info are
+    reused from the host's previous event when they compare equal.
+
+    Safe to call from several threads; sharing is only an optimization, so
+    a race between two events of one host at worst stores a copy.
+    """
+
+    def __init__(self):
+        self._previous: Dict[str, CompactEvent] = {}
+        self._key_orders: Dict[tuple, tuple] = {}
+        self._connections: Dict[str, Dict[tuple, ConnectionRecord]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _string_column(values: List[Optional[str]], previous: Optional[tuple]) -> Optional[tuple]:
+        column = tuple(values)
+        if column == previous:
+            return previous
+        if all(value is None for value in column):
+            return None
+        return tuple(intern(value) for value in column)
+
+    def compact(self, event: Dict[str, Any]) -> CompactEvent:
+        hostname = event.get("hostname")
+        with self._lock:
+            previous = self._previous.get(hostname)
+            known_connections = self._connections.get(hostname, {})
+        processes = event.get("processes") or []
+        compact = CompactEvent()
+        keys = tuple(event)
+        compact.keys = self._key_orders.setdefault(keys, keys)
+        compact.hostname = intern(hostname)
+        compact.timestamp = event.get("timestamp")
+        compact.received_at = event.get("received_at")
+        compact.sequence = event.get("sequence")
+        system_info = event.get("system_info")
+        if previous is not None and previous.system_info == system_info:
+            system_info = previous.system_info
+        compact.system_info = system_info
+
+        compact.pids = array("q", [process.get("pid") for process in processes])
+        compact.create_times = float_column(process.get("create_time") for process in processes)
+        compact.cpu_percents = float_column(process.get("cpu_percent") for process in processes)
+        compact.memory_percents = float_column(process.get("memory_percent") for process in processes)
+        ppids = [process.get("ppid") for process in processes]
+        compact.ppids = (array("q", [NO_PARENT if ppid is None else ppid for ppid in ppids])
+                         if any(ppid is not None for ppid in ppids) else None)
+        for field, slot in (("name", "names"), ("command_line", "command_lines"),
+                            ("user", "users"), ("sha256", "sha256s")):
+            compact_previous = getattr(previous, slot) if previous is not None else None
+            setattr(compact, slot, self._string_column([process.get(field) for process in processes],
+                                                       compact_previous))
+
+        connections = []
+        current_connections = {}
+        for connection in event.get("connections") or []:
+            key = tuple(connection.get(field) for field in ConnectionRecord.__slots__)
+            record = known_connections.get(key)
+            if record is None:
+                record = ConnectionRecord(*(intern(value) for value in key))
+            current_connections[key] = record
+            connections.append(record)
+        compact.connections = tuple(connections)
+        compact.process_events = tuple(event.get("process_events") or ())
+        extra = {key: value for key, value in event.items() if key not in EVENT_FIELDS}
+        compact.extra = extra or None
+
+        with self._lock:
+            self._previous[hostname] = compact
+            self._connections[hostname] = current_connections
+        return compact
+
+    def forget(self, hostname: str):
+        """Drop the sharing state of a host that has left the hot cache."""
+        with self._lock:
+            self._previous.pop(hostname, None)
+            self._connections.pop(hostname, None)
@@ -0,0 +1,281 @@
+"""
+AI-Eye Watcher connection index
+Ingest-time index of the remote endpoints hosts connect to, answering
+"which hosts talked to address X in the last hour" (and the reverse, per
+host) without scanning stored events. Each (address, host) pair keeps its
+first and last sighting, the ports and PIDs involved and a bitmask of the
+time buckets it was active in.
+
+It also detects two patterns:
+
+- rare destinations: a public address that no other host has contacted
+  within the retention window, reported as it is first seen
+- beaconing: a process opening connections to the same endpoint at regular
+  intervals. Every endpoint's recent connection open times are kept in one
+  NumPy matrix, and analyze() computes interval statistics for all of them
+  at once.
+"""
+
+import time
+import datetime
+import ipaddress
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+
+def iso(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp).isoformat()
+
+
+def is_public_address(address: str) -> bool:
+    try:
+        return ipaddress.ip_address(address).is_global
+    except ValueError:
+        return False
+
+
+class EndpointActivity:
+    """One host's connections to one remote address."""
+
+    __slots__ = ("first_seen", "last_seen", "bucket", "mask", "ports", "pids")
+    MAX_VALUES = 16  # ports and PIDs kept per record
+
+    def __init__(self, now: float, bucket: int):
+        self.first_seen = now
+        self.last_seen = now
+        self.bucket = bucket  # bucket number of bit 0 of mask
+        self.mask = 0
+        self.ports = set()
+        self.pids = set()
+
+    def touch(self, now: float, bucket: int, buckets: int, port: Optional[int], pid: Optional[int]):
+        if bucket > self.bucket:
+            self.mask = (self.mask << (bucket - self.bucket)) & ((1 << buckets) - 1)
+            self.bucket = bucket
+        if 0 <= self.bucket - bucket < buckets:
+            self.mask |= 1 << (self.bucket - bucket)
+        self.first_seen = min(self.first_seen, now)
+        self.last_seen = max(self.last_seen, now)
+        if port is not None and len(self.ports) < self.MAX_VALUES:
+            self.ports.add(port)
+        if pid is not None and len(self.pids) < self.MAX_VALUES:
+            self.pids.add(pid)
+
+    def active_buckets(self, since_bucket: int) -> List[int]:
+        return [self.bucket - offset for offset in range(self.mask.bit_length())
+                if self.mask >> offset & 1 and self.bucket - offset >= since_bucket][::-1]
+
+
+class ConnectionIndex:
+    """
+    Thread-safe. Times are POSIX timestamps of the server receiving the
+    telemetry.
+
+    A connection "opens" when a snapshot contains a (remote address, remote
+    port, local port) the host's previous snapshot didn't. The last
+    `history` open times of every (host, address, port) are rows of a
+    matrix, least recently opened evicted beyond max_series.
+    """
+
+    def __init__(self, bucket_seconds: int = 300, retention: float = 86400.0, history: int = 16,
+                 max_series: int = 200000, rare_min_fleet: int = 20, rare_warmup: float = 3600.0):
+        self.bucket_seconds = bucket_seconds
+        self.retention = retention
+        self.buckets = int(retention // bucket_seconds)
+        self.history = history
+        self.max_series = max_series
+        self.rare_min_fleet = rare_min_fleet
+        self.rare_warmup = rare_warmup
+        self.started: Optional[float] = None
+        self._addresses: Dict[str, Dict[str, EndpointActivity]] = {}  # address -> host -> activity
+        self._hosts: Dict[str, set] = {}  # host -> addresses
+        self._previous: Dict[str, frozenset] = {}  # host -> hashes of its last snapshot's connections
+        self._series: "OrderedDict[tuple, int]" = OrderedDict()  # (host, address, port) -> row
+        self._free: List[int] = []  # rows of expired series
+        self._rows_used = 0
+        self._opens = np.full((0, history), np.nan)
+        self._open_counts = np.zeros(0, dtype=np.int64)
+        self._series_pids: List[Optional[int]] = []
+        self._lock = threading.Lock()
+
+    def _row(self, key: tuple) -> int:
+        row = self._series.get(key)
+        if row is not None:
+            self._series.move_to_end(key)
+            return row
+        if len(self._series) >= self.max_series:
+            _, row = self._series.popitem(last=False)
+        elif self._free:
+            row = self._free.pop()
+        else:
+            row = self._rows_used
+            self._rows_used += 1
+            if row == len(self._opens):
+                added = min(max(1024, row), self.max_series - row)
+                self._opens = np.vstack([self._opens, np.full((added, self.history), np.nan)])
+                self._open_counts = np.concatenate([self._open_counts, np.zeros(added, dtype=np.int64)])
+                self._series_pids.extend([None] * added)
+        self._opens[row] = np.nan
+        self._open_counts[row] = 0
+        self._series[key] = row
+        return row
+
+    def observe(self, hostname: str, connections: List[Tuple[Optional[int], Optional[str], Optional[int], int]],
+                now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Index a snapshot's connections.
+
+        Args:
+            connections: (pid, remote_address, remote_port, local_port) of each connection
+
+        Returns:
+            list: Rare destination findings, each {"address", "port", "pid"}
+        """
+        now = now or time.time()
+        bucket = int(now // self.bucket_seconds)
+        findings = []
+        with self._lock:
+            if self.started is None:
+                self.started = now
+            previous = self._previous.get(hostname, frozenset())
+            current = set()
+            host_addresses = self._hosts.setdefault(hostname, set())
+            rare_checks = (now - self.started >= self.rare_warmup and len(self._hosts) >= self.rare_min_fleet)
+            for pid, address, port, local_port in connections:
+                if not address or address.startswith("127.") or address in ("::1", "0.0.0.0", "::"):
+                    continue
+                hosts = self._addresses.setdefault(address, {})
+                activity = hosts.get(hostname)
+                if activity is None:
+                    activity = hosts[hostname] = EndpointActivity(now, bucket)
+                    host_addresses.add(address)
+                    if rare_checks and len(hosts) == 1 and is_public_address(address):
+                        findings.append({"address": address, "port": port, "pid": pid})
+                activity.touch(now, bucket, self.buckets, port, pid)
+
+                key = hash((address, port, local_port))
+                current.add(key)
+                if key not in previous:
+                    row = self._row((hostname, address, port))
+                    self._opens[row, self._open_counts[row] % self.history] = now
+                    self._open_counts[row] += 1
+                    self._series_pids[row] = pid
+            self._previous[hostname] = frozenset(current)
+        return findings
+
+    def analyze(self, now: Optional[float] = None, min_opens: int = 6, max_jitter: float = 0.2,
+                min_interval: float = 10.0) -> List[Dict[str, Any]]:
+        """
+        Find beaconing endpoints and drop expired activity.
+
+        An endpoint beacons when at least min_opens of its connections were
+        opened at intervals of at least min_interval seconds, varying by at
+        most max_jitter (standard deviation over mean), and it is still
+        opening them: the last open is within two intervals.
+
+        Returns:
+            list: Findings, each {"host", "address", "port", "pid",
+                  "interval_seconds", "jitter", "opens", "rare"}
+        """
+        now = now or time.time()
+        with self._lock:
+            self._expire(now)
+            if not self._series:
+                return []
+            keys = list(self._series)
+            rows = np.fromiter(self._series.values(), dtype=np.int64, count=len(keys))
+            counts = self._open_counts[rows]
+            candidates = counts >= min_opens
+            keys = [key for key, candidate in zip(keys, candidates) if candidate]
+            rows = rows[candidates]
+            opens = self._opens[rows]  # A copy; the statistics run without the lock
+            pids = [self._series_pids[row] for row in rows]
+            fleet_counts = [len(self._addresses.get(key[1], ())) for key in keys]
+        if not keys:
+            return []
+
+        opens = np.sort(opens, axis=1)  # Unfilled slots are NaN and sort last
+        intervals = np.diff(opens, axis=1)
+        valid = np.count_nonzero(~np.isnan(intervals), axis=1)
+        mean = np.nanmean(intervals, axis=1)
+        jitter = np.nanstd(intervals, axis=1) / mean
+        last = np.nanmax(opens, axis=1)
+        beaconing = ((valid >= min_opens - 1) & (mean >= min_interval) & (jitter <= max_jitter)
+                     & (now - last <= 2 * mean))
+        findings = []
+        for index in np.flatnonzero(beaconing):
+            hostname, address, port = keys[index]
+            findings.append({
+                "host": hostname,
+                "address": address,
+                "port": port,
+                "pid": pids[index],
+                "interval_seconds": round(float(mean[index]), 1),
+                "jitter": round(float(jitter[index]), 3),
+                "opens": int(valid[index]) + 1,
+                "rare": fleet_counts[index] == 1 and is_public_address(address)
+            })
+        return findings
+
+    def _expire(self, now: float):
+        cutoff = now - self.retention
+        for address in list(self._addresses):
+            hosts = self._addresses[address]
+            for hostname in [hostname for hostname, activity in hosts.items() if activity.last_seen < cutoff]:
+                del hosts[hostname]
+                host_addresses = self._hosts.get(hostname)
+                if host_addresses is not None:
+                    host_addresses.discard(address)
+                    if not host_addresses:
+                        del self._hosts[hostname]
+                        self._previous.pop(hostname, None)
+            if not hosts:
+                del self._addresses[address]
+        for key in list(self._series):
+            row = self._series[key]
+            if np.nanmax(self._opens[row]) >= cutoff:
+                break  # Least recently opened first
+            del self._series[key]
+            self._free.append(row)
+
+    def _describe(self, activity: EndpointActivity, since: float) -> Dict[str, Any]:
+        since_bucket = int(since // self.bucket_seconds)
+        return {
+            "first_seen": iso(activity.first_seen),
+            "last_seen": iso(activity.last_seen),
+            "ports": sorted(activity.ports),
+            "pids": sorted(activity.pids),
+            "active_buckets": [iso(bucket * self.bucket_seconds) for bucket in activity.active_buckets(since_bucket)]
+        }
+
+    def hosts_for(self, address: str, since: float) -> List[Dict[str, Any]]:
+        """Hosts that connected to an address at or after `since`, most recent first."""
+        with self._lock:
+            hosts = [(hostname, activity) for hostname, activity in self._addresses.get(address, {}).items()
+                     if activity.last_seen >= since]
+            hosts.sort(key=lambda item: item[1].last_seen, reverse=True)
+            return [dict(host=hostname, **self._describe(activity, since)) for hostname, activity in hosts]
+
+    def endpoints_for(self, hostname: str, since: float) -> List[Dict[str, Any]]:
+        """Remote addresses a host connected to at or after `since`, most recent first."""
+        with self._lock:
+            endpoints = [(address, self._addresses[address][hostname]) for address in self._hosts.get(hostname, ())]
+            endpoints = [(address, activity) for address, activity in endpoints if activity.last_seen >= since]
+            endpoints.sort(key=lambda item: item[1].last_seen, reverse=True)
+            return [dict(remote_address=address, hosts=len(self._addresses[address]),
+                         **self._describe(activity, since))
+                    for address, activity in endpoints]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "addresses": len(self._addresses),
+                "hosts": len(self._hosts),
+                "series": len(self._series),
+                "max_series": self.max_series,
+                "bucket_seconds": self.bucket_seconds,
+                "retention_seconds": self.retention
+            }
@@ -0,0 +1,131 @@
+"""
+AI-Eye Watcher dashboard statistics
+Aggregates behind /api/v1/dashboard/stats, maintained incrementally as
+events and alerts enter and leave the Central Server's buffers so that
+reading them is O(1).
+"""
+
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+
+class MinuteCounter:
+    """
+    Per-minute counts over a sliding window, kept in a fixed ring of
+    buckets. A bucket is reset lazily the first time it is reused for a
+    newer minute.
+    """
+
+    def __init__(self, window_minutes: int = 60):
+        self.window = window_minutes
+        self._counts = [0] * window_minutes
+        self._minutes = [-1] * window_minutes  # minute number each bucket holds
+        self.last_minute = -1  # Newest minute counted
+
+    def increment(self, now: Optional[float] = None, amount: int = 1):
+        minute = int((now or time.time()) // 60)
+        self.last_minute = max(self.last_minute, minute)
+        slot = minute % self.window
+        if self._minutes[slot] != minute:
+            self._minutes[slot] = minute
+            self._counts[slot] = 0
+        self._counts[slot] += amount
+
+    def series(self, minutes: int, now: Optional[float] = None) -> List[int]:
+        """Counts for the last `minutes` minutes, oldest first, current minute last."""
+        current = int((now or time.time()) // 60)
+        minutes = min(minutes, self.window)
+        result = []
+        for minute in range(current - minutes + 1, current + 1):
+            slot = minute % self.window
+            result.append(self._counts[slot] if self._minutes[slot] == minute else 0)
+        return result
+
+    def total(self, minutes: int, now: Optional[float] = None) -> int:
+        return sum(self.series(minutes, now))
+
+
+class DashboardCounters:
+    """
+    Running aggregates for the dashboard: host refcounts over the event
+    window, alert severity counts over the alert buffer, hosts with
+    pending commands, and per-minute event/alert rates overall and per host.
+    A host's rate counters are dropped once all their minutes have left the
+    window, and beyond max_hosts the least recently counted host's are.
+    """
+
+    SEVERITIES = ("CRITICAL", "HIGH", "MEDIUM", "LOW")
+
+    def __init__(self, window_minutes: int = 60, max_hosts: int = 20000):
+        self.window_minutes = window_minutes
+        self.max_hosts = max_hosts
+        self.host_events: Dict[str, int] = {}
+        self.severity_counts: Dict[str, int] = {severity: 0 for severity in self.SEVERITIES}
+        self.pending_command_hosts = set()
+        self.events_per_minute = MinuteCounter(window_minutes)
+        self.alerts_per_minute = MinuteCounter(window_minutes)
+        # Least recently counted host first
+        self.host_events_per_minute: "OrderedDict[str, MinuteCounter]" = OrderedDict()
+        self.host_alerts_per_minute: "OrderedDict[str, MinuteCounter]" = OrderedDict()
+
+    def _host_counter(self, counters: "OrderedDict[str, MinuteCounter]", hostname: str) -> MinuteCounter:
+        counter = counters.get(hostname)
+        if counter is not None:
+            counters.move_to_end(hostname)
+            return counter
+        oldest_kept = int(time.time() // 60) - self.window_minutes + 1
+        while counters:
+            oldest = next(iter(counters.values()))
+            if len(counters) < self.max_hosts and oldest.last_minute >= oldest_kept:
+                break
+            counters.popitem(last=False)
+        counter = counters[hostname] = MinuteCounter(self.window_minutes)
+        return counter
+
+    def event_added(self, hostname: str, count_rate: bool = True):
+        self.host_events[hostname] = self.host_events.get(hostname, 0) + 1
+        if count_rate:
+            self.events_per_minute.increment()
+            self._host_counter(self.host_events_per_minute, hostname).increment()
+
+    def event_evicted(self, hostname: str):
+        remaining = self.host_events.get(hostname, 0) - 1
+        if remaining > 0:
+            self.host_events[hostname] = remaining
+        else:
+            self.host_events.pop(hostname, None)
+
+    def alert_added(self, alert: Dict[str, Any]):
+        severity = alert.get("severity", "LOW")
+        self.severity_counts[severity] = self.severity_counts.get(severity, 0) + 1
+        self.alerts_per_minute.increment()
+        self._host_counter(self.host_alerts_per_minute, alert.get("host", "")).increment()
+
+    def alert_evicted(self, alert: Dict[str, Any]):
+        severity = alert.get("severity", "LOW")
+        self.severity_counts[severity] = max(self.severity_counts.get(severity, 0) - 1, 0)
+
+    def commands_pending(self, hostname: str, pending: bool):
+        if pending:
+            self.pending_command_hosts.add(hostname)
+        else:
+            self.pending_command_hosts.discard(hostname)
+
+    def timeseries(self, minutes: int, hostname: Optional[str] = None) -> Dict[str, Any]:
+        """Per-minute event and alert counts, oldest first, overall or for one host."""
+        now = time.time()
+        minutes = max(1, min(minutes, self.window_minutes))
+        if hostname is None:
+            events, alerts = self.events_per_minute, self.alerts_per_minute
+        else:
+            events = self.host_events_per_minute.get(hostname)
+            alerts = self.host_alerts_per_minute.get(hostname)
+        start_minute = int(now // 60) - minutes + 1
+        return {
+            "host": hostname,
+            "minutes": [time.strftime("%Y-%m-%dT%H:%M:00", time.localtime((start_minute + i) * 60))
+                        for i in range(minutes)],
+            "events": events.series(minutes, now) if events else [0] * minutes,
+            "alerts": alerts.series(minutes, now) if alerts else [0] * minutes
+        }
@@ -0,0 +1,371 @@
+"""
+AI-Eye Watcher event storage
+Pluggable storage for telemetry events. SegmentedEventStore persists events
+to an append-only log of memory-mapped segment files, needs no external
+database, and holds the newest events in memory as the Central Server's
+hot cache.
+"""
+
+import os
+import json
+import mmap
+import time
+import struct
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple
+
+from compact_events import CompactEvent, EventCompactor
+
+logger = logging.getLogger(__name__)
+
+# Record layout: payload length, receive timestamp, hostname length,
+# then the hostname and the JSON payload
+RECORD_HEADER = struct.Struct("<IdH")
+
+
+class EventStore:
+    """
+    Interface shared by the event store implementations.
+
+    Pages are addressed by opaque cursor strings: page() returns the cursor
+    of its last event, and passing it back as `before` continues from there.
+    Implementations are thread-safe: events are appended from the ingest
+    worker threads while the event loop serves queries.
+    """
+
+    def append(self, event: Dict[str, Any], timestamp: Optional[float] = None):
+        raise NotImplementedError
+
+    def page(self, hostname: Optional[str] = None, since: Optional[float] = None,
+             until: Optional[float] = None, limit: int = 50,
+             before: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Return matching events, most recent first, and the cursor for the
+        next page (None when there are no more events).
+        """
+        raise NotImplementedError
+
+    def query(self, hostname: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return matching events, most recent first."""
+        return self.page(hostname, since, until, limit)[0]
+
+    def recent(self, count: int) -> List[Dict[str, Any]]:
+        """Return the last count events, oldest first (used to warm the hot cache)."""
+        return list(reversed(self.query(limit=count)))
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryEventStore(EventStore):
+    """
+    Non-persistent store backed by a bounded deque. Events are held as
+    CompactEvents and turned back into dicts for the pages returned.
+    """
+
+    def __init__(self, max_events: int = 1000):
+        self._events = deque(maxlen=max_events)
+        self._next_position = 0
+        self._compactor = EventCompactor()
+        self._lock = threading.Lock()
+
+    def append(self, event: Dict[str, Any], timestamp: Optional[float] = None):
+        with self._lock:
+            self._events.append((self._next_position, timestamp or time.time(), self._compactor.compact(event)))
+            self._next_position += 1
+
+    def page(self, hostname: Optional[str] = None, since: Optional[float] = None,
+             until: Optional[float] = None, limit: int = 50,
+             before: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        before_position = int(before) if before is not None else None
+        results = []
+        last_position = None
+        with self._lock:
+            events = list(self._events)
+        for position, timestamp, event in reversed(events):
+            if len(results) >= limit:
+                return results, str(last_position)
+            if before_position is not None and position >= before_position:
+                continue
+            if hostname is not None and event.get("hostname") != hostname:
+                continue
+            if (since is not None and timestamp < since) or (until is not None and timestamp > until):
+                continue
+            results.append(event.to_dict())
+            last_position = position
+        return results, None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "events": len(self._events)}
+
+
+class Segment:
+    """
+    One append-only segment file and its in-memory index.
+
+    The index (record offsets, timestamps and per-host record numbers) is
+    rebuilt from record headers when an existing segment is opened, so it
+    never has to be persisted separately. Reads go through a read-only
+    memory map that is extended as the segment grows.
+    """
+
+    def __init__(self, path: str, segment_id: int):
+        self.path = path
+        self.id = segment_id
+        self.offsets: List[int] = []
+        self.timestamps: List[float] = []
+        self.hosts: Dict[str, List[int]] = {}  # hostname -> record numbers
+        self.size = 0
+        self._file = open(path, "a+b")
+        self._map: Optional[mmap.mmap] = None
+        self._load_index()
+
+    @property
+    def min_timestamp(self) -> float:
+        return self.timestamps[0] if self.timestamps else 0.0
+
+    @property
+    def max_timestamp(self) -> float:
+        return self.timestamps[-1] if self.timestamps else 0.0
+
+    def _index_record(self, offset: int, timestamp: float, hostname: str):
+        self.hosts.setdefault(hostname, []).append(len(self.offsets))
+        self.offsets.append(offset)
+        self.timestamps.append(timestamp)
+
+    def _load_index(self):
+        file_size = os.path.getsize(self.path)
+        self._remap(file_size)
+        offset = 0
+        while offset + RECORD_HEADER.size <= file_size:
+            payload_len, timestamp, host_len = RECORD_HEADER.unpack_from(self._map, offset)
+            end = offset + RECORD_HEADER.size + host_len + payload_len
+            if end > file_size:
+                break
+            host_start = offset + RECORD_HEADER.size
+            hostname = self._map[host_start:host_start + host_len].decode()
+            self._index_record(offset, timestamp, hostname)
+            offset = end
+        if offset < file_size:
+            # Torn write from a crash; drop the partial record
+            logger.warning(f"Truncating {file_size - offset} bytes of partial record in {self.path}")
+            self._file.truncate(offset)
+            self._remap(offset)
+        self.size = offset
+
+    def _remap(self, size: int):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if size > 0:
+            self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+
+    def append(self, timestamp: float, hostname: str, payload: bytes):
+        host = hostname.encode()
+        self._file.write(RECORD_HEADER.pack(len(payload), timestamp, len(host)) + host + payload)
+        self._file.flush()
+        self._index_record(self.size, timestamp, hostname)
+        self.size += RECORD_HEADER.size + len(host) + len(payload)
+
+    def read(self, record: int) -> Dict[str, Any]:
+        if self._map is None or len(self._map) < self.size:
+            self._remap(self.size)
+        offset = self.offsets[record]
+        payload_len, _, host_len = RECORD_HEADER.unpack_from(self._map, offset)
+        start = offset + RECORD_HEADER.size + host_len
+        return json.loads(self._map[start:start + payload_len])
+
+    def records_desc(self, hostname: Optional[str] = None, since: Optional[float] = None,
+                     until: Optional[float] = None, before: Optional[int] = None):
+        """
+        Record numbers matching the filters, newest first. The time range
+        and host are located by bisection, so the cost is proportional to
+        the records consumed rather than the segment size.
+        """
+        lo = bisect_left(self.timestamps, since) if since is not None else 0
+        hi = bisect_right(self.timestamps, until) if until is not None else len(self.offsets)
+        if before is not None:
+            hi = min(hi, before)
+        if hostname is None:
+            return range(hi - 1, lo - 1, -1)
+        host_records = self.hosts.get(hostname, [])
+        start = bisect_left(host_records, lo)
+        end = bisect_left(host_records, hi)
+        return (host_records[i] for i in range(end - 1, start - 1, -1))
+
+    def close(self):
+        self._remap(0)
+        self._file.close()
+
+    def delete(self):
+        self.close()
+        os.remove(self.path)
+
+
+class SegmentedEventStore(EventStore):
+    """
+    Persistent event store built from an append-only log of segment files.
+
+    New events go to the active segment until it reaches segment_bytes.
+    Whole segments are dropped once they are older than retention_seconds
+    or the log exceeds retention_bytes, oldest first. Queries skip segments
+    by their time range and host index before reading any records.
+
+    The newest cache_events records are also held in memory as
+    CompactEvents, so pages of recent events are served without reading
+    and decoding records; a page reaching past them continues on disk.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 retention_seconds: float = 7 * 24 * 3600,
+                 retention_bytes: int = 1024 * 1024 * 1024,
+                 cache_events: int = 1000):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retention_seconds = retention_seconds
+        self.retention_bytes = retention_bytes
+        self._lock = threading.RLock()  # Guards the segments; events are encoded outside it
+        self._compactor = EventCompactor()
+        # (segment id, record number, timestamp, CompactEvent) of the newest records, oldest first
+        self._cache: deque = deque(maxlen=cache_events)
+        self._cached_hosts: Dict[str, int] = {}
+        os.makedirs(directory, exist_ok=True)
+
+        # Other files in the directory (a stray server.log, editor backups) are left alone
+        segment_ids = sorted(int(name[:-4]) for name in os.listdir(directory)
+                             if name.endswith(".log") and name[:-4].isdecimal())
+        self.segments = [Segment(self._segment_path(i), i) for i in segment_ids]
+        if not self.segments:
+            self.segments.append(Segment(self._segment_path(0), 0))
+        self._last_retention_check = 0.0
+        self._last_timestamp = self.segments[-1].max_timestamp
+        self.enforce_retention()
+        self._load_cache()
+
+    def _load_cache(self):
+        newest = []
+        for segment in reversed(self.segments):
+            for record in range(len(segment.offsets) - 1, -1, -1):
+                if len(newest) >= self._cache.maxlen:
+                    break
+                newest.append((segment, record))
+        for segment, record in reversed(newest):
+            self._cache_record(segment.id, record, segment.timestamps[record],
+                               self._compactor.compact(segment.read(record)))
+
+    def _cache_record(self, segment_id: int, record: int, timestamp: float, compact: CompactEvent):
+        self._cached_hosts[compact.hostname] = self._cached_hosts.get(compact.hostname, 0) + 1
+        if len(self._cache) == self._cache.maxlen:
+            self._uncache_oldest()
+        self._cache.append((segment_id, record, timestamp, compact))
+
+    def _uncache_oldest(self):
+        hostname = self._cache.popleft()[3].hostname
+        self._cached_hosts[hostname] -= 1
+        if not self._cached_hosts[hostname]:
+            del self._cached_hosts[hostname]
+            self._compactor.forget(hostname)
+
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self.directory, f"{segment_id:012d}.log")
+
+    def append(self, event: Dict[str, Any], timestamp: Optional[float] = None):
+        payload = json.dumps(event, separators=(",", ":")).encode()
+        compact = self._compactor.compact(event) if self._cache.maxlen else None
+        with self._lock:
+            # Timestamps are kept non-decreasing so segment time indexes stay sorted
+            timestamp = max(timestamp or time.time(), self._last_timestamp)
+            self._last_timestamp = timestamp
+            active = self.segments[-1]
+            if active.size and active.size + len(payload) > self.segment_bytes:
+                active = Segment(self._segment_path(active.id + 1), active.id + 1)
+                self.segments.append(active)
+                self.enforce_retention(timestamp)
+            active.append(timestamp, event.get("hostname", ""), payload)
+            if compact is not None:
+                self._cache_record(active.id, len(active.offsets) - 1, timestamp, compact)
+
+            if timestamp - self._last_retention_check > 60:
+                self.enforce_retention(timestamp)
+
+    def enforce_retention(self, now: Optional[float] = None):
+        """Drop whole segments that are past the age or size limits."""
+        now = now or time.time()
+        with self._lock:
+            self._last_retention_check = now
+            total = sum(segment.size for segment in self.segments)
+            # The active segment is never dropped
+            while len(self.segments) > 1:
+                oldest = self.segments[0]
+                if oldest.max_timestamp >= now - self.retention_seconds and total <= self.retention_bytes:
+                    break
+                total -= oldest.size
+                self.segments.pop(0).delete()
+                logger.info(f"Dropped event segment {oldest.id} ({len(oldest.offsets)} events)")
+            while self._cache and self._cache[0][0] < self.segments[0].id:
+                self._uncache_oldest()
+
+    def page(self, hostname: Optional[str] = None, since: Optional[float] = None,
+             until: Optional[float] = None, limit: int = 50,
+             before: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        # Cursors are "<segment id>:<record number>" of the last event returned
+        before_segment, before_record = None, None
+        if before is not None:
+            before_segment, before_record = (int(part) for part in before.split(":"))
+
+        with self._lock:
+            results = []
+            last_cursor = None
+            if self._cache and (before is None or (before_segment, before_record) > self._cache[0][:2]):
+                for segment_id, record, timestamp, event in reversed(self._cache):
+                    if before is not None and (segment_id, record) >= (before_segment, before_record):
+                        continue
+                    if hostname is not None and event.hostname != hostname:
+                        continue
+                    if (since is not None and timestamp < since) or (until is not None and timestamp > until):
+                        continue
+                    if len(results) >= limit:
+                        return results, last_cursor
+                    results.append(event.to_dict())
+                    last_cursor = f"{segment_id}:{record}"
+                # The rest of the page comes from the records older than the cache
+                before_segment, before_record = self._cache[0][:2]
+            for segment in reversed(self.segments):
+                if before_segment is not None and segment.id > before_segment:
+                    continue
+                if not segment.offsets:
+                    continue
+                if since is not None and segment.max_timestamp < since:
+                    break  # Every older segment is out of range too
+                if until is not None and segment.min_timestamp > until:
+                    continue
+                segment_before = before_record if segment.id == before_segment else None
+                for record in segment.records_desc(hostname, since, until, segment_before):
+                    if len(results) >= limit:
+                        return results, last_cursor
+                    results.append(segment.read(record))
+                    last_cursor = f"{segment.id}:{record}"
+            return results, None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": "segmented",
+                "directory": self.directory,
+                "segments": len(self.segments),
+                "events": sum(len(segment.offsets) for segment in self.segments),
+                "bytes": sum(segment.size for segment in self.segments),
+                "oldest_timestamp": self.segments[0].min_timestamp or None
+            }
+
+    def close(self):
+        with self._lock:
+            for segment in self.segments:
+                segment.close()
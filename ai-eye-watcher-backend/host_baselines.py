@@ -0,0 +1,329 @@
+"""
+AI-Eye Watcher host baselines
+Per-host behavioural baselines for anomaly detection, in a fixed memory
+budget however many hosts report. Three things are learned per host:
+
+- the process names it runs
+- its parent/child process pairs (lineage)
+- the remote endpoints each of its processes talks to
+
+"Seen on this host" is a decaying Bloom filter shared by all hosts (keys
+are host-qualified), so memory doesn't grow with hosts or items. How many
+hosts run a name, pair or endpoint (fleet prevalence) is a count-min
+sketch, counting each host once per generation of the filter, and each
+host's endpoint diversity is a small HyperLogLog. Scoring
+a snapshot costs a few hash probes per process and connection.
+"""
+
+import math
+import time
+import threading
+from array import array
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+MASK64 = (1 << 64) - 1
+
+
+def probes(key, count: int, size: int) -> List[int]:
+    """`count` positions in [0, size) for a key (size a power of two), by double hashing."""
+    value = hash(key) & MASK64
+    first, step = value & 0xFFFFFFFF, (value >> 32) | 1
+    return [(first + i * step) & (size - 1) for i in range(count)]
+
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives."""
+
+    def __init__(self, bits: int, hashes: int):
+        self.bits = bits
+        self.hashes = hashes
+        self.items = 0  # distinct items added (as far as the filter can tell)
+        self._array = bytearray(bits // 8)
+
+    def has(self, positions: List[int]) -> bool:
+        array_ = self._array
+        for position in positions:
+            if not array_[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def set(self, positions: List[int]):
+        array_ = self._array
+        for position in positions:
+            array_[position >> 3] |= 1 << (position & 7)
+        self.items += 1
+
+    def __contains__(self, key) -> bool:
+        return self.has(probes(key, self.hashes, self.bits))
+
+    def add(self, key):
+        positions = probes(key, self.hashes, self.bits)
+        if not self.has(positions):
+            self.set(positions)
+
+
+class DecayingBloomFilter:
+    """
+    Two Bloom filter generations; a key is present if either has it. When
+    the current generation is older than max_age or holds `capacity`
+    items, it becomes the previous one and a fresh generation starts. A
+    key seen again while present is copied forward, so keys in use stay
+    and keys unused for one to two generations are forgotten.
+    """
+
+    def __init__(self, bits: int, hashes: int = 4, max_age: float = 7 * 86400.0,
+                 capacity: Optional[int] = None):
+        self.bits = bits
+        self.hashes = hashes
+        self.max_age = max_age
+        self.capacity = capacity or bits // 16  # ~0.25% false positives per generation at capacity
+        self.current = BloomFilter(bits, hashes)
+        self.previous = BloomFilter(bits, hashes)
+        self.started = time.time()
+        self.rotations = 0
+
+    def __contains__(self, key) -> bool:
+        positions = probes(key, self.hashes, self.bits)
+        return self.current.has(positions) or self.previous.has(positions)
+
+    def see(self, key) -> Optional[str]:
+        """Add a key; returns the generation it was already in, "current" or "previous", or None."""
+        # The hot path of scoring, so the current generation is probed inline
+        value = hash(key) & MASK64
+        first, step, mask = value & 0xFFFFFFFF, (value >> 32) | 1, self.bits - 1
+        current = self.current._array
+        for i in range(self.hashes):
+            position = (first + i * step) & mask
+            if not current[position >> 3] & (1 << (position & 7)):
+                break
+        else:
+            return "current"
+        positions = probes(key, self.hashes, self.bits)
+        self.current.set(positions)
+        return "previous" if self.previous.has(positions) else None
+
+    def due(self, now: float) -> bool:
+        return now - self.started >= self.max_age or self.current.items >= self.capacity
+
+    def rotate(self, now: float):
+        self.previous = self.current
+        self.current = BloomFilter(self.bits, self.hashes)
+        self.started = now
+        self.rotations += 1
+
+
+class CountMinSketch:
+    """
+    Approximate counts that never undercount. Uses conservative update,
+    which keeps overcounting low when most keys are rare.
+    """
+
+    def __init__(self, width: int, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self._rows = [array("I", bytes(4 * width)) for _ in range(depth)]
+
+    def estimate(self, key) -> int:
+        return min(row[position] for row, position in zip(self._rows, probes(key, self.depth, self.width)))
+
+    def add(self, key):
+        cells = list(zip(self._rows, probes(key, self.depth, self.width)))
+        target = min(row[position] for row, position in cells) + 1
+        for row, position in cells:
+            if row[position] < target:
+                row[position] = target
+
+    def halve(self):
+        """Age all counts, so the sketch follows recent behaviour."""
+        for index, row in enumerate(self._rows):
+            self._rows[index] = array("I", (value >> 1 for value in row))
+
+
+class HyperLogLog:
+    """Distinct count estimate in 2**precision bytes (precision 8: ~6.5% error)."""
+
+    __slots__ = ("registers",)
+    PRECISION = 8
+    SIZE = 1 << PRECISION
+    ALPHA = 0.7213 / (1 + 1.079 / SIZE)
+
+    def __init__(self):
+        self.registers = bytearray(self.SIZE)
+
+    def add(self, key):
+        value = hash(key) & MASK64
+        index = value & (self.SIZE - 1)
+        rest = value >> self.PRECISION
+        rank = (64 - self.PRECISION) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self) -> float:
+        registers = self.registers
+        estimate = self.ALPHA * self.SIZE * self.SIZE / sum(2.0 ** -register for register in registers)
+        zeros = registers.count(0)
+        if estimate <= 2.5 * self.SIZE and zeros:
+            return self.SIZE * math.log(self.SIZE / zeros)  # Linear counting for small sets
+        return estimate
+
+
+class HostProfile:
+    """What the baselines keep per host: snapshot count and endpoint diversity."""
+
+    __slots__ = ("snapshots", "endpoints", "previous_endpoints")
+
+    def __init__(self):
+        self.snapshots = 0
+        self.endpoints = HyperLogLog()
+        self.previous_endpoints: Optional[HyperLogLog] = None
+
+    def endpoint_diversity(self) -> float:
+        estimate = self.endpoints.estimate()
+        if self.previous_endpoints is not None:
+            estimate = max(estimate, self.previous_endpoints.estimate())
+        return estimate
+
+
+def is_local_address(address: Optional[str]) -> bool:
+    return not address or address.startswith("127.") or address in ("::1", "0.0.0.0", "::")
+
+
+class HostBaselines:
+    """
+    Learns per-host baselines and reports what a snapshot does that its
+    host hasn't done before. Thread-safe.
+
+    Findings are only reported once the host has sent warmup_snapshots
+    snapshots. Once min_fleet hosts are profiled, a new process name or
+    pair that runs on at least rare_prevalence of the fleet is treated as
+    normal (e.g. software being rolled out), and a rarer one is marked
+    "rare". New endpoints are only reported for hosts that talk to at most
+    max_endpoint_diversity distinct endpoints; for busier hosts a new
+    endpoint says little.
+    """
+
+    def __init__(self, bloom_bits: int = 1 << 25, sketch_width: int = 1 << 18, max_hosts: int = 20000,
+                 max_age: float = 7 * 86400.0, warmup_snapshots: int = 10, min_fleet: int = 20,
+                 rare_prevalence: float = 0.05, max_endpoint_diversity: int = 256):
+        self.seen = DecayingBloomFilter(bloom_bits, max_age=max_age)
+        self.prevalence = CountMinSketch(sketch_width)
+        self.max_hosts = max_hosts
+        self.warmup_snapshots = warmup_snapshots
+        self.min_fleet = min_fleet
+        self.rare_prevalence = rare_prevalence
+        self.max_endpoint_diversity = max_endpoint_diversity
+        self._profiles: "OrderedDict[str, HostProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _profile(self, hostname: str) -> HostProfile:
+        profile = self._profiles.get(hostname)
+        if profile is None:
+            profile = self._profiles[hostname] = HostProfile()
+            while len(self._profiles) > self.max_hosts:
+                self._profiles.popitem(last=False)  # Least recently reporting host
+        else:
+            self._profiles.move_to_end(hostname)
+        return profile
+
+    def _rotate(self, now: float):
+        self.seen.rotate(now)
+        self.prevalence.halve()
+        for profile in self._profiles.values():
+            profile.previous_endpoints, profile.endpoints = profile.endpoints, HyperLogLog()
+
+    def _check(self, hostname: str, kind: str, value, fleet: int) -> Optional[str]:
+        """
+        Learn one item of a snapshot. Returns None if the host has seen it
+        before, else "new" or "rare" ("common" if the fleet finds it normal).
+        """
+        seen = self.seen.see((hostname, kind, value))
+        if seen == "current":
+            return None
+        fleet_key = (kind, value)
+        if seen == "previous":
+            # First sighting on this host since the rotation halved the counts; count it again
+            self.prevalence.add(fleet_key)
+            return None
+        hosts_running = self.prevalence.estimate(fleet_key)
+        self.prevalence.add(fleet_key)
+        if fleet < self.min_fleet:
+            return "new"
+        return "rare" if hosts_running < self.rare_prevalence * fleet else "common"
+
+    def observe(self, hostname: str, processes: List[Tuple[int, Optional[int], str]],
+                connections: List[Tuple[Optional[int], Optional[str], Optional[int]]],
+                now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Score a snapshot against its host's baseline, then add it to the baseline.
+
+        Args:
+            processes: (pid, ppid, name) of every process in the snapshot
+            connections: (pid, remote_address, remote_port) of its connections
+
+        Returns:
+            list: Findings, each {"kind": "process" | "lineage" | "endpoint",
+                  "pid", "name", "rarity": "new" | "rare"}; lineage findings
+                  add "parent", endpoint findings "endpoint"
+        """
+        now = now or time.time()
+        names = {pid: name for pid, _, name in processes}
+        # Each distinct item is checked once, reported with the first process it was seen in
+        items: Dict[tuple, Dict[str, Any]] = {}
+        for pid, ppid, name in processes:
+            if ("process", name) not in items:
+                items[("process", name)] = {"pid": pid, "name": name}
+            parent = names.get(ppid) if ppid is not None else None
+            if parent is not None and ("lineage", (parent, name)) not in items:
+                items[("lineage", (parent, name))] = {"pid": pid, "name": name, "parent": parent}
+        endpoints: Dict[tuple, Dict[str, Any]] = {}
+        remotes = set()
+        for pid, address, port in connections:
+            if is_local_address(address):
+                continue
+            remotes.add((address, port))
+            name = names.get(pid)
+            if name is None:
+                continue
+            endpoint = f"{address}:{port}" if port is not None else address
+            if (name, endpoint) not in endpoints:
+                endpoints[(name, endpoint)] = {"pid": pid, "name": name, "endpoint": endpoint}
+
+        findings = []
+        with self._lock:
+            if self.seen.due(now):
+                self._rotate(now)
+            profile = self._profile(hostname)
+            fleet = len(self._profiles)
+            scoring = profile.snapshots >= self.warmup_snapshots
+            profile.snapshots += 1
+            for (kind, value), finding in items.items():
+                rarity = self._check(hostname, kind, value, fleet)
+                if scoring and rarity in ("new", "rare"):
+                    finding.update(kind=kind, rarity=rarity)
+                    findings.append(finding)
+
+            scoring = scoring and profile.endpoint_diversity() <= self.max_endpoint_diversity
+            for remote in remotes:
+                profile.endpoints.add(remote)
+            for value, finding in endpoints.items():
+                rarity = self._check(hostname, "endpoint", value, fleet)
+                if scoring and rarity is not None:
+                    # A host's endpoints are its own business; the fleet only marks them rare
+                    finding.update(kind="endpoint", rarity="rare" if rarity == "rare" else "new")
+                    findings.append(finding)
+        return findings
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            memory = (2 * self.seen.bits // 8 + 4 * self.prevalence.width * self.prevalence.depth
+                      + len(self._profiles) * 2 * HyperLogLog.SIZE)
+            return {
+                "hosts": len(self._profiles),
+                "max_hosts": self.max_hosts,
+                "seen_items": self.seen.current.items,
+                "seen_capacity": self.seen.capacity,
+                "generation_age_seconds": round(time.time() - self.seen.started),
+                "rotations": self.seen.rotations,
+                "memory_bytes": memory
+            }
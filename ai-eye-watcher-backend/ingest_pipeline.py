@@ -0,0 +1,182 @@
+"""
+AI-Eye Watcher ingest pipeline
+Keeps telemetry decoding and detection off the asyncio event loop. Request
+handlers put raw payloads on a bounded queue and await the result; worker
+threads drain the queue in batches, run the detection stage of each job,
+and hand the whole batch back to the event loop in one callback, where the
+results are committed to the shared stores. When the queue is full the
+caller is told how long to back off instead of the backlog growing without
+limit.
+"""
+
+import math
+import time
+import queue
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# A detection stage runs on a worker thread and returns the commit step,
+# which runs on the event loop and produces the job's result
+Stage = Callable[[], Callable[[], Any]]
+
+
+class PipelineFull(Exception):
+    """Raised by IngestPipeline.submit() when the queue is at capacity."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Ingest queue full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class IngestPipeline:
+    """
+    Bounded queue of detection jobs served by a pool of worker threads.
+
+    Jobs are taken up to batch_size at a time, so a burst of payloads
+    costs one event loop wake-up per batch rather than one per payload.
+    Worker threads are started by the first submit(). on_wait, if given,
+    is called on the worker thread with each job's seconds in the queue.
+    Exceptions of the invalid types (the caller's own rejections of a bad
+    payload) are counted as invalid rather than errors.
+    """
+
+    def __init__(self, max_queue: int = 1000, workers: int = 2, batch_size: int = 32,
+                 max_retry_after: int = 30, on_wait: Optional[Callable[[float], None]] = None,
+                 invalid: Tuple[type, ...] = ()):
+        self.max_queue = max_queue
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retry_after = max_retry_after
+        self.on_wait = on_wait
+        self.invalid_types = invalid
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._threads: List[threading.Thread] = []
+        self._stats_lock = threading.Lock()
+
+        # Metrics
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.invalid = 0
+        self.errors = 0
+        self.batches = 0
+        self.peak_depth = 0
+        self._detect_seconds = 0.0
+        self._wait_seconds = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _start(self, loop: asyncio.AbstractEventLoop):
+        if self._loop is loop:
+            return
+        self._loop = loop
+        if not self._threads:
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"ingest-worker-{number}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, stage: Stage) -> asyncio.Future:
+        """
+        Queue a job from the event loop.
+
+        Returns:
+            asyncio.Future: resolves to the commit step's return value, or
+                            raises whatever the stage or commit step raised
+
+        Raises:
+            PipelineFull: the queue is at capacity
+        """
+        loop = asyncio.get_running_loop()
+        self._start(loop)
+        future = loop.create_future()
+        try:
+            self._queue.put_nowait((stage, future, time.perf_counter()))
+        except queue.Full:
+            self.rejected += 1
+            raise PipelineFull(self.retry_after())
+        self.accepted += 1
+        self.peak_depth = max(self.peak_depth, self._queue.qsize())
+        return future
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained, from the average job cost."""
+        with self._stats_lock:
+            per_job = self._detect_seconds / self.processed if self.processed else 0.01
+        seconds = math.ceil(self.depth * per_job / self.workers)
+        return max(1, min(seconds, self.max_retry_after))
+
+    def _take_batch(self) -> List[Tuple[Stage, asyncio.Future, float]]:
+        jobs = [self._queue.get()]
+        while len(jobs) < self.batch_size:
+            try:
+                jobs.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return jobs
+
+    def _run(self):
+        while True:
+            jobs = self._take_batch()
+            started = time.perf_counter()
+            finished = []
+            for stage, future, _ in jobs:
+                try:
+                    finished.append((future, stage(), None))
+                except Exception as e:
+                    finished.append((future, None, e))
+            elapsed = time.perf_counter() - started
+            waits = [started - queued_at for _, _, queued_at in jobs]
+            if self.on_wait is not None:
+                for wait in waits:
+                    self.on_wait(wait)
+
+            with self._stats_lock:
+                self.batches += 1
+                self.processed += len(jobs)
+                self._detect_seconds += elapsed
+                self._wait_seconds += sum(waits)
+            self._loop.call_soon_threadsafe(self._commit, finished)
+
+    def _commit(self, finished: List[Tuple[asyncio.Future, Optional[Callable[[], Any]], Optional[Exception]]]):
+        # Runs on the event loop, in submission order within the batch
+        for future, commit, error in finished:
+            result = None
+            if error is None:
+                try:
+                    result = commit()
+                except Exception as e:
+                    error = e
+            if isinstance(error, self.invalid_types):
+                self.invalid += 1
+            elif error is not None:
+                self.errors += 1
+            if future.done():
+                continue  # Caller went away; the payload is committed regardless
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            processed, batches = self.processed, self.batches
+            detect_seconds, wait_seconds = self._detect_seconds, self._wait_seconds
+        return {
+            "queue_depth": self.depth,
+            "max_queue": self.max_queue,
+            "peak_queue_depth": self.peak_depth,
+            "workers": self.workers,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": processed,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "avg_batch_size": round(processed / batches, 2) if batches else 0,
+            "avg_queue_wait_ms": round(wait_seconds / processed * 1000, 2) if processed else 0,
+            "avg_detect_ms": round(detect_seconds / processed * 1000, 2) if processed else 0
+        }
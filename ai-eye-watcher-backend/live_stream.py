@@ -0,0 +1,114 @@
+"""
+AI-Eye Watcher live stream
+Fan-out of server events (new alerts) to Server-Sent Events subscribers.
+Every message gets a sequence number; a bounded replay buffer lets a
+reconnecting client resume from its Last-Event-ID, and each subscriber has
+a bounded queue so a slow client is resynchronised with a snapshot instead
+of buffering without limit.
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import Dict, Any, Optional, List
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """Encode one Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'), default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscriber:
+    """One connected client: its topics and a bounded queue of encoded messages."""
+
+    def __init__(self, topics: set, max_queue: int):
+        self.topics = topics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+
+    def offer(self, topic: str, message: str):
+        if topic not in self.topics or self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Stop queueing; the stream sends a fresh snapshot instead
+            self.overflowed = True
+
+    def reset(self):
+        """Drop queued messages after an overflow; the caller sends a snapshot."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed = False
+
+
+class LiveStream:
+    """
+    Publishes sequenced messages to subscribers.
+
+    publish() may be called from the event loop or from worker threads;
+    off-loop calls are handed to the loop with call_soon_threadsafe.
+    """
+
+    def __init__(self, replay_size: int = 1000, max_queue: int = 256):
+        self.sequence = 0
+        self.max_queue = max_queue
+        self._replay = deque(maxlen=replay_size)  # (sequence, topic, message)
+        self._subscribers: List[Subscriber] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, topics: set) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(topics, self.max_queue)
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    def publish(self, topic: str, data: Dict[str, Any], event: Optional[str] = None):
+        """Send data to the topic's subscribers as an SSE event named `event` (default: the topic)."""
+        if self._loop is None:
+            return  # Nobody has ever subscribed
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._publish(topic, data, event)
+        else:
+            self._loop.call_soon_threadsafe(self._publish, topic, data, event)
+
+    def _publish(self, topic: str, data: Dict[str, Any], event: Optional[str] = None):
+        self.sequence += 1
+        message = format_sse(event or topic, data, self.sequence)
+        self._replay.append((self.sequence, topic, message))
+        for subscriber in self._subscribers:
+            subscriber.offer(topic, message)
+
+    def replay(self, subscriber: Subscriber, last_id: int) -> bool:
+        """
+        Queue the messages published after last_id for a resuming client.
+
+        Returns:
+            bool: False if the replay buffer no longer reaches back that far
+                  (or last_id is from another server run) and a snapshot is needed
+        """
+        if last_id > self.sequence:
+            return False
+        if last_id < self.sequence and (not self._replay or self._replay[0][0] > last_id + 1):
+            return False
+        for sequence, topic, message in self._replay:
+            if sequence > last_id:
+                subscriber.offer(topic, message)
+        return not subscriber.overflowed
@@ -0,0 +1,314 @@
+"""
+AI-Eye Watcher metric rollups
+Per-host and per-process-name CPU and memory statistics at 1 minute, 5
+minute and 1 hour resolution, kept long after the snapshots they came from
+have left the hot cache. Each resolution is a ring of a fixed number of
+buckets (an hour of minutes, a day of 5 minute buckets, a week of hours)
+holding the min, max, average and 95th percentile of each series.
+
+Samples are staged per open bucket, a fixed number per series (reservoir
+sampled beyond that), and reduced when the bucket closes: one batch of
+NumPy operations over every series of the table.
+"""
+
+import time
+import datetime
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+import numpy as np
+
+# name, seconds per bucket, buckets kept, samples staged per series and bucket
+RESOLUTIONS = (
+    ("1m", 60, 60, 8),
+    ("5m", 300, 288, 24),
+    ("1h", 3600, 168, 64),
+)
+STATISTICS = ("min", "max", "avg", "p95")
+MIN, MAX, AVG, P95 = range(4)
+
+
+def iso(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp).isoformat()
+
+
+class Resolution:
+    """One resolution of a RollupTable: bucket statistics and staged samples, a row per series."""
+
+    def __init__(self, name: str, seconds: int, size: int, capacity: int, metrics: int):
+        self.name = name
+        self.seconds = seconds
+        self.size = size
+        self.capacity = capacity
+        self.metrics = metrics
+        self.bucket: Optional[int] = None  # Bucket number being staged
+        self.slot_buckets = np.full(size, -1, dtype=np.int64)  # Bucket number each ring slot holds
+        self.stats = np.full((0, size, metrics, len(STATISTICS)), np.nan, dtype=np.float32)
+        self.counts = np.zeros((0, size), dtype=np.int32)
+        self.staging = np.full((0, capacity, metrics), np.nan, dtype=np.float32)
+        self.staged = np.zeros(0, dtype=np.int64)  # Samples seen per series in the open bucket
+
+    @property
+    def row_bytes(self) -> int:
+        return (self.stats[:1].nbytes + self.counts[:1].nbytes + self.staging[:1].nbytes
+                + self.staged[:1].nbytes) if len(self.staged) else 0
+
+    def grow(self, added: int):
+        self.stats = np.concatenate([self.stats, np.full((added,) + self.stats.shape[1:], np.nan, np.float32)])
+        self.counts = np.concatenate([self.counts, np.zeros((added, self.size), np.int32)])
+        self.staging = np.concatenate([self.staging, np.full((added,) + self.staging.shape[1:], np.nan, np.float32)])
+        self.staged = np.concatenate([self.staged, np.zeros(added, np.int64)])
+
+    def clear(self, row: int):
+        self.stats[row] = np.nan
+        self.counts[row] = 0
+        self.staging[row] = np.nan
+        self.staged[row] = 0
+
+    def advance(self, now: float):
+        """Close the open bucket if now is past it."""
+        bucket = int(now // self.seconds)
+        if self.bucket is None:
+            self.bucket = bucket
+        elif bucket > self.bucket:
+            self._close()
+            self.bucket = bucket
+
+    def stage(self, rows: np.ndarray, values: np.ndarray, rng: np.random.Generator):
+        seen = self.staged[rows]
+        # Once a series' staging is full, its n-th sample replaces a random one with probability capacity/n
+        positions = np.where(seen < self.capacity, seen, rng.integers(0, seen + 1))
+        kept = positions < self.capacity
+        self.staging[rows[kept], positions[kept]] = values[kept]
+        self.staged[rows] = seen + 1
+
+    def _close(self):
+        slot = self.bucket % self.size
+        self.slot_buckets[slot] = self.bucket
+        self.stats[:, slot] = np.nan
+        self.counts[:, slot] = 0
+        active = np.flatnonzero(self.staged)
+        if not active.size:
+            return
+        samples = np.sort(self.staging[active], axis=1)  # (series, capacity, metrics), missing values last
+        present = np.count_nonzero(~np.isnan(samples), axis=1)  # (series, metrics)
+        last = np.maximum(present - 1, 0)
+        rank = 0.95 * last
+        low = np.floor(rank).astype(np.int64)
+        high = np.ceil(rank).astype(np.int64)
+
+        def nth(index: np.ndarray) -> np.ndarray:
+            return np.take_along_axis(samples, index[:, None, :], axis=1)[:, 0, :]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average = np.nansum(samples, axis=1) / present
+        stats = np.stack([samples[:, 0, :], nth(last), average,
+                          nth(low) + (nth(high) - nth(low)) * (rank - low)], axis=-1)
+        stats[present == 0] = np.nan
+        self.stats[active, slot] = stats
+        self.counts[active, slot] = self.staged[active]
+        self.staging[active] = np.nan
+        self.staged[active] = 0
+
+    def window(self, since: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Bucket numbers and ring slots of the closed buckets starting at or after since, oldest first."""
+        if self.bucket is None:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+        buckets = np.arange(max(int(since // self.seconds), self.bucket - self.size), self.bucket)
+        slots = buckets % self.size
+        held = self.slot_buckets[slots] == buckets
+        return buckets[held], slots[held]
+
+
+class RollupTable:
+    """
+    Series sampling the same metrics, keyed by tuples; the least recently
+    updated series is dropped beyond max_series. Not thread-safe;
+    MetricRollups locks.
+    """
+
+    def __init__(self, metrics: Sequence[str], max_series: int, resolutions=RESOLUTIONS):
+        self.metrics = tuple(metrics)
+        self.max_series = max_series
+        self.resolutions = {name: Resolution(name, seconds, size, capacity, len(self.metrics))
+                            for name, seconds, size, capacity in resolutions}
+        self._series: "OrderedDict[tuple, int]" = OrderedDict()  # key -> row, least recently updated first
+        self._rows_used = 0
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._series
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def keys(self) -> List[tuple]:
+        return list(self._series)
+
+    def _row(self, key: tuple) -> int:
+        row = self._series.get(key)
+        if row is not None:
+            self._series.move_to_end(key)
+            return row
+        if len(self._series) >= self.max_series:
+            _, row = self._series.popitem(last=False)
+            for resolution in self.resolutions.values():
+                resolution.clear(row)
+        else:
+            row = self._rows_used
+            self._rows_used += 1
+            allocated = len(next(iter(self.resolutions.values())).staged)
+            if row == allocated:
+                added = min(max(256, row), self.max_series - row)
+                for resolution in self.resolutions.values():
+                    resolution.grow(added)
+        self._series[key] = row
+        return row
+
+    def advance(self, now: float):
+        for resolution in self.resolutions.values():
+            resolution.advance(now)
+
+    def observe(self, keys: List[tuple], values: np.ndarray, now: float, rng: np.random.Generator):
+        """Add one sample (a row of values, one per metric) to each of the series in keys."""
+        rows = np.fromiter((self._row(key) for key in keys), dtype=np.int64, count=len(keys))
+        for resolution in self.resolutions.values():
+            resolution.advance(now)
+            resolution.stage(rows, values, rng)
+
+    def series(self, key: tuple, resolution: str, since: float) -> List[Dict[str, Any]]:
+        """The closed buckets of one series since `since`, oldest first."""
+        row = self._series.get(key)
+        if row is None:
+            return []
+        level = self.resolutions[resolution]
+        buckets, slots = level.window(since)
+        counts = level.counts[row, slots]
+        stats = level.stats[row, slots]
+        return [dict({"start": iso(bucket * level.seconds), "samples": int(count)},
+                     **{metric: {name: round(float(value), 2) for name, value in zip(STATISTICS, values)}
+                        for metric, values in zip(self.metrics, bucket_stats)})
+                for bucket, count, bucket_stats in zip(buckets, counts, stats) if count]
+
+    def rank(self, keys: List[tuple], metric: str, resolution: str, since: float) -> List[Dict[str, Any]]:
+        """
+        Per series in keys, over the closed buckets since `since`: the
+        average weighted by samples, the maximum and the highest bucket p95.
+        """
+        if not keys:
+            return []
+        level = self.resolutions[resolution]
+        _, slots = level.window(since)
+        rows = np.array([self._series[key] for key in keys], dtype=np.int64)
+        counts = level.counts[np.ix_(rows, slots)]
+        stats = level.stats[np.ix_(rows, slots)][:, :, self.metrics.index(metric), :]  # (series, buckets, stats)
+        counted = (counts > 0) & ~np.isnan(stats[:, :, AVG])
+        samples = np.where(counted, counts, 0).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            average = np.where(counted, stats[:, :, AVG] * counts, 0).sum(axis=1) / samples
+        maximum = np.where(counted, stats[:, :, MAX], -np.inf).max(axis=1, initial=-np.inf)
+        peak_p95 = np.where(counted, stats[:, :, P95], -np.inf).max(axis=1, initial=-np.inf)
+        return [{"key": key, "samples": int(count), "avg": round(float(avg), 2),
+                 "max": round(float(top), 2), "peak_p95": round(float(p95), 2)}
+                for key, count, avg, top, p95 in zip(keys, samples, average, maximum, peak_p95) if count]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "series": len(self._series),
+            "max_series": self.max_series,
+            "bytes": sum(resolution.row_bytes * len(resolution.staged) for resolution in self.resolutions.values())
+        }
+
+
+class MetricRollups:
+    """
+    Rollups of the snapshots of every host. Thread-safe. Times are POSIX
+    timestamps of the server receiving the telemetry.
+
+    A host's series sample the sum of its processes' cpu_percent (100 is
+    one core) and memory_percent, and its memory_available. A process name
+    gets a series on a host once its processes there use min_cpu percent
+    CPU or min_memory percent memory in one snapshot, so idle processes
+    don't take up space.
+    """
+
+    HOST_METRICS = ("cpu_percent", "memory_percent", "memory_available")
+    PROCESS_METRICS = ("cpu_percent", "memory_percent")
+
+    def __init__(self, max_hosts: int = 2000, max_process_series: int = 10000, min_cpu: float = 1.0,
+                 min_memory: float = 1.0, seed: Optional[int] = None):
+        self.min_cpu = min_cpu
+        self.min_memory = min_memory
+        self.hosts = RollupTable(self.HOST_METRICS, max_hosts)
+        self.processes = RollupTable(self.PROCESS_METRICS, max_process_series)
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def observe(self, hostname: str, processes: List[Dict[str, Any]], system_info: Optional[Dict[str, Any]],
+                now: Optional[float] = None):
+        """Add a snapshot's processes (dicts with name, cpu_percent and memory_percent) and memory."""
+        now = now or time.time()
+        totals: Dict[str, List[float]] = {}
+        host_cpu = host_memory = 0.0
+        for process in processes:
+            cpu = process.get("cpu_percent") or 0.0
+            memory = process.get("memory_percent") or 0.0
+            host_cpu += cpu
+            host_memory += memory
+            name = process.get("name")
+            if name:
+                total = totals.get(name)
+                if total is None:
+                    totals[name] = [cpu, memory]
+                else:
+                    total[0] += cpu
+                    total[1] += memory
+        available = (system_info or {}).get("memory_available")
+        host_values = np.array([[host_cpu, host_memory, np.nan if available is None else available]])
+        with self._lock:
+            self.hosts.observe([(hostname,)], host_values, now, self._rng)
+            tracked = [(name, total) for name, total in totals.items()
+                       if total[0] >= self.min_cpu or total[1] >= self.min_memory or (hostname, name) in self.processes]
+            self.processes.advance(now)
+            if tracked:
+                self.processes.observe([(hostname, name) for name, _ in tracked],
+                                       np.array([total for _, total in tracked]), now, self._rng)
+
+    def host_series(self, hostname: str, resolution: str, since: float,
+                    now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """A host's buckets since `since`, oldest first; the bucket still open isn't included."""
+        with self._lock:
+            self.hosts.advance(now or time.time())
+            return self.hosts.series((hostname,), resolution, since)
+
+    def process_series(self, hostname: str, name: str, resolution: str, since: float,
+                       now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """A process name's buckets on a host since `since`, oldest first."""
+        with self._lock:
+            self.processes.advance(now or time.time())
+            return self.processes.series((hostname, name), resolution, since)
+
+    def top(self, metric: str, resolution: str, since: float, hostname: Optional[str] = None, limit: int = 10,
+            now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Process names by average `metric` since `since`, highest first, on
+        one host or every host. Each is {"host", "process_name", "samples",
+        "avg", "max", "peak_p95"}.
+        """
+        with self._lock:
+            self.processes.advance(now or time.time())
+            keys = [key for key in self.processes.keys() if hostname is None or key[0] == hostname]
+            ranked = self.processes.rank(keys, metric, resolution, since)
+        ranked.sort(key=lambda entry: entry["avg"], reverse=True)
+        return [dict(host=entry["key"][0], process_name=entry["key"][1],
+                     **{field: entry[field] for field in ("samples", "avg", "max", "peak_p95")})
+                for entry in ranked[:limit]]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hosts": self.hosts.stats(),
+                "processes": self.processes.stats(),
+                "resolutions": {name: {"bucket_seconds": seconds, "buckets": size}
+                                for name, seconds, size, _ in RESOLUTIONS}
+            }
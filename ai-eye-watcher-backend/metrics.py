@@ -0,0 +1,155 @@
+"""
+AI-Eye Watcher metrics
+Counters, gauges and histograms rendered in the Prometheus text exposition
+format, cheap enough to update on every event. Each thread records into
+its own shard of a metric, so an update takes no lock and is never lost
+to a race; a scrape sums the shards. Figures the server already tracks
+(buffer occupancy, queue depth, ...) are exported through callbacks read
+at scrape time rather than updated on the hot path.
+"""
+
+import math
+import threading
+from bisect import bisect_left
+from typing import List, Dict, Any, Optional, Callable, Sequence, Tuple
+
+# Seconds; from 100µs (one threat match) to 10s (a stalled commit)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    """A metric family. Values are per label tuple, positional in labelnames order."""
+
+    type = "untyped"
+
+    def __init__(self, registry: "Registry", name: str, help: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Any]] = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.callback = callback  # Returns a number, or {labels: number}
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()  # Only taken when a thread first records
+        registry.register(self)
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _merged(self) -> Dict[Labels, float]:
+        totals: Dict[Labels, float] = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for labels, value in list(shard.items()):
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def samples(self) -> Dict[Labels, float]:
+        if self.callback is None:
+            return self._merged()
+        value = self.callback()
+        return value if isinstance(value, dict) else {(): value}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, value in sorted(self.samples().items()):
+            lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, labels: Labels = ()):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """A gauge read through its callback at scrape time."""
+
+    type = "gauge"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, registry: "Registry", name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 labelnames: Sequence[str] = ()):
+        self.buckets = tuple(buckets)
+        super().__init__(registry, name, help, labelnames)
+
+    def observe(self, value: float, labels: Labels = ()):
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            # Per bucket counts (the last one for +Inf), then the sum
+            counts = shard[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _merged_counts(self) -> Dict[Labels, List[float]]:
+        totals: Dict[Labels, List[float]] = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for labels, counts in list(shard.items()):
+                total = totals.setdefault(labels, [0] * len(counts))
+                for index, count in enumerate(list(counts)):
+                    total[index] += count
+        return totals
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for labels, counts in sorted(self._merged_counts().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format (version 0.0.4)."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,303 @@
+"""
+AI-Eye Watcher process trees
+Per-host process trees, updated incrementally at ingest, so "what spawned
+this process" and "what did it start" are answered by walking the tree
+rather than by re-reading stored snapshots. Processes are keyed by
+(pid, create_time), so a reused PID is a different node. A parent is the
+process with the child's ppid that was created at or before the child.
+
+Processes that exit stay in the tree for the retention period, so the
+ancestry of a short-lived process can still be traced after its parent
+has gone. Nodes hold only what lineage needs (names and users, not
+command lines), about 100 KB per host of 300 processes.
+"""
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+Key = Tuple[int, Optional[float]]
+
+
+class ProcessNode:
+    __slots__ = ("pid", "create_time", "ppid", "name", "user", "parent", "children", "exited")
+
+    def __init__(self, pid: int, create_time: Optional[float], ppid: Optional[int], name: Optional[str],
+                 user: Optional[str]):
+        self.pid = pid
+        self.create_time = create_time
+        self.ppid = ppid
+        self.name = sys.intern(name) if name else name
+        self.user = sys.intern(user) if user else user
+        self.parent: Optional[Key] = None
+        self.children: Optional[List[Key]] = None  # Most processes have none
+        self.exited: Optional[float] = None
+
+    @property
+    def key(self) -> Key:
+        return (self.pid, self.create_time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "pid": self.pid,
+            "create_time": self.create_time,
+            "ppid": self.ppid,
+            "name": self.name,
+            "user": self.user,
+            "running": self.exited is None
+        }
+
+
+def created_before(parent: ProcessNode, child: ProcessNode) -> bool:
+    if parent.create_time is None or child.create_time is None:
+        return True
+    return parent.create_time <= child.create_time
+
+
+class ProcessTree:
+    """One host's processes, live and recently exited. Not thread-safe; ProcessTrees locks."""
+
+    def __init__(self, max_exited: int = 1024):
+        self.max_exited = max_exited
+        self.nodes: Dict[Key, ProcessNode] = {}
+        self.live: set = set()
+        self._by_pid: Dict[int, List[Key]] = {}  # pid -> keys, oldest first
+        self._orphans: Dict[int, List[Key]] = {}  # ppid -> nodes whose parent hasn't been seen
+        self._exited: "OrderedDict[Key, None]" = OrderedDict()  # exit order
+
+    def _parent_of(self, node: ProcessNode) -> Optional[Key]:
+        """The most recently created process with the node's ppid that predates it."""
+        for key in reversed(self._by_pid.get(node.ppid, ())):
+            candidate = self.nodes[key]
+            if candidate is not node and created_before(candidate, node):
+                return key
+        return None
+
+    def _link(self, node: ProcessNode, parent_key: Key):
+        node.parent = parent_key
+        parent = self.nodes[parent_key]
+        if parent.children is None:
+            parent.children = []
+        parent.children.append(node.key)
+
+    def _attach(self, node: ProcessNode):
+        """Link a node to its parent, or wait for the parent to be reported."""
+        parent_key = self._parent_of(node)
+        if parent_key is not None:
+            self._link(node, parent_key)
+        else:
+            self._orphans.setdefault(node.ppid, []).append(node.key)
+
+    def _refresh(self, node: ProcessNode, process: Dict[str, Any]):
+        """
+        Take the name and user a process has now, e.g. after an exec. A ppid
+        is only filled in if the node had none: after its parent exits a
+        process is reparented, and lineage keeps the parent that started it.
+        """
+        name, user = process.get("name"), process.get("user")
+        if name and name != node.name:
+            node.name = sys.intern(name)
+        if user and user != node.user:
+            node.user = sys.intern(user)
+        if node.ppid is None and process.get("ppid") is not None:
+            node.ppid = process["ppid"]
+            self._attach(node)
+
+    def add(self, process: Dict[str, Any]) -> ProcessNode:
+        key = (process["pid"], process.get("create_time"))
+        node = self.nodes.get(key)
+        if node is not None:
+            self._refresh(node, process)
+            return node
+        node = ProcessNode(process["pid"], process.get("create_time"), process.get("ppid"),
+                           process.get("name"), process.get("user"))
+        self.nodes[key] = node
+        self._by_pid.setdefault(node.pid, []).append(key)
+        self._by_pid[node.pid].sort(key=lambda k: k[1] if k[1] is not None else float("-inf"))
+        if node.ppid is not None:
+            self._attach(node)
+        # Children reported before this process, e.g. one inspected later by the agent
+        waiting = self._orphans.get(node.pid)
+        if waiting:
+            for orphan_key in list(waiting):
+                orphan = self.nodes.get(orphan_key)
+                if orphan is not None and created_before(node, orphan):
+                    self._link(orphan, key)
+                    waiting.remove(orphan_key)
+            if not waiting:
+                del self._orphans[node.pid]
+        return node
+
+    def exit(self, key: Key, now: float):
+        node = self.nodes.get(key)
+        if node is None or node.exited is not None:
+            return
+        node.exited = now
+        self.live.discard(key)
+        self._exited[key] = None
+        while len(self._exited) > self.max_exited:
+            self._remove(next(iter(self._exited)))
+
+    def revive(self, node: ProcessNode):
+        node.exited = None
+        self._exited.pop(node.key, None)
+
+    def expire(self, cutoff: float):
+        """Remove processes that exited before cutoff."""
+        while self._exited:
+            key = next(iter(self._exited))
+            if self.nodes[key].exited >= cutoff:
+                break
+            self._remove(key)
+
+    def _remove(self, key: Key):
+        self._exited.pop(key, None)
+        node = self.nodes.pop(key)
+        keys = self._by_pid.get(node.pid)
+        if keys is not None:
+            keys.remove(key)
+            if not keys:
+                del self._by_pid[node.pid]
+        if node.parent is not None:
+            parent = self.nodes.get(node.parent)
+            if parent is not None and parent.children:
+                parent.children.remove(key)
+        elif node.ppid is not None:
+            orphans = self._orphans.get(node.ppid)
+            if orphans and key in orphans:
+                orphans.remove(key)
+                if not orphans:
+                    del self._orphans[node.ppid]
+        # Children keep their ppid but lose the link; ancestry ends here
+        for child_key in node.children or ():
+            child = self.nodes.get(child_key)
+            if child is not None:
+                child.parent = None
+
+    def find(self, pid: int, create_time: Optional[float] = None) -> Optional[ProcessNode]:
+        if create_time is not None:
+            return self.nodes.get((pid, create_time))
+        keys = self._by_pid.get(pid)
+        if not keys:
+            return None
+        live = [key for key in keys if key in self.live]
+        return self.nodes[(live or keys)[-1]]
+
+    def ancestors(self, node: ProcessNode, limit: int = 64) -> List[ProcessNode]:
+        """Parent first; time proportional to the depth of the node."""
+        chain = []
+        while node.parent is not None and len(chain) < limit:
+            node = self.nodes.get(node.parent)
+            if node is None:
+                break
+            chain.append(node)
+        return chain
+
+    def descendants(self, node: ProcessNode, max_depth: int, limit: int = 1000) -> List[Tuple[int, ProcessNode]]:
+        """(depth, node) pairs, depth first in creation order."""
+        found = []
+        stack = [(1, key) for key in reversed(node.children or ())]
+        while stack and len(found) < limit:
+            depth, key = stack.pop()
+            child = self.nodes.get(key)
+            if child is None:
+                continue
+            found.append((depth, child))
+            if depth < max_depth:
+                stack.extend((depth + 1, grandchild) for grandchild in reversed(child.children or ()))
+        return found
+
+
+class ProcessTrees:
+    """
+    Process trees of the most recently reporting hosts (at most max_hosts).
+    Thread-safe.
+    """
+
+    def __init__(self, max_hosts: int = 5000, retention: float = 3600.0, max_exited: int = 1024):
+        self.max_hosts = max_hosts
+        self.retention = retention
+        self.max_exited = max_exited
+        self._trees: "OrderedDict[str, ProcessTree]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _tree(self, hostname: str) -> ProcessTree:
+        tree = self._trees.get(hostname)
+        if tree is None:
+            tree = self._trees[hostname] = ProcessTree(self.max_exited)
+            while len(self._trees) > self.max_hosts:
+                self._trees.popitem(last=False)
+        else:
+            self._trees.move_to_end(hostname)
+        return tree
+
+    def update(self, hostname: str, processes: List[Dict[str, Any]],
+               process_events: List[Dict[str, Any]] = (), now: Optional[float] = None):
+        """
+        Apply a full snapshot: its processes are the host's live processes,
+        and live processes missing from it have exited. Lifecycle events
+        add processes that started and exited between snapshots; one that
+        started but isn't in the snapshot counts as live until the next.
+        """
+        now = now or time.time()
+        with self._lock:
+            tree = self._tree(hostname)
+            current = {(process["pid"], process.get("create_time")) for process in processes}
+            started = set()
+            # Events predate the snapshot, so the snapshot's names and users win
+            for event in sorted(process_events, key=lambda event: event.get("timestamp") or 0):
+                key = (event["pid"], event.get("create_time"))
+                if event.get("event") == "exec":
+                    started.add(tree.add(event).key)
+                elif event.get("event") == "exit" and key not in current:
+                    tree.add(event)
+                    tree.exit(key, event.get("timestamp") or now)
+            for process in processes:
+                node = tree.add(process)
+                if node.exited is not None:
+                    tree.revive(node)  # Missed by an earlier snapshot
+            for key in tree.live - current:
+                tree.exit(key, now)
+            # Started but missing from the snapshot, with no exit event (yet): live
+            # until a snapshot lacks them, so a lost exit event doesn't keep them forever
+            tree.live = current | {key for key in started - current
+                                   if key in tree.nodes and tree.nodes[key].exited is None}
+            tree.expire(now - self.retention)
+
+    def ancestry(self, hostname: str, pid: int, create_time: Optional[float] = None) -> List[Dict[str, Any]]:
+        """A process's ancestors, parent first; empty if the process isn't known."""
+        with self._lock:
+            tree = self._trees.get(hostname)
+            node = tree.find(pid, create_time) if tree is not None else None
+            if node is None:
+                return []
+            return [{"pid": ancestor.pid, "name": ancestor.name} for ancestor in tree.ancestors(node)]
+
+    def lineage(self, hostname: str, pid: int, create_time: Optional[float] = None,
+                depth: int = 3) -> Optional[Dict[str, Any]]:
+        """
+        A process with its ancestors (parent first) and its descendants up
+        to `depth` generations; None if the process isn't known.
+        """
+        with self._lock:
+            tree = self._trees.get(hostname)
+            node = tree.find(pid, create_time) if tree is not None else None
+            if node is None:
+                return None
+            return {
+                "process": node.to_dict(),
+                "ancestors": [ancestor.to_dict() for ancestor in tree.ancestors(node)],
+                "descendants": [dict(child.to_dict(), depth=level, parent_pid=child.ppid)
+                                for level, child in tree.descendants(node, depth)]
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hosts": len(self._trees),
+                "max_hosts": self.max_hosts,
+                "processes": sum(len(tree.nodes) for tree in self._trees.values()),
+                "retention_seconds": self.retention
+            }
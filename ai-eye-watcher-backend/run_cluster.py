@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+AI-Eye Watcher cluster launcher
+Runs several Central Server workers on consecutive ports, sharing state
+through state_broker.py (started here) or an existing Redis. Agents and the
+dashboard can use any worker: requests for a host are redirected to the
+worker that owns it.
+
+Usage:
+    python run_cluster.py --workers 4 --port 9000
+    python run_cluster.py --workers 4 --state-url redis://redis.internal:6379/0 --advertise-host 10.0.0.5
+"""
+
+import os
+import sys
+import time
+import signal
+import argparse
+import subprocess
+from typing import List
+
+
+def start_workers(count: int, port: int, state_url: str, advertise_host: str, bind: str,
+                  log_level: str = "warning") -> List[subprocess.Popen]:
+    workers = []
+    for index in range(count):
+        env = dict(os.environ,
+                   AIEYE_STATE_BACKEND=state_url,
+                   AIEYE_WORKER_URL=f"http://{advertise_host}:{port + index}")
+        workers.append(subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "central_server:app",
+             "--host", bind, "--port", str(port + index), "--log-level", log_level],
+            env=env
+        ))
+    return workers
+
+
+def start_broker(port: int) -> subprocess.Popen:
+    broker = subprocess.Popen([sys.executable, "state_broker.py", "--port", str(port)])
+    time.sleep(0.5)  # Let it bind before the workers connect
+    return broker
+
+
+def stop(processes: List[subprocess.Popen]):
+    """Stop processes in reverse start order, so workers exit before the broker they use."""
+    for process in reversed(processes):
+        if process.poll() is None:
+            process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI-Eye Watcher cluster launcher")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--port", type=int, default=9000, help="Port of the first worker")
+    parser.add_argument("--bind", default="127.0.0.1", help="Address the workers listen on")
+    parser.add_argument("--advertise-host", default="localhost",
+                        help="Host name agents use to reach this node's workers")
+    parser.add_argument("--state-url", help="Shared state backend (redis://...); default: start state_broker.py")
+    parser.add_argument("--broker-port", type=int, default=6390)
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    processes = []
+    state_url = args.state_url
+    if state_url is None:
+        processes.append(start_broker(args.broker_port))
+        state_url = f"redis://127.0.0.1:{args.broker_port}/0"
+    processes += start_workers(args.workers, args.port, state_url, args.advertise_host, args.bind, args.log_level)
+    print(f"{args.workers} workers on ports {args.port}-{args.port + args.workers - 1}, state at {state_url}")
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        while all(process.poll() is None for process in processes):
+            time.sleep(1)
+        print("A cluster process exited; stopping the others")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop(processes)
+
+
+if __name__ == "__main__":
+    main()
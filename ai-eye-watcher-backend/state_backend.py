@@ -0,0 +1,504 @@
+"""
+AI-Eye Watcher state backend
+State that the Central Server's workers must share. It covers three things:
+
+- per-host command queues, with leases, results and deduplication
+- a cluster log of changes (alerts recorded, commands queued and taken),
+  which every worker replays into its own indexes and counters
+- the set of live workers, which decides the worker that owns each host
+
+LocalStateBackend keeps all of it inside one process, for a single worker.
+RedisStateBackend keeps it in Redis, or in the Redis-compatible broker that
+ships with the server (state_broker.py). Any number of workers, on any
+number of nodes, can then run against it.
+"""
+
+import json
+import time
+import socket
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+
+class BackendError(Exception):
+    """The state backend is unreachable or rejected a command."""
+
+
+def owner(hostname: str, worker_ids: List[str]) -> Optional[str]:
+    """
+    Worker that owns a host, by rendezvous hashing. When a worker joins or
+    leaves, only the hosts it owns (or is about to own) change owner.
+    """
+    if not worker_ids:
+        return None
+    return max(worker_ids, key=lambda worker_id: hashlib.sha1(f"{worker_id}/{hostname}".encode()).digest())
+
+
+def command_state(record: Dict[str, Any], result: Optional[Dict[str, Any]], leased: bool) -> Dict[str, Any]:
+    """Public view of a command: the command, its host, timing and delivery status."""
+    if result is not None:
+        status = result["status"]
+    elif record["expires_at"] <= time.time():
+        status = "expired"
+    else:
+        status = "delivered" if leased else "pending"
+    return dict(record["command"], host=record["host"], status=status, queued_at=record["queued_at"],
+                expires_at=record["expires_at"], result=result)
+
+
+class StateBackend:
+    """
+    Interface shared by the state backends.
+
+    A queued command stays outstanding until its host reports a result or
+    its TTL passes. Leasing hands it to one poll; if no result arrives
+    before the lease runs out it is handed out again. While a command is
+    outstanding, and after a failed result until its TTL passes, queueing
+    another with the same dedup key does nothing.
+    """
+
+    shared = False  # True when other workers can see this state
+
+    def queue_command(self, hostname: str, command: Dict[str, Any], ttl: float,
+                      dedup_key: Optional[str] = None) -> bool:
+        """Queue a command; False when it duplicates one still in effect."""
+        raise NotImplementedError
+
+    def lease_commands(self, hostname: str, lease_seconds: float, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Outstanding commands not currently leased, oldest first, each leased
+        to the caller and carrying the time it was queued (queued_at) and
+        whether an earlier lease of it lapsed without a result (redelivered).
+        """
+        raise NotImplementedError
+
+    def complete_command(self, command_id: str, result: Dict[str, Any]) -> bool:
+        """Record a command's result; False if one was already recorded."""
+        raise NotImplementedError
+
+    def outstanding_commands(self, hostname: str) -> int:
+        """Commands queued for a host that have neither a result nor expired."""
+        raise NotImplementedError
+
+    def command_status(self, command_id: str) -> Optional[Dict[str, Any]]:
+        """The command with its host, status and result; None once forgotten."""
+        raise NotImplementedError
+
+    def publish(self, entry: Dict[str, Any]):
+        """Append an entry to the cluster log."""
+        raise NotImplementedError
+
+    def log_position(self) -> str:
+        """Cursor for the end of the cluster log, for a worker that is starting up."""
+        raise NotImplementedError
+
+    def read_log(self, after: str, limit: int = 1000) -> Tuple[List[Dict[str, Any]], str]:
+        """Entries after the cursor, oldest first, and the cursor to continue from."""
+        raise NotImplementedError
+
+    def heartbeat(self, worker_id: str, info: Dict[str, Any]):
+        """Register a worker (url, stats) as alive."""
+        raise NotImplementedError
+
+    def workers(self) -> Dict[str, Dict[str, Any]]:
+        """Live workers' latest heartbeat info, by worker id."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class LocalStateBackend(StateBackend):
+    """In-process state for a single worker; the cluster log is not kept."""
+
+    def __init__(self, command_retention: float = 3600.0):
+        self.command_retention = command_retention
+        self._records: Dict[str, Dict[str, Any]] = {}         # command id -> record, oldest first
+        self._outstanding: Dict[str, Dict[str, float]] = {}   # host -> command id -> expires_at
+        self._leases: Dict[str, float] = {}                   # command id -> lease deadline
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._dedup: Dict[tuple, Tuple[str, float]] = {}      # (host, key) -> (command id, expires_at)
+        self._workers: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _forget_old(self, now: float):
+        # Records are kept in queueing order and all live ttl + retention
+        for command_id in list(self._records):
+            record = self._records[command_id]
+            if record["expires_at"] + self.command_retention > now:
+                break
+            del self._records[command_id]
+            self._results.pop(command_id, None)
+            self._leases.pop(command_id, None)
+            self._outstanding.get(record["host"], {}).pop(command_id, None)
+            dedup = (record["host"], record["dedup_key"])
+            if self._dedup.get(dedup, (None,))[0] == command_id:
+                del self._dedup[dedup]
+        # Keys of commands that failed, expired or were never picked up
+        for dedup in [dedup for dedup, (_, expires_at) in self._dedup.items() if expires_at <= now]:
+            del self._dedup[dedup]
+
+    def _prune_host(self, hostname: str, now: float) -> Dict[str, float]:
+        outstanding = self._outstanding.get(hostname, {})
+        for command_id in [command_id for command_id, expires_at in outstanding.items() if expires_at <= now]:
+            del outstanding[command_id]
+            self._leases.pop(command_id, None)
+        if not outstanding:
+            self._outstanding.pop(hostname, None)
+        return outstanding
+
+    def queue_command(self, hostname: str, command: Dict[str, Any], ttl: float,
+                      dedup_key: Optional[str] = None) -> bool:
+        now = time.time()
+        with self._lock:
+            self._forget_old(now)
+            if dedup_key is not None:
+                existing = self._dedup.get((hostname, dedup_key))
+                if existing is not None and existing[1] > now:
+                    return False
+                self._dedup[(hostname, dedup_key)] = (command["command_id"], now + ttl)
+            self._records[command["command_id"]] = {
+                "command": command, "host": hostname, "queued_at": now,
+                "expires_at": now + ttl, "dedup_key": dedup_key
+            }
+            self._outstanding.setdefault(hostname, {})[command["command_id"]] = now + ttl
+            return True
+
+    def lease_commands(self, hostname: str, lease_seconds: float, limit: int = 100) -> List[Dict[str, Any]]:
+        now = time.time()
+        commands = []
+        with self._lock:
+            for command_id in self._prune_host(hostname, now):
+                if len(commands) >= limit:
+                    break
+                if self._leases.get(command_id, 0) > now:
+                    continue
+                redelivered = command_id in self._leases
+                self._leases[command_id] = now + lease_seconds
+                record = self._records[command_id]
+                commands.append(dict(record["command"], queued_at=record["queued_at"], redelivered=redelivered))
+        return commands
+
+    def complete_command(self, command_id: str, result: Dict[str, Any]) -> bool:
+        with self._lock:
+            record = self._records.get(command_id)
+            if record is None or command_id in self._results:
+                return False
+            self._results[command_id] = result
+            self._leases.pop(command_id, None)
+            self._outstanding.get(record["host"], {}).pop(command_id, None)
+            self._prune_host(record["host"], time.time())
+            dedup = (record["host"], record["dedup_key"])
+            # A command that worked may be needed again; a failed one is not retried until its TTL passes
+            if result["status"] == "succeeded" and self._dedup.get(dedup, (None,))[0] == command_id:
+                del self._dedup[dedup]
+            return True
+
+    def outstanding_commands(self, hostname: str) -> int:
+        with self._lock:
+            return len(self._prune_host(hostname, time.time()))
+
+    def command_status(self, command_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            record = self._records.get(command_id)
+            if record is None:
+                return None
+            return command_state(record, self._results.get(command_id),
+                                 self._leases.get(command_id, 0) > time.time())
+
+    def publish(self, entry: Dict[str, Any]):
+        pass  # No other workers to tell
+
+    def log_position(self) -> str:
+        return "0-0"
+
+    def read_log(self, after: str, limit: int = 1000) -> Tuple[List[Dict[str, Any]], str]:
+        return [], after
+
+    def heartbeat(self, worker_id: str, info: Dict[str, Any]):
+        self._workers = {worker_id: info}
+
+    def workers(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self._workers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "local", "outstanding_command_hosts": len(self._outstanding),
+                "commands_tracked": len(self._records)}
+
+
+class RespClient:
+    """
+    Minimal Redis protocol (RESP2) client over one TCP connection.
+
+    Thread-safe. A command is retried on a fresh connection only when
+    sending it on a reused connection failed, so a command the server may
+    already have executed (e.g. an LPOP) is never repeated.
+    """
+
+    def __init__(self, host: str, port: int, db: int = 0, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile("rb")
+        if self.db:
+            self._sock.sendall(self._encode(("SELECT", self.db)))
+            self._read()
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+    @staticmethod
+    def _encode(args) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def _read(self):
+        line = self._file.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by state backend")
+        kind, value = line[:1], line[1:-2]
+        if kind == b"+":
+            return value.decode()
+        if kind == b"-":
+            raise BackendError(value.decode())
+        if kind == b":":
+            return int(value)
+        if kind == b"$":
+            length = int(value)
+            if length < 0:
+                return None
+            data = self._file.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by state backend")
+            return data[:-2].decode()
+        if kind == b"*":
+            count = int(value)
+            return None if count < 0 else [self._read() for _ in range(count)]
+        raise BackendError(f"Unexpected reply from state backend: {line!r}")
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def pipeline(self, commands: List[tuple]) -> list:
+        """
+        Send several commands in one round trip and return their replies in
+        order. An error reply to any of them raises BackendError once all
+        replies have been read.
+        """
+        with self._lock:
+            request = b"".join(self._encode(args) for args in commands)
+            reused = self._sock is not None
+            try:
+                if self._sock is None:
+                    self._connect()
+                try:
+                    self._sock.sendall(request)
+                except OSError:
+                    if not reused:
+                        raise
+                    self._close()  # Stale connection: nothing was sent, so retrying is safe
+                    self._connect()
+                    self._sock.sendall(request)
+                replies = []
+                for _ in commands:
+                    try:
+                        replies.append(self._read())
+                    except BackendError as e:
+                        replies.append(e)
+            except (OSError, ConnectionError, ValueError) as e:
+                self._close()
+                raise BackendError(f"State backend {self.host}:{self.port} unavailable: {e}")
+        for reply in replies:
+            if isinstance(reply, BackendError):
+                raise reply
+        return replies
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+class RedisStateBackend(StateBackend):
+    """
+    State kept in Redis (6.2 or later) or in state_broker.py.
+
+    Each host's outstanding commands are a hash of command id -> expiry
+    time. A lease is a key set with NX and a PX expiry, so whichever poll
+    sets it gets the command, however many workers serve the host. Command
+    records, results and dedup keys are plain keys that expire on their
+    own. The cluster log is a stream capped at log_size entries.
+    """
+
+    shared = True
+    PREFIX = "aieye:"
+
+    def __init__(self, url: str, log_size: int = 10000, worker_ttl: float = 10.0,
+                 command_retention: float = 3600.0):
+        parsed = urlparse(url)
+        db = int(parsed.path.strip("/") or 0)
+        self.url = url
+        self.log_size = log_size
+        self.worker_ttl = worker_ttl
+        self.command_retention = command_retention
+        self.client = RespClient(parsed.hostname or "localhost", parsed.port or 6379, db)
+
+    def _key(self, *parts: str) -> str:
+        return self.PREFIX + ":".join(parts)
+
+    @staticmethod
+    def _ms(seconds: float) -> int:
+        return max(1, int(seconds * 1000))
+
+    def queue_command(self, hostname: str, command: Dict[str, Any], ttl: float,
+                      dedup_key: Optional[str] = None) -> bool:
+        command_id = command["command_id"]
+        if dedup_key is not None:
+            claimed = self.client.execute("SET", self._key("dedup", hostname, dedup_key), command_id,
+                                          "NX", "PX", self._ms(ttl))
+            if claimed is None:
+                return False
+        now = time.time()
+        record = {"command": command, "host": hostname, "queued_at": now,
+                  "expires_at": now + ttl, "dedup_key": dedup_key}
+        self.client.pipeline([
+            ("SET", self._key("command", command_id), json.dumps(record), "PX",
+             self._ms(ttl + self.command_retention)),
+            ("HSET", self._key("commands", hostname), command_id, repr(now + ttl)),
+        ])
+        return True
+
+    def _outstanding(self, hostname: str) -> List[str]:
+        """Outstanding command ids of a host, oldest first, dropping expired ones."""
+        fields = self.client.execute("HGETALL", self._key("commands", hostname)) or []
+        now = time.time()
+        live, expired = [], []
+        for command_id, expires_at in zip(fields[::2], fields[1::2]):
+            (live if float(expires_at) > now else expired).append((float(expires_at), command_id))
+        if expired:
+            self.client.execute("HDEL", self._key("commands", hostname), *[command_id for _, command_id in expired])
+        return [command_id for _, command_id in sorted(live)]
+
+    def lease_commands(self, hostname: str, lease_seconds: float, limit: int = 100) -> List[Dict[str, Any]]:
+        command_ids = self._outstanding(hostname)[:limit]
+        if not command_ids:
+            return []
+        claimed = self.client.pipeline([
+            ("SET", self._key("lease", command_id), "1", "NX", "PX", self._ms(lease_seconds))
+            for command_id in command_ids
+        ])
+        leased = [command_id for command_id, reply in zip(command_ids, claimed) if reply is not None]
+        if not leased:
+            return []
+        records = self.client.pipeline([("GET", self._key("command", command_id)) for command_id in leased])
+        records = [json.loads(record) for record in records if record is not None]
+        if not records:
+            return []
+        # Lease keys expire, so first deliveries are marked by a key that lives as long as the record
+        now = time.time()
+        first = self.client.pipeline([
+            ("SET", self._key("delivered", record["command"]["command_id"]), "1", "NX", "PX",
+             self._ms(record["expires_at"] - now + self.command_retention))
+            for record in records
+        ])
+        return [dict(record["command"], queued_at=record["queued_at"], redelivered=reply is None)
+                for record, reply in zip(records, first)]
+
+    def complete_command(self, command_id: str, result: Dict[str, Any]) -> bool:
+        record = self.client.execute("GET", self._key("command", command_id))
+        if record is None:
+            return False
+        record = json.loads(record)
+        stored = self.client.execute("SET", self._key("result", command_id), json.dumps(result),
+                                     "NX", "PX", self._ms(self.command_retention))
+        if stored is None:
+            return False
+        self.client.pipeline([
+            ("HDEL", self._key("commands", record["host"]), command_id),
+            ("DEL", self._key("lease", command_id)),
+        ])
+        # A command that worked may be needed again; a failed one is not retried until its TTL passes
+        if result["status"] == "succeeded" and record["dedup_key"] is not None:
+            dedup = self._key("dedup", record["host"], record["dedup_key"])
+            if self.client.execute("GET", dedup) == command_id:
+                self.client.execute("DEL", dedup)
+        return True
+
+    def outstanding_commands(self, hostname: str) -> int:
+        return len(self._outstanding(hostname))
+
+    def command_status(self, command_id: str) -> Optional[Dict[str, Any]]:
+        record, result, leased = self.client.pipeline([
+            ("GET", self._key("command", command_id)),
+            ("GET", self._key("result", command_id)),
+            ("EXISTS", self._key("lease", command_id)),
+        ])
+        if record is None:
+            return None
+        return command_state(json.loads(record), json.loads(result) if result is not None else None, bool(leased))
+
+    def publish(self, entry: Dict[str, Any]):
+        self.client.execute("XADD", self._key("log"), "MAXLEN", "~", self.log_size, "*",
+                            "entry", json.dumps(entry, default=str))
+
+    def log_position(self) -> str:
+        last = self.client.execute("XREVRANGE", self._key("log"), "+", "-", "COUNT", 1)
+        return last[0][0] if last else "0-0"
+
+    def read_log(self, after: str, limit: int = 1000) -> Tuple[List[Dict[str, Any]], str]:
+        records = self.client.execute("XRANGE", self._key("log"), f"({after}", "+", "COUNT", limit)
+        entries = []
+        for entry_id, fields in records or []:
+            after = entry_id
+            values = dict(zip(fields[::2], fields[1::2]))
+            entries.append(json.loads(values["entry"]))
+        return entries, after
+
+    def heartbeat(self, worker_id: str, info: Dict[str, Any]):
+        self.client.execute("HSET", self._key("workers"), worker_id, json.dumps(dict(info, seen=time.time())))
+
+    def workers(self) -> Dict[str, Dict[str, Any]]:
+        fields = self.client.execute("HGETALL", self._key("workers")) or []
+        now = time.time()
+        live = {}
+        for worker_id, value in zip(fields[::2], fields[1::2]):
+            info = json.loads(value)
+            if now - info.get("seen", 0) <= self.worker_ttl:
+                live[worker_id] = info
+        return live
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "url": self.url}
+
+    def close(self):
+        self.client.close()
+
+
+def create_backend(url: Optional[str]) -> StateBackend:
+    """Backend for a URL: "redis://host:port/db", or None/"local" for in-process state."""
+    if not url or url == "local":
+        return LocalStateBackend()
+    if urlparse(url).scheme != "redis":
+        raise ValueError(f"Unsupported state backend URL: {url}")
+    return RedisStateBackend(url)
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+AI-Eye Watcher state broker
+A small Redis-compatible server holding the shared state of a Central
+Server cluster in memory. It implements the subset of Redis commands that
+RedisStateBackend uses, so a cluster can run without installing Redis; point
+the workers at a real Redis instead when the state must survive a broker
+restart. Key expiry (SET ... PX) is supported.
+
+Usage:
+    python state_broker.py --port 6390
+"""
+
+import time
+import asyncio
+import logging
+import argparse
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CommandError(Exception):
+    """Reported to the client as a RESP error reply."""
+
+
+class SimpleString(str):
+    """A RESP simple string reply, e.g. +OK."""
+
+
+OK = SimpleString("OK")
+
+
+def encode(value) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, bool):
+        return b":%d\r\n" % int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, CommandError):
+        return b"-ERR %s\r\n" % str(value).encode()
+    if isinstance(value, SimpleString):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, (list, tuple)):
+        return b"*%d\r\n" % len(value) + b"".join(encode(item) for item in value)
+    if isinstance(value, str):
+        value = value.encode()
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class Stream:
+    """Append-only entries with increasing "<ms>-<seq>" ids."""
+
+    def __init__(self):
+        self.keys: List[Tuple[int, int]] = []
+        self.fields: List[List[bytes]] = []
+        self.last = (0, 0)
+
+    def add(self, fields: List[bytes], max_length: Optional[int]) -> str:
+        now = int(time.time() * 1000)
+        entry = (now, 0) if now > self.last[0] else (self.last[0], self.last[1] + 1)
+        self.keys.append(entry)
+        self.fields.append(fields)
+        self.last = entry
+        # Trimmed in chunks, like Redis' "MAXLEN ~", so appends stay cheap
+        if max_length is not None and len(self.keys) > max_length + max(1, max_length // 10):
+            del self.keys[:len(self.keys) - max_length]
+            del self.fields[:len(self.fields) - max_length]
+        return "%d-%d" % entry
+
+    @staticmethod
+    def bound(value: bytes, default_seq: int) -> Tuple[int, int]:
+        """An XRANGE bound as an inclusive (ms, seq) key; "(" makes it exclusive."""
+        exclusive = value.startswith(b"(")
+        text = value.lstrip(b"(").decode()
+        ms, _, seq = text.partition("-")
+        key = (int(ms), int(seq) if seq else default_seq)
+        if exclusive:
+            key = (key[0], key[1] + 1) if default_seq == 0 else (key[0], key[1] - 1)
+        return key
+
+    def range(self, start: bytes, end: bytes, count: Optional[int], reverse: bool = False) -> list:
+        low = (0, 0) if start == b"-" else self.bound(start, 0)
+        high = (2 ** 64, 0) if end == b"+" else self.bound(end, 2 ** 64)
+        first, last = bisect_left(self.keys, low), bisect_right(self.keys, high)
+        indexes = range(last - 1, first - 1, -1) if reverse else range(first, last)
+        if count is not None:
+            indexes = indexes[:count]
+        return [["%d-%d" % self.keys[index], self.fields[index]] for index in indexes]
+
+
+class Keyspace(dict):
+    """One database's keys. Keys set with an expiry vanish once it passes, as in Redis."""
+
+    def __init__(self):
+        super().__init__()
+        self.expires: Dict[bytes, float] = {}
+
+    def get(self, key, default=None):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.time():
+            self.pop(key)
+        return super().get(key, default)
+
+    def __setitem__(self, key, value):
+        self.expires.pop(key, None)
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.expires.pop(key, None)
+        super().__delitem__(key)
+
+    def pop(self, key, default=None):
+        self.expires.pop(key, None)
+        return super().pop(key, default)
+
+    def clear(self):
+        self.expires.clear()
+        super().clear()
+
+    def sweep(self):
+        """Drop every expired key, including ones nobody reads again."""
+        now = time.time()
+        for key in [key for key, deadline in self.expires.items() if deadline <= now]:
+            self.pop(key)
+
+
+class Broker:
+    """The keyspace and command implementations. Commands run one at a time on the event loop."""
+
+    SWEEP_EVERY = 1000  # commands between sweeps of expired keys
+
+    def __init__(self):
+        self.databases: Dict[int, Keyspace] = {}
+        self.commands_served = 0
+
+    def run(self, db: int, args: List[bytes]):
+        self.commands_served += 1
+        name = args[0].decode().upper()
+        handler = getattr(self, "cmd_" + name.lower(), None)
+        if handler is None:
+            raise CommandError(f"unknown command '{name}'")
+        keyspace = self.databases.get(db)
+        if keyspace is None:
+            keyspace = self.databases[db] = Keyspace()
+        if self.commands_served % self.SWEEP_EVERY == 0:
+            keyspace.sweep()
+        try:
+            return handler(keyspace, *args[1:])
+        except TypeError:
+            raise CommandError(f"wrong number of arguments for '{name}' command")
+        except ValueError:
+            raise CommandError("value is not an integer or out of range")
+
+    @staticmethod
+    def _typed(keyspace: Dict[bytes, Any], key: bytes, kind: type, create: bool = False):
+        value = keyspace.get(key)
+        if value is None:
+            if not create:
+                return None
+            value = keyspace[key] = kind()
+        elif not isinstance(value, kind):
+            raise CommandError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def cmd_ping(self, keyspace, *message):
+        return message[0] if message else SimpleString("PONG")
+
+    def cmd_flushdb(self, keyspace):
+        keyspace.clear()
+        return OK
+
+    def cmd_del(self, keyspace, *keys):
+        return sum(keyspace.get(key) is not None and keyspace.pop(key) is not None for key in keys)
+
+    def cmd_exists(self, keyspace, *keys):
+        if not keys:
+            raise TypeError
+        return sum(keyspace.get(key) is not None for key in keys)
+
+    def cmd_set(self, keyspace, key, value, *options):
+        options = [option.upper() for option in options]
+        deadline = None
+        condition = None
+        index = 0
+        while index < len(options):
+            option = options[index]
+            if option in (b"NX", b"XX"):
+                condition = option
+            elif option in (b"PX", b"EX") and index + 1 < len(options):
+                index += 1
+                amount = int(options[index])
+                if amount <= 0:
+                    raise CommandError("invalid expire time in 'set' command")
+                deadline = time.time() + (amount / 1000 if option == b"PX" else amount)
+            else:
+                raise CommandError("syntax error")
+            index += 1
+        exists = keyspace.get(key) is not None
+        if (condition == b"NX" and exists) or (condition == b"XX" and not exists):
+            return None
+        keyspace[key] = value
+        if deadline is not None:
+            keyspace.expires[key] = deadline
+        return OK
+
+    def cmd_get(self, keyspace, key):
+        return self._typed(keyspace, key, bytes)
+
+    def cmd_rpush(self, keyspace, key, *values):
+        if not values:
+            raise TypeError
+        items = self._typed(keyspace, key, deque, create=True)
+        items.extend(values)
+        return len(items)
+
+    def cmd_lpop(self, keyspace, key, count=None):
+        items = self._typed(keyspace, key, deque)
+        if not items:
+            return None
+        if count is None:
+            value = items.popleft()
+        else:
+            value = [items.popleft() for _ in range(min(int(count), len(items)))]
+        if not items:
+            del keyspace[key]
+        return value
+
+    def cmd_llen(self, keyspace, key):
+        items = self._typed(keyspace, key, deque)
+        return len(items) if items else 0
+
+    def cmd_hset(self, keyspace, key, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise TypeError
+        fields = self._typed(keyspace, key, dict, create=True)
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in fields
+            fields[field] = value
+        return added
+
+    def cmd_hdel(self, keyspace, key, *names):
+        fields = self._typed(keyspace, key, dict) or {}
+        removed = sum(fields.pop(name, None) is not None for name in names)
+        if key in keyspace and not fields:
+            del keyspace[key]
+        return removed
+
+    def cmd_hget(self, keyspace, key, name):
+        return (self._typed(keyspace, key, dict) or {}).get(name)
+
+    def cmd_hlen(self, keyspace, key):
+        return len(self._typed(keyspace, key, dict) or {})
+
+    def cmd_hgetall(self, keyspace, key):
+        fields = self._typed(keyspace, key, dict) or {}
+        return [item for pair in fields.items() for item in pair]
+
+    def cmd_xadd(self, keyspace, key, *args):
+        args = list(args)
+        max_length = None
+        if args and args[0].upper() == b"MAXLEN":
+            args.pop(0)
+            if args[0] in (b"~", b"="):
+                args.pop(0)
+            max_length = int(args.pop(0))
+        if not args or args.pop(0) != b"*":
+            raise CommandError("only auto-generated ('*') stream ids are supported")
+        if not args or len(args) % 2:
+            raise TypeError
+        return self._typed(keyspace, key, Stream, create=True).add(args, max_length)
+
+    def _count(self, args) -> Optional[int]:
+        if not args:
+            return None
+        if len(args) != 2 or args[0].upper() != b"COUNT":
+            raise CommandError("syntax error")
+        return int(args[1])
+
+    def cmd_xrange(self, keyspace, key, start, end, *args):
+        stream = self._typed(keyspace, key, Stream)
+        return stream.range(start, end, self._count(args)) if stream else []
+
+    def cmd_xrevrange(self, keyspace, key, end, start, *args):
+        stream = self._typed(keyspace, key, Stream)
+        return stream.range(start, end, self._count(args), reverse=True) if stream else []
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()  # Inline command, as typed into telnet/redis-cli
+    args = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()
+        length = int(header[1:])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+async def serve_client(broker: Broker, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    db = 0
+    try:
+        while True:
+            args = await read_command(reader)
+            if args is None:
+                break
+            if not args:
+                continue
+            if args[0].upper() == b"SELECT":
+                db = int(args[1])
+                reply = OK
+            else:
+                try:
+                    reply = broker.run(db, args)
+                except CommandError as e:
+                    reply = e
+            writer.write(encode(reply))
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int):
+    broker = Broker()
+    server = await asyncio.start_server(lambda r, w: serve_client(broker, r, w), host, port)
+    logger.info(f"State broker listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI-Eye Watcher state broker")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
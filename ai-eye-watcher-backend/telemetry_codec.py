@@ -0,0 +1,173 @@
+"""
+AI-Eye Watcher telemetry codec
+Compact columnar encoding for telemetry payloads, shared by the agent and
+the Central Server. Each list of processes or connections is sent as one
+array per field instead of one object per item, so field names appear once
+per payload, and repeated strings (process names, users, command lines,
+addresses) are sent once in a string table and referenced by index.
+
+The columnar document is serialized with msgpack when it is installed, or
+as JSON otherwise; the Content-Type says which. Plain JSON payloads are
+unaffected.
+"""
+
+import json
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterator
+
+try:
+    import msgpack
+except ImportError:  # Optional: the columnar document is sent as JSON without it
+    msgpack = None
+
+COLUMNAR_MSGPACK = "application/vnd.aieye.columnar+msgpack"
+COLUMNAR_JSON = "application/vnd.aieye.columnar+json"
+COLUMNAR_TYPES = (COLUMNAR_MSGPACK, COLUMNAR_JSON)
+FORMAT_VERSION = 1
+
+PROCESS_FIELDS = ("pid", "create_time", "name", "command_line", "user", "cpu_percent", "memory_percent",
+                  "sha256", "ppid")
+CONNECTION_FIELDS = ("local_address", "local_port", "remote_address", "remote_port", "status", "pid")
+STRING_FIELDS = {"name", "command_line", "user", "sha256", "local_address", "remote_address", "status", "event"}
+
+# Payload lists sent as columns, with the fields each may carry
+TABLES = {
+    "processes": PROCESS_FIELDS,
+    "processes_added": PROCESS_FIELDS,
+    "processes_removed": ("pid", "create_time"),
+    "process_events": PROCESS_FIELDS + ("event", "timestamp"),
+    "connections": CONNECTION_FIELDS,
+    "connections_added": CONNECTION_FIELDS,
+    "connections_removed": CONNECTION_FIELDS,
+}
+
+
+def preferred_content_type() -> str:
+    return COLUMNAR_MSGPACK if msgpack is not None else COLUMNAR_JSON
+
+
+def supported_content_types() -> List[str]:
+    return [COLUMNAR_MSGPACK, COLUMNAR_JSON] if msgpack is not None else [COLUMNAR_JSON]
+
+
+class StringTable:
+    def __init__(self):
+        self.strings: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+
+def encode(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a full or delta payload to its columnar form.
+
+    Lists named in TABLES become {"n": count, <field>: [values]}; a field
+    missing from every item is left out, and a field missing from some
+    items is sent as None for them. Everything else is copied unchanged.
+    """
+    strings = StringTable()
+    document = {"v": FORMAT_VERSION}
+    for key, value in payload.items():
+        fields = TABLES.get(key)
+        if fields is None or not isinstance(value, list):
+            document[key] = value
+            continue
+        columns: Dict[str, Any] = {"n": len(value)}
+        for field in fields:
+            column = [item.get(field) for item in value]
+            if all(cell is None for cell in column):
+                continue
+            columns[field] = [strings.add(cell) for cell in column] if field in STRING_FIELDS else column
+        document[key] = columns
+    document["strings"] = strings.strings
+    return document
+
+
+def table_rows(table: Dict[str, Any], strings: List[str]) -> Tuple[List[str], Iterator[tuple]]:
+    """
+    Field names of a columnar table, and its rows as tuples in that order
+    with string indexes resolved.
+
+    Raises:
+        ValueError: a column's length doesn't match the table's count
+    """
+    count = table["n"]
+    names, columns = [], []
+    for field, column in table.items():
+        if field == "n":
+            continue
+        if len(column) != count:
+            raise ValueError(f"Column {field} has {len(column)} values, expected {count}")
+        if field in STRING_FIELDS:
+            column = [strings[index] if index >= 0 else None for index in column]
+        names.append(field)
+        columns.append(column)
+    return names, (zip(*columns) if names else iter([()] * count))
+
+
+def decode(document: Dict[str, Any],
+           builders: Optional[Dict[str, Callable[[List[str], Iterator[tuple]], list]]] = None) -> Dict[str, Any]:
+    """
+    Convert a columnar document back to the plain payload dict that the
+    pydantic models validate.
+
+    Args:
+        document: Columnar document, as produced by encode()
+        builders: Optional per-table replacement for building row dicts,
+                  called with the field names and row tuples
+
+    Raises:
+        ValueError: the document is malformed
+    """
+    builders = builders or {}
+    try:
+        if document.get("v") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar format version: {document.get('v')}")
+        strings = document["strings"]
+        payload = {}
+        for key, value in document.items():
+            if key in ("v", "strings"):
+                continue
+            if key not in TABLES or not isinstance(value, dict):
+                payload[key] = value
+                continue
+            names, rows = table_rows(value, strings)
+            build = builders.get(key)
+            payload[key] = build(names, rows) if build else [dict(zip(names, row)) for row in rows]
+        return payload
+    except (KeyError, IndexError, TypeError, AttributeError) as e:
+        raise ValueError(f"Malformed columnar payload: {e!r}")
+
+
+def dumps(document: Any, content_type: str) -> bytes:
+    if content_type == COLUMNAR_MSGPACK:
+        return msgpack.packb(document)
+    return json.dumps(document, separators=(",", ":")).encode()
+
+
+def loads(data: bytes, content_type: str) -> Any:
+    """
+    Raises:
+        ValueError: the data can't be parsed, or msgpack isn't installed
+    """
+    if content_type == COLUMNAR_MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+        try:
+            return msgpack.unpackb(data)
+        except Exception as e:  # msgpack raises several unrelated exception types
+            raise ValueError(f"Corrupt msgpack body: {e}")
+    return json.loads(data)
+
+
+def parse_content_type(header: Optional[str]) -> Tuple[str, bool]:
+    """Media type of a Content-Type header, and whether it is a columnar type."""
+    media_type = (header or "application/json").split(";")[0].strip().lower()
+    return media_type, media_type in COLUMNAR_TYPES
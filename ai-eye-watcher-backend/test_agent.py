@@ -5,10 +5,24 @@ Tests the core functionality without running the full scheduled loop.
 """
 
 import sys
+import gzip
+import json
 import time
+import queue
+import logging
+import tempfile
+import threading
 import subprocess
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import requests
-from agent import collect_system_data, execute_kill_process, CENTRAL_SERVER_URL, AGENT_HOSTNAME
+import agent
+import telemetry_codec
+from agent import (collect_system_data, execute_kill_process, send_telemetry, delta_encoder,
+                   flush_spool, command_listener, TelemetrySpool, ProcessCollector,
+                   ProcessWatcher, RateLimitFilter, SamplingProfiler,
+                   collection_loop, upload_loop, queue_snapshot,
+                   CENTRAL_SERVER_URL, AGENT_HOSTNAME)
 
 def test_data_collection():
     """Test system data collection."""
@@ -27,6 +41,56 @@ def test_data_collection():
     
     return data
 
+def test_process_cache():
+    """Test that process handles are reused across cycles and new processes are picked up."""
+    print("Testing process cache...")
+    collector = ProcessCollector(cpu_budget_seconds=1.0)
+    collector.collect()
+    first = collector.last_cycle
+    
+    # A process started between cycles is inspected; the rest are only refreshed
+    sleeper = subprocess.Popen(["sleep", "30"])
+    try:
+        time.sleep(0.2)
+        processes = collector.collect()
+        second = collector.last_cycle
+    finally:
+        sleeper.kill()
+        sleeper.wait()
+    
+    print(f"  First cycle: {first}")
+    print(f"  Second cycle: {second}")
+    found = any(p["pid"] == sleeper.pid and p["create_time"] for p in processes)
+    return (found and second["inspected"] >= 1 and second["refreshed"] >= first["inspected"] - 5
+            and second["cpu_seconds"] <= 1.0)
+
+def test_process_events():
+    """Test that a short-lived process is captured and delivered between scans."""
+    print("Testing process event capture...")
+    stop_event = threading.Event()
+    watcher = ProcessWatcher()
+    watcher.start(stop_event)
+    try:
+        time.sleep(0.5)
+        subprocess.run(["sh", "-c", "sleep 1"])
+        time.sleep(1.5)
+        events = watcher.drain()
+    finally:
+        stop_event.set()
+    
+    print(f"  Capture mode: {watcher.mode}")
+    for event in events:
+        print(f"  {event['event']}: PID {event['pid']} {event['name']} ({event['command_line']})")
+    captured = [(e["event"], e["name"]) for e in events if e["name"] == "sleep"]
+    if captured != [("exec", "sleep"), ("exit", "sleep")]:
+        return False
+    
+    # Delivered with a snapshot, as the agent does between full scans
+    delta_encoder.reset()
+    result = send_telemetry(dict(collect_system_data(), process_events=events))
+    print(f"  Server response: {result}")
+    return result.get("status") == "processed"
+
 def test_server_connection():
     """Test connection to Central Server."""
     print(f"\nTesting connection to Central Server at {CENTRAL_SERVER_URL}...")
@@ -60,6 +124,155 @@ def test_telemetry_send():
         print(f"✗ Failed to send telemetry: {e}")
         return False
 
+def test_delta_telemetry_send():
+    """Test a full baseline followed by a delta upload."""
+    print("\nTesting delta telemetry transmission...")
+    
+    delta_encoder.reset()
+    try:
+        baseline = send_telemetry(collect_system_data())
+        print(f"✓ Baseline sent: {baseline}")
+        delta = send_telemetry(collect_system_data())
+        print(f"✓ Delta sent: {delta}")
+        return delta.get("sequence") == delta_encoder.sequence
+    except requests.exceptions.RequestException as e:
+        print(f"✗ Failed to send delta telemetry: {e}")
+        return False
+
+def test_spooled_upload():
+    """Test spooling snapshots to disk and uploading them as one batch."""
+    print("\nTesting spooled batch upload...")
+    
+    with tempfile.TemporaryDirectory() as spool_dir:
+        spool = TelemetrySpool(spool_dir)
+        for _ in range(3):
+            spool.append(collect_system_data())
+        print(f"Spooled snapshots: {spool.pending()}")
+        
+        try:
+            accepted = flush_spool(spool)
+        except requests.exceptions.RequestException as e:
+            print(f"✗ Failed to upload spool: {e}")
+            return False
+        
+        print(f"✓ Server accepted {accepted} snapshot(s), {spool.pending()} left in spool")
+        return accepted == 3 and spool.pending() == 0
+
+class GzipOnlyHandler(BaseHTTPRequestHandler):
+    """A batch endpoint that, like a Central Server without zstandard, only decodes gzip."""
+    
+    encodings = []
+    
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        encoding = self.headers.get("Content-Encoding", "")
+        self.encodings.append(encoding)
+        if encoding != "gzip":
+            self.send_response(415)
+            self.send_header("Accept-Encoding", "gzip")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        gzip.decompress(body)
+        items = 3  # One per spooled snapshot
+        reply = json.dumps({"status": "processed", "items": items,
+                            "results": [{"status": "processed"}] * items}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+    
+    def log_message(self, *args):
+        pass
+
+def test_zstd_fallback():
+    """Test that an agent with zstd falls back to gzip for a server without it."""
+    print("\nTesting compression fallback...")
+    
+    if agent.zstandard is None:
+        print("zstandard not installed; the agent only sends gzip")
+        return agent.compress_body(b"{}")[1] == "gzip"
+    
+    columnar_before = agent.columnar_accepted
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GzipOnlyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    agent.server_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with tempfile.TemporaryDirectory() as spool_dir:
+            spool = TelemetrySpool(spool_dir)
+            for _ in range(3):
+                spool.append(collect_system_data())
+            accepted = flush_spool(spool)
+            left = spool.pending()
+    except requests.exceptions.RequestException as e:
+        print(f"✗ Failed to upload spool: {e}")
+        return False
+    finally:
+        server.shutdown()
+        agent.reset_server_url()
+        delta_encoder.reset()  # The stand-in server never held the baseline
+    
+    print(f"✓ Encodings sent: {GzipOnlyHandler.encodings}; accepted {accepted}, {left} left, "
+          f"columnar accepted: {agent.columnar_accepted}")
+    return (GzipOnlyHandler.encodings == ["zstd", "gzip"] and accepted == 3 and left == 0
+            and (agent.columnar_accepted is True or columnar_before is False)  # Still columnar, unless it wasn't
+            and agent.compress_body(b"{}")[1] == "gzip")
+
+def test_columnar_upload():
+    """Test the columnar wire format: lossless encoding and a negotiated upload."""
+    print("\nTesting columnar telemetry upload...")
+    
+    data = collect_system_data()
+    content_type = agent.telemetry_content_type()
+    body = agent.encode_telemetry("/api/v1/collect", data, content_type)
+    decoded = telemetry_codec.decode(telemetry_codec.loads(body, content_type))
+    json_size = len(agent.encode_telemetry("/api/v1/collect", data, "application/json"))
+    print(f"{content_type}: {len(body)} bytes vs {json_size} bytes of JSON")
+    # Fields that were None are omitted by the columnar encoding
+    strip = lambda rows: [{k: v for k, v in row.items() if v is not None} for row in rows]
+    if strip(decoded["processes"]) != strip(data["processes"]):
+        print("✗ Processes changed in the round trip")
+        return False
+    
+    try:
+        response, _, _ = agent.post_telemetry("/api/v1/collect", data)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        print(f"✗ Failed to send columnar telemetry: {e}")
+        return False
+    print(f"✓ Server response: {response.json()}, columnar accepted: {agent.columnar_accepted}")
+    return agent.columnar_accepted is True and len(body) < json_size
+
+def error_response(status_code, detail):
+    """Build the response a server returns for a refused telemetry body."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps({"detail": detail}).encode()
+    return response
+
+def test_media_type_refusal():
+    """Test which error responses make the agent give up on the columnar format."""
+    print("\nTesting columnar refusal detection...")
+    
+    whole_body = [{"type": "model_attributes_type", "loc": ["body"], "msg": "Input should be a valid dictionary"}]
+    field = [{"type": "missing", "loc": ["body", "hostname"], "msg": "Field required"}]
+    columnar_before = agent.columnar_accepted
+    try:
+        agent.columnar_accepted = None
+        unsupported = agent.refuses_media_type(error_response(415, "Unsupported Content-Type"))
+        older_server = agent.refuses_media_type(error_response(422, whole_body))
+        invalid = agent.refuses_media_type(error_response(422, field))
+        malformed = agent.refuses_media_type(error_response(400, "Malformed body"))
+        agent.columnar_accepted = True
+        after_accepted = agent.refuses_media_type(error_response(422, whole_body))
+    finally:
+        agent.columnar_accepted = columnar_before
+    
+    print(f"✓ 415: {unsupported}, whole-body 422: {older_server}, field 422: {invalid}, "
+          f"400: {malformed}, whole-body 422 after acceptance: {after_accepted}")
+    return unsupported and older_server and not invalid and not malformed and not after_accepted
+
 def test_command_polling():
     """Test command polling from Central Server."""
     print("\nTesting command polling...")
@@ -113,6 +326,160 @@ def test_kill_process():
     
     return success
 
+def test_long_poll_kill():
+    """Test that the long-poll command listener kills a reported bad process promptly."""
+    print("\nTesting long-poll command delivery...")
+    
+    proc = subprocess.Popen(['sleep', '30'])
+    stop_event = threading.Event()
+    listener = threading.Thread(target=command_listener, args=(stop_event,), daemon=True)
+    listener.start()
+    time.sleep(1)
+    
+    # Report the sleep process under a known bad name to trigger a kill command
+    started = time.time()
+    payload = {
+        "hostname": AGENT_HOSTNAME,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "processes": [{"pid": proc.pid, "name": "evil.sh", "user": "test"}]
+    }
+    requests.post(f"{CENTRAL_SERVER_URL}/api/v1/collect", json=payload, timeout=10)
+    
+    try:
+        proc.wait(timeout=10)
+        print(f"✓ Process {proc.pid} killed {time.time() - started:.1f}s after detection")
+        return True
+    except subprocess.TimeoutExpired:
+        print("✗ Process was not killed within 10s")
+        proc.terminate()
+        return False
+    finally:
+        stop_event.set()
+
+def test_concurrent_commands():
+    """Test that commands run concurrently and their results reach the server."""
+    print("\nTesting concurrent command execution...")
+    
+    # Processes that ignore SIGTERM, so each kill waits out KILL_GRACE_PERIOD
+    stubborn = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); time.sleep(30)"
+    procs = [subprocess.Popen([sys.executable, "-c", stubborn]) for _ in range(3)]
+    time.sleep(1)
+    payload = {
+        "hostname": AGENT_HOSTNAME,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "processes": [{"pid": proc.pid, "name": "evil.sh", "user": "test"} for proc in procs]
+    }
+    requests.post(f"{CENTRAL_SERVER_URL}/api/v1/collect", json=payload, timeout=10)
+    commands = [command for command in agent.fetch_commands(requests.Session())
+                if int(command["target"]) in {proc.pid for proc in procs}]
+    
+    started = time.time()
+    agent.execute_commands(commands)
+    try:
+        for proc in procs:
+            proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        print("✗ Processes were not killed within 10s")
+        for proc in procs:
+            proc.kill()
+        return False
+    elapsed = time.time() - started
+    
+    statuses = []
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        statuses = [requests.get(f"{CENTRAL_SERVER_URL}/api/v1/commands/{command['command_id']}",
+                                 timeout=10).json()["status"] for command in commands]
+        if all(status == "succeeded" for status in statuses):
+            break
+        time.sleep(0.2)
+    print(f"✓ {len(commands)} kills took {elapsed:.1f}s (grace period {agent.KILL_GRACE_PERIOD}s each); "
+          f"reported: {statuses}")
+    return (len(commands) == len(procs) and elapsed < 2 * agent.KILL_GRACE_PERIOD
+            and all(status == "succeeded" for status in statuses))
+
+def test_runtime_pipeline():
+    """Test the collector and uploader threads, and the final flush on shutdown."""
+    print("Testing collection and upload threads...")
+    
+    # A full upload queue drops its oldest snapshot but keeps its process events
+    snapshots = queue.Queue(maxsize=1)
+    queue_snapshot(snapshots, {"process_events": [{"pid": 1}]})
+    queue_snapshot(snapshots, {"process_events": [{"pid": 2}]})
+    carried = [event["pid"] for event in snapshots.get_nowait()["process_events"]]
+    
+    splay = agent.COLLECTION_SPLAY
+    agent.COLLECTION_SPLAY = 0
+    started = datetime.now().isoformat()
+    with tempfile.TemporaryDirectory() as spool_dir:
+        agent.telemetry_spool = TelemetrySpool(spool_dir)
+        stop = threading.Event()
+        snapshots = queue.Queue(maxsize=agent.UPLOAD_QUEUE_SIZE)
+        collector = threading.Thread(target=collection_loop, args=(stop, snapshots))
+        uploader = threading.Thread(target=upload_loop, args=(snapshots,))
+        collector.start()
+        uploader.start()
+        try:
+            time.sleep(2)
+            stop.set()
+            collector.join(5)
+            snapshots.put(None)
+            uploader.join(15)
+            collected = agent.last_snapshot is not None and agent.last_snapshot["timestamp"] >= started
+            left = agent.telemetry_spool.pending()
+        finally:
+            agent.COLLECTION_SPLAY = splay
+            agent.telemetry_spool = None
+    print(f"  Carried over events: {carried}; collected: {collected}, {left} left spooled after shutdown")
+    return carried == [1, 2] and collected and left == 0 and not uploader.is_alive()
+
+def test_agent_health():
+    """Test that snapshots carry the agent's phase timings."""
+    print("Testing agent health...")
+    send_telemetry(collect_system_data())  # Times serialization and upload
+    health = collect_system_data()["agent_health"]
+    print(f"  {health}")
+    phases = ("process_scan_ms", "connection_scan_ms", "serialize_ms", "upload_ms")
+    return all(health.get(phase, -1) >= 0 for phase in phases) and health["rss_bytes"] > 0
+
+def test_log_rate_limit():
+    """Test that log records beyond the rate limit are dropped and counted once per record."""
+    print("Testing log rate limit...")
+    limit = RateLimitFilter(rate=1, burst=5)
+    test_logger = logging.getLogger("rate-limit-test")
+    test_logger.propagate = False
+    records = []
+    for _ in range(2):  # Two handlers see each record
+        handler = logging.Handler()
+        handler.emit = records.append
+        handler.addFilter(limit)
+        test_logger.addHandler(handler)
+    for number in range(20):
+        test_logger.warning("record %d", number)
+    time.sleep(1.1)
+    test_logger.warning("after the burst")
+    last = records[-1].getMessage()
+    print(f"  Emitted {len(records)} (two handlers), dropped {limit.suppressed}; last: {last}")
+    return len(records) == 12 and limit.suppressed == 15 and "15 earlier" in last
+
+def test_sampling_profiler():
+    """Test that the profiler samples other threads' stacks."""
+    print("Testing sampling profiler...")
+    stop = threading.Event()
+    def busy_loop():
+        while not stop.is_set():
+            sum(range(1000))
+    thread = threading.Thread(target=busy_loop, name="busy")
+    thread.start()
+    try:
+        stacks = SamplingProfiler(interval=0.005, duration=0.5).sample()
+    finally:
+        stop.set()
+        thread.join()
+    busy = sum(count for stack, count in stacks.items() if stack.startswith("busy;") and "busy_loop" in stack)
+    print(f"  {sum(stacks.values())} samples, {busy} in busy_loop")
+    return busy >= 20
+
 def main():
     """Run all tests."""
     print("AI-Eye Watcher Agent Test Suite")
@@ -120,10 +487,23 @@ def main():
     
     tests = [
         ("Data Collection", test_data_collection),
+        ("Process Cache", test_process_cache),
+        ("Process Events", test_process_events),
         ("Server Connection", test_server_connection),
         ("Telemetry Send", test_telemetry_send),
+        ("Delta Telemetry Send", test_delta_telemetry_send),
+        ("Spooled Upload", test_spooled_upload),
+        ("Columnar Upload", test_columnar_upload),
+        ("Compression Fallback", test_zstd_fallback),
+        ("Columnar Refusal", test_media_type_refusal),
         ("Command Polling", test_command_polling),
-        ("Process Killing", test_kill_process)
+        ("Process Killing", test_kill_process),
+        ("Concurrent Commands", test_concurrent_commands),
+        ("Long-Poll Kill", test_long_poll_kill),
+        ("Runtime Pipeline", test_runtime_pipeline),
+        ("Agent Health", test_agent_health),
+        ("Log Rate Limit", test_log_rate_limit),
+        ("Sampling Profiler", test_sampling_profiler)
     ]
     
     results = {}
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test script for a clustered AI-Eye Watcher Central Server
+Starts a state broker and two workers (ports 9100 and 9101) itself.
+"""
+
+import time
+import threading
+from datetime import datetime
+
+import requests
+
+from run_cluster import start_broker, start_workers, stop
+from state_backend import owner
+
+WORKER_URLS = ["http://localhost:9100", "http://localhost:9101"]
+BROKER_PORT = 6391
+
+def wait_for_cluster(timeout=20):
+    """Wait until every worker sees all the others"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            seen = [len(requests.get(f"{url}/health", timeout=2).json()["cluster"]["workers"]) for url in WORKER_URLS]
+            if all(count == len(WORKER_URLS) for count in seen):
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+def host_owned_by(worker_url, prefix):
+    """A hostname that the given worker owns"""
+    worker_ids = [url.split("//")[1] for url in WORKER_URLS]
+    index = 0
+    while owner(f"{prefix}-{index}", worker_ids) != worker_url.split("//")[1]:
+        index += 1
+    return f"{prefix}-{index}"
+
+def telemetry(hostname, bad=False):
+    processes = [{"pid": 100, "name": "bash", "user": "user", "cpu_percent": 0.1, "memory_percent": 0.2}]
+    if bad:
+        processes.append({"pid": 6666, "name": "nc.exe", "user": "user", "cpu_percent": 1.0, "memory_percent": 0.1})
+    return {"hostname": hostname, "timestamp": datetime.now().isoformat(), "processes": processes, "connections": []}
+
+def test_owner_redirect():
+    """Test that telemetry sent to a worker that doesn't own the host is redirected to its owner"""
+    print("Testing owner redirect...")
+
+    hostname = host_owned_by(WORKER_URLS[1], f"cluster-redirect-{int(time.time())}")
+    response = requests.post(f"{WORKER_URLS[0]}/api/v1/collect", json=telemetry(hostname),
+                             headers={"X-Agent-Host": hostname}, timeout=10)
+    redirects = [r.status_code for r in response.history]
+    print(f"  {response.status_code} from {response.url} after {redirects}")
+
+    events = requests.get(f"{WORKER_URLS[1]}/api/v1/events", params={"host": hostname}, timeout=10).json()
+    via_other = requests.get(f"{WORKER_URLS[0]}/api/v1/events", params={"host": hostname}, timeout=10).json()
+    print(f"  Owner stored {len(events)} event(s); query via the other worker returned {len(via_other)}")
+    return (response.status_code == 200 and redirects == [307]
+            and response.url.startswith(WORKER_URLS[1]) and len(events) == 1 and len(via_other) == 1)
+
+def test_alerts_replicated():
+    """Test that an alert raised on one worker shows up on every worker"""
+    print("\nTesting alert replication...")
+
+    hostname = host_owned_by(WORKER_URLS[0], f"cluster-alert-{int(time.time())}")
+    requests.post(f"{WORKER_URLS[0]}/api/v1/collect", json=telemetry(hostname, bad=True), timeout=10)
+
+    deadline = time.time() + 5
+    counts = []
+    while time.time() < deadline:
+        counts = [len(requests.get(f"{url}/api/v1/alerts", params={"host": hostname}, timeout=10).json())
+                  for url in WORKER_URLS]
+        if all(counts):
+            break
+        time.sleep(0.2)
+    print(f"  Alerts for {hostname} per worker: {counts}")
+    if len(counts) != len(WORKER_URLS) or not all(count == counts[0] and count > 0 for count in counts):
+        return False
+
+    # A repeat updates the alert's count on every worker rather than adding an alert
+    requests.post(f"{WORKER_URLS[0]}/api/v1/collect", json=telemetry(hostname, bad=True), timeout=10)
+    time.sleep(1)
+    repeats = [[alert["count"] for alert in requests.get(f"{url}/api/v1/alerts", params={"host": hostname},
+                                                          timeout=10).json()]
+               for url in WORKER_URLS]
+    print(f"  Alert counts after a repeat per worker: {repeats}")
+    return all(counts == [2] * len(counts) for counts in repeats)
+
+def test_commands_taken_once():
+    """Test that concurrent polls on different workers receive each queued command once, and its result"""
+    print("\nTesting command delivery across workers...")
+
+    hostname = host_owned_by(WORKER_URLS[1], f"cluster-command-{int(time.time())}")
+    requests.post(f"{WORKER_URLS[1]}/api/v1/collect", json=telemetry(hostname, bad=True), timeout=10)
+    time.sleep(0.5)
+
+    received = []
+    def poll(url):
+        response = requests.get(f"{url}/api/v1/commands", params={"host": hostname}, timeout=10)
+        received.extend(response.json())
+
+    pollers = [threading.Thread(target=poll, args=(url,)) for url in WORKER_URLS * 3]
+    for poller in pollers:
+        poller.start()
+    for poller in pollers:
+        poller.join()
+    print(f"  Commands received across 6 polls: {[c['target'] for c in received]}")
+
+    time.sleep(0.5)
+    pending = [requests.get(f"{url}/api/v1/dashboard/stats", timeout=10).json()["pending_command_hosts"]
+               for url in WORKER_URLS]
+    print(f"  Hosts with pending commands per worker: {pending}")
+    if len(received) != 1 or received[0]["target"] != "6666" or pending[0] != pending[1]:
+        return False
+
+    # Any worker accepts the result, and every worker reports it
+    command_id = received[0]["command_id"]
+    report = {"host": hostname, "status": "succeeded"}
+    requests.post(f"{WORKER_URLS[0]}/api/v1/commands/{command_id}/result", json=report, timeout=10)
+    statuses = [requests.get(f"{url}/api/v1/commands/{command_id}", timeout=10).json()["status"]
+                for url in WORKER_URLS]
+    time.sleep(0.5)
+    settled = [requests.get(f"{url}/api/v1/dashboard/stats", timeout=10).json()["pending_command_hosts"]
+               for url in WORKER_URLS]
+    print(f"  Result reported via the other worker: {statuses}; hosts with pending commands: {settled}")
+    return statuses == ["succeeded", "succeeded"] and settled[0] == settled[1] == pending[0] - 1
+
+def test_destination_query():
+    """Test that a destination query on any worker covers the hosts of every worker"""
+    print("\nTesting cluster-wide destination query...")
+
+    address = "198.51.100.77"
+    hostnames = [host_owned_by(url, f"cluster-network-{int(time.time())}-{number}")
+                 for number, url in enumerate(WORKER_URLS)]
+    for hostname, url in zip(hostnames, WORKER_URLS):
+        payload = telemetry(hostname)
+        payload["connections"] = [{"local_address": "10.0.0.9", "local_port": 52000, "remote_address": address,
+                                   "remote_port": 443, "status": "ESTABLISHED", "pid": 100}]
+        requests.post(f"{url}/api/v1/collect", json=payload, timeout=10)
+
+    time.sleep(0.5)
+    seen = [sorted(h["host"] for h in requests.get(f"{url}/api/v1/network/destinations/{address}",
+                                                   timeout=10).json()["hosts"])
+            for url in WORKER_URLS]
+    print(f"  Hosts per worker's answer: {seen}")
+    return all(hosts == sorted(hostnames) for hosts in seen)
+
+def test_dashboard_totals():
+    """Test that every worker reports the cluster-wide event count"""
+    print("\nTesting cluster-wide dashboard stats...")
+
+    time.sleep(2.5)  # One heartbeat, so the workers' event figures are current
+    counts = [requests.get(f"{url}/api/v1/dashboard/stats", timeout=10).json()["event_count"] for url in WORKER_URLS]
+    print(f"  Event count per worker: {counts}")
+    return counts[0] == counts[1] >= 3
+
+def main():
+    """Run all tests"""
+    print("AI-Eye Watcher Cluster Tests")
+    print("=" * 50)
+
+    processes = [start_broker(BROKER_PORT)]
+    processes += start_workers(len(WORKER_URLS), 9100, f"redis://127.0.0.1:{BROKER_PORT}/0", "localhost", "127.0.0.1")
+    try:
+        if not wait_for_cluster():
+            print("❌ Cluster did not start")
+            return
+
+        tests = [
+            test_owner_redirect,
+            test_alerts_replicated,
+            test_commands_taken_once,
+            test_destination_query,
+            test_dashboard_totals
+        ]
+
+        results = []
+        for test in tests:
+            try:
+                result = test()
+                results.append(result)
+            except Exception as e:
+                print(f"Test failed with error: {e}")
+                results.append(False)
+    finally:
+        stop(processes)
+
+    print("\n" + "=" * 50)
+    print(f"Test Results: {sum(results)}/{len(results)} passed")
+
+    if all(results):
+        print("✅ All tests passed!")
+    else:
+        print("❌ Some tests failed.")
+
+if __name__ == "__main__":
+    main()
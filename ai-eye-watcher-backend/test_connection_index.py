@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the AI-Eye Watcher connection index
+Feeds it synthetic snapshots with explicit times; no server needed.
+"""
+
+import random
+
+from connection_index import ConnectionIndex
+
+START = 1700000000.0  # A bucket boundary
+
+def test_destination_queries():
+    """Test which hosts talked to an address, and when"""
+    print("Testing destination queries...")
+
+    index = ConnectionIndex(bucket_seconds=300)
+    index.observe("host-a", [(10, "93.184.216.34", 443, 50000)], now=START)
+    index.observe("host-a", [(10, "93.184.216.34", 443, 50000)], now=START + 700)
+    index.observe("host-b", [(20, "93.184.216.34", 80, 50001), (20, "127.0.0.1", 8080, 50002)], now=START + 3000)
+
+    everyone = index.hosts_for("93.184.216.34", since=START)
+    recent = index.hosts_for("93.184.216.34", since=START + 1000)
+    host_a = index.hosts_for("93.184.216.34", since=START)[1]
+    destinations = [d["remote_address"] for d in index.endpoints_for("host-b", since=START)]
+    print(f"  Since start: {[h['host'] for h in everyone]}, recently: {[h['host'] for h in recent]}")
+    print(f"  host-a active in {len(host_a['active_buckets'])} buckets; host-b talked to {destinations}")
+    return ([h["host"] for h in everyone] == ["host-b", "host-a"] and [h["host"] for h in recent] == ["host-b"]
+            and len(host_a["active_buckets"]) == 2 and destinations == ["93.184.216.34"])
+
+def test_rare_destination():
+    """Test that a public address only one host contacts is reported once, after warm-up"""
+    print("\nTesting rare destinations...")
+
+    index = ConnectionIndex(rare_min_fleet=3, rare_warmup=600)
+    for number in range(3):
+        index.observe(f"host-{number}", [(10, "8.8.8.8", 53, 40000)], now=START)
+    before_warmup = index.observe("host-0", [(10, "198.51.100.7", 443, 40001)], now=START + 60)
+    rare = index.observe("host-1", [(11, "185.199.108.1", 443, 40002)], now=START + 900)
+    again = index.observe("host-1", [(11, "185.199.108.1", 443, 40003)], now=START + 960)
+    common = index.observe("host-2", [(12, "8.8.4.4", 53, 40004)], now=START + 960)
+    shared = index.observe("host-2", [(12, "185.199.108.1", 443, 40005)], now=START + 1020)
+    private = index.observe("host-0", [(13, "10.1.2.3", 445, 40006)], now=START + 1020)
+    print(f"  Findings: before warm-up {before_warmup}, rare {rare}, repeat {again}")
+    print(f"  new common {common}, second host {shared}, private {private}")
+    return (before_warmup == [] and [f["address"] for f in rare] == ["185.199.108.1"]
+            and again == [] and len(common) == 1 and shared == [] and private == [])
+
+def test_beaconing():
+    """Test that regularly reopened connections are reported and irregular or long-lived ones aren't"""
+    print("\nTesting beaconing detection...")
+
+    rng = random.Random(7)
+    index = ConnectionIndex()
+    for i in range(12):
+        now = START + 60 * i
+        # Reopened every minute, sampled with a few seconds of jitter
+        index.observe("beacon-host", [(66, "45.33.32.156", 8443, 41000 + i)], now=now + rng.uniform(-4, 4))
+        # One long-lived connection
+        index.observe("steady-host", [(10, "140.82.112.3", 443, 42000)], now=now)
+        # Reopened at random
+        index.observe("browser-host", [(30, "151.101.1.69", 443, 43000 + i)], now=START + rng.uniform(0, 720))
+    findings = index.analyze(now=START + 700)
+    stale = index.analyze(now=START + 2000)
+    print(f"  Beaconing: {[(f['host'], f['interval_seconds'], f['jitter']) for f in findings]}, "
+          f"after it stops: {len(stale)}")
+    return ([f["host"] for f in findings] == ["beacon-host"] and 55 < findings[0]["interval_seconds"] < 65
+            and findings[0]["pid"] == 66 and findings[0]["rare"] and stale == [])
+
+def main():
+    """Run all tests"""
+    print("AI-Eye Watcher Connection Index Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_destination_queries,
+        test_rare_destination,
+        test_beaconing
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            results.append(test())
+        except Exception as e:
+            print(f"Test failed with error: {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    print(f"Test Results: {sum(results)}/{len(results)} passed")
+
+    if all(results):
+        print("✅ All tests passed!")
+    else:
+        print("❌ Some tests failed.")
+
+if __name__ == "__main__":
+    main()
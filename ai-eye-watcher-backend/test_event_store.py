@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Test script for the AI-Eye Watcher event store
+Runs against a temporary directory; no server needed.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+from event_store import SegmentedEventStore, MemoryEventStore
+
+def make_store(directory):
+    return SegmentedEventStore(directory, segment_bytes=2000, retention_seconds=3600, retention_bytes=10000)
+
+def append_events(store, count, start=0):
+    for i in range(start, start + count):
+        store.append({"hostname": f"host-{i % 3}", "seq": i, "pad": "x" * 50}, timestamp=1000.0 + i)
+
+def test_query_filters():
+    """Test host and time-range queries across segments"""
+    print("Testing queries...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        append_events(store, 60)
+
+        latest = [e["seq"] for e in store.query(limit=3)]
+        by_host = [e["seq"] for e in store.query(hostname="host-1", limit=3)]
+        by_time = [e["seq"] for e in store.query(since=1040.0, until=1045.0, limit=50)]
+        print(f"  Segments: {store.stats()['segments']}")
+        print(f"  Latest: {latest}, host-1: {by_host}, 1040-1045: {by_time}")
+        store.close()
+
+        return (latest == [59, 58, 57]
+                and by_host == [58, 55, 52]
+                and by_time == [45, 44, 43, 42, 41, 40])
+
+def test_reopen_and_torn_write():
+    """Test that events survive a reopen, a partial trailing record is dropped and other files are ignored"""
+    print("\nTesting reopen...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        append_events(store, 10)
+        store.close()
+
+        last_segment = sorted(os.listdir(directory))[-1]
+        with open(os.path.join(directory, last_segment), "ab") as f:
+            f.write(b"\x10\x00")  # Simulate a crash mid-write
+        for name in ("server.log", "000000000000.log~"):
+            with open(os.path.join(directory, name), "w") as f:
+                f.write("not a segment\n")
+
+        store = make_store(directory)
+        recent = [e["seq"] for e in store.recent(3)]
+        print(f"  Events after reopen: {store.stats()['events']}, recent: {recent}")
+        store.close()
+
+        return recent == [7, 8, 9]
+
+def test_retention():
+    """Test size-based retention drops the oldest segments"""
+    print("\nTesting retention...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = make_store(directory)
+        append_events(store, 300)
+        stats = store.stats()
+        oldest = store.query(limit=1000)[-1]["seq"]
+        print(f"  Bytes: {stats['bytes']}, oldest event kept: {oldest}")
+        store.close()
+
+        return stats["bytes"] <= 10000 + 2000 and oldest > 0
+
+def test_concurrent_appends():
+    """Test appends from several threads while pages are being read"""
+    print("\nTesting concurrent appends...")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SegmentedEventStore(directory, segment_bytes=2000)
+        errors = []
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # Switch threads often enough to interleave appends
+
+        def writer(number):
+            for i in range(200):
+                store.append({"hostname": f"host-{number}", "seq": i, "pad": "x" * 50})
+
+        def reader():
+            try:
+                for _ in range(50):
+                    store.page(hostname="host-0", limit=20)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(number,)) for number in range(4)]
+        threads.append(threading.Thread(target=reader))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sys.setswitchinterval(interval)
+        per_host = [[e["seq"] for e in store.query(hostname=f"host-{number}", limit=1000)] for number in range(4)]
+        stats = store.stats()
+        store.close()
+
+        store = SegmentedEventStore(directory, segment_bytes=2000)
+        reopened = store.stats()["events"]
+        store.close()
+        print(f"  Events: {stats['events']} in {stats['segments']} segments, after reopen {reopened}, "
+              f"reader errors: {errors}")
+        return (stats["events"] == 800 and reopened == 800 and not errors
+                and all(seqs == list(range(199, -1, -1)) for seqs in per_host))
+
+def test_hot_cache_pages():
+    """Test that pages served from the in-memory newest events continue seamlessly on disk"""
+    print("\nTesting hot cache pages...")
+
+    def pages(store, **filters):
+        seqs, cursor = [], None
+        while True:
+            events, cursor = store.page(limit=4, before=cursor, **filters)
+            seqs.extend(event["seq"] for event in events)
+            if cursor is None:
+                return seqs
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SegmentedEventStore(directory, segment_bytes=2000, retention_seconds=1e12, cache_events=10)
+        append_events(store, 40)
+        cached = [(segment_id, record) for segment_id, record, _, _ in store._cache]
+        all_seqs = pages(store)
+        host_seqs = pages(store, hostname="host-1")
+        time_seqs = pages(store, since=1025.0, until=1034.0)
+        store.close()
+
+        store = SegmentedEventStore(directory, segment_bytes=2000, retention_seconds=1e12, cache_events=10)
+        reloaded = [(segment_id, record) for segment_id, record, _, _ in store._cache]
+        recent = [e["seq"] for e in store.recent(3)]
+        store.close()
+        print(f"  Cached: {len(cached)} events, {len(all_seqs)} paged, reloaded: {reloaded == cached}, "
+              f"recent: {recent}")
+        return (all_seqs == list(range(39, -1, -1)) and host_seqs == list(range(37, -1, -3))
+                and time_seqs == list(range(34, 24, -1)) and len(cached) == 10 and reloaded == cached
+                and recent == [37, 38, 39])
+
+def test_memory_store_compact():
+    """Test that compactly held events come back unchanged, sharing repeated data"""
+    print("\nTesting compact memory store...")
+
+    store = MemoryEventStore(max_events=10)
+    events = []
+    for i in range(3):
+        event = {
+            "hostname": "host-0",
+            "timestamp": f"2024-01-01T00:00:0{i}",
+            "processes": [
+                {"pid": 1, "create_time": 1000.5, "name": "launchd", "command_line": None,
+                 "user": "root", "cpu_percent": float(i), "memory_percent": None, "sha256": None, "ppid": 0},
+                {"pid": 42, "create_time": None, "name": "bash", "command_line": "bash -l",
+                 "user": "test", "cpu_percent": 0.5, "memory_percent": 1.25, "sha256": None, "ppid": 1}
+            ],
+            "connections": [{"local_address": "10.0.0.5", "local_port": 50000, "remote_address": None,
+                             "remote_port": None, "status": "LISTEN", "pid": 42}],
+            "system_info": {"platform": "Darwin"},
+            "sequence": i,
+            "process_events": [],
+            "received_at": f"2024-01-01T00:00:0{i}"
+        }
+        events.append(event)
+        store.append(event, timestamp=1000.0 + i)
+    store.append({"hostname": "host-1", "seq": 3}, timestamp=1003.0)
+
+    held = [compact for _, _, compact in store._events]
+    shared = held[0].names is held[2].names and held[0].connections[0] is held[2].connections[0]
+    page = store.query(limit=10)
+    print(f"  Round trip exact: {page[1:] == events[::-1]}, columns shared: {shared}")
+    return page[0] == {"hostname": "host-1", "seq": 3} and page[1:] == events[::-1] and shared
+
+def main():
+    """Run all tests"""
+    print("AI-Eye Watcher Event Store Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_query_filters,
+        test_reopen_and_torn_write,
+        test_retention,
+        test_concurrent_appends,
+        test_hot_cache_pages,
+        test_memory_store_compact
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            results.append(test())
+        except Exception as e:
+            print(f"Test failed with error: {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    print(f"Test Results: {sum(results)}/{len(results)} passed")
+
+    if all(results):
+        print("✅ All tests passed!")
+    else:
+        print("❌ Some tests failed.")
+
+if __name__ == "__main__":
+    main()
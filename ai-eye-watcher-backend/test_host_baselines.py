@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test script for the AI-Eye Watcher host baselines
+Feeds them synthetic snapshots with explicit times; no server needed.
+"""
+
+import time
+
+from host_baselines import HostBaselines
+
+START = time.time()  # Generations are timed from when the baselines are created
+
+def make_baselines():
+    return HostBaselines(bloom_bits=1 << 16, sketch_width=1 << 12, max_age=100.0, warmup_snapshots=0,
+                         min_fleet=5, rare_prevalence=0.05)
+
+def snapshot(*names):
+    return [(number + 1, None, name) for number, name in enumerate(names)]
+
+def test_rare_process():
+    """Test that a process no other host runs is rare, and one every host runs is not"""
+    print("Testing rare processes...")
+
+    baselines = make_baselines()
+    for number in range(40):
+        baselines.observe(f"host-{number}", snapshot("svchost.exe"), [], now=START + number)
+    findings = baselines.observe("host-new", snapshot("svchost.exe", "dropper.exe"), [], now=START + 50)
+    print(f"  New host findings: {[(f['name'], f['rarity']) for f in findings]}")
+    return [(f["name"], f["rarity"]) for f in findings] == [("dropper.exe", "rare")]
+
+def test_prevalence_survives_rotations():
+    """Test that a process the whole fleet keeps running stays common across many generations"""
+    print("\nTesting prevalence across rotations...")
+
+    baselines = make_baselines()
+    rare = []
+    for tick in range(70):  # Seven generations, every host reporting every 10 seconds
+        now = START + 10 * tick
+        for number in range(40):
+            # host-0 goes quiet for four generations, so its own baseline forgets svchost.exe
+            if number == 0 and 20 <= tick < 60:
+                continue
+            findings = baselines.observe(f"host-{number}", snapshot("svchost.exe"), [], now=now)
+            rare.extend((number, tick) for f in findings if f["rarity"] == "rare")
+    joined = baselines.observe("host-new", snapshot("svchost.exe"), [], now=START + 700)
+    print(f"  Rotations: {baselines.seen.rotations}, rare findings: {rare}, new host findings: {joined}")
+    return baselines.seen.rotations >= 6 and rare == [] and joined == []
+
+def main():
+    """Run all tests"""
+    print("AI-Eye Watcher Host Baselines Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_rare_process,
+        test_prevalence_survives_rotations
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            results.append(test())
+        except Exception as e:
+            print(f"Test failed with error: {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    print(f"Test Results: {sum(results)}/{len(results)} passed")
+
+    if all(results):
+        print("✅ All tests passed!")
+    else:
+        print("❌ Some tests failed.")
+
+if __name__ == "__main__":
+    main()
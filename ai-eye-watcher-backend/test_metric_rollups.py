@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the AI-Eye Watcher metric rollups
+Feeds them synthetic snapshots with explicit times; no server needed.
+"""
+
+from metric_rollups import MetricRollups
+
+START = 1699999200.0  # An hour boundary
+
+def process(name, cpu, memory=0.5):
+    return {"name": name, "cpu_percent": cpu, "memory_percent": memory}
+
+def test_bucket_statistics():
+    """Test min/max/avg/p95 of a closed bucket, and that open buckets aren't returned"""
+    print("Testing bucket statistics...")
+
+    rollups = MetricRollups(seed=1)
+    for i in range(8):
+        rollups.observe("host-a", [process("postgres", 10.0 * (i + 1))], {"memory_available": 4e9}, now=START + i)
+    rollups.observe("host-a", [process("postgres", 1.0)], {"memory_available": 4e9}, now=START + 60)
+
+    buckets = rollups.host_series("host-a", "1m", since=START, now=START + 60)
+    open_buckets = rollups.host_series("host-a", "5m", since=START, now=START + 60)
+    cpu = buckets[0]["cpu_percent"]
+    print(f"  1m buckets: {len(buckets)}, samples {buckets[0]['samples']}, cpu {cpu}; 5m buckets: {len(open_buckets)}")
+    return (len(buckets) == 1 and buckets[0]["samples"] == 8 and cpu == {"min": 10.0, "max": 80.0, "avg": 45.0,
+                                                                        "p95": 76.5}
+            and buckets[0]["memory_available"]["max"] == 4e9 and open_buckets == [])
+
+def test_top_processes():
+    """Test ranking process names by average, per host and fleet-wide, and the tracking thresholds"""
+    print("\nTesting top processes...")
+
+    rollups = MetricRollups(min_cpu=1.0, min_memory=1.0, seed=1)
+    for minute in range(10):
+        now = START + 60 * minute
+        rollups.observe("host-a", [process("java", 40.0), process("java", 20.0), process("sshd", 0.1)], None, now)
+        rollups.observe("host-b", [process("python", 30.0 + minute), process("cron", 0.0, 2.0)], None, now)
+    now = START + 600
+
+    fleet = rollups.top("cpu_percent", "1m", since=START, now=now)
+    host_b = rollups.top("memory_percent", "5m", since=START, hostname="host-b", now=now)
+    sshd = rollups.process_series("host-a", "sshd", "1m", since=START, now=now)
+    print(f"  Fleet: {[(p['host'], p['process_name'], p['avg']) for p in fleet]}")
+    print(f"  host-b by memory: {[(p['process_name'], p['avg']) for p in host_b]}, sshd buckets: {len(sshd)}")
+    return ([(p["host"], p["process_name"]) for p in fleet] == [("host-a", "java"), ("host-b", "python"),
+                                                                 ("host-b", "cron")]
+            and fleet[0]["avg"] == 60.0 and fleet[0]["samples"] == 10 and fleet[1]["max"] == 39.0
+            and [p["process_name"] for p in host_b] == ["cron", "python"] and host_b[0]["samples"] == 10
+            and sshd == [])
+
+def test_ring_and_eviction():
+    """Test that rings keep a fixed number of buckets, busy buckets are sampled and old series are evicted"""
+    print("\nTesting rings, sampling and eviction...")
+
+    rollups = MetricRollups(max_process_series=2, seed=1)
+    for minute in range(90):
+        rollups.observe("host-a", [process("nginx", 5.0)], None, now=START + 60 * minute)
+    for second in range(100):
+        rollups.observe("host-a", [process("nginx", float(second))], None, now=START + 5400 + second * 0.5)
+    now = START + 5460
+
+    minutes = rollups.process_series("host-a", "nginx", "1m", since=START, now=now)
+    busy = minutes[-1]
+    hours = rollups.process_series("host-a", "nginx", "1h", since=START, now=now)
+    rollups.observe("host-b", [process("redis", 5.0)], None, now=now)
+    rollups.observe("host-b", [process("mysql", 5.0)], None, now=now)
+    stats = rollups.stats()
+    print(f"  1m buckets kept: {len(minutes)}, busiest {busy['samples']} samples cpu {busy['cpu_percent']}")
+    print(f"  1h buckets: {len(hours)}, process series: {stats['processes']['series']}")
+    return (len(minutes) == 60 and busy["samples"] == 100 and 0.0 <= busy["cpu_percent"]["min"]
+            and busy["cpu_percent"]["max"] <= 99.0 and len(hours) == 1 and hours[0]["samples"] == 60
+            and stats["processes"]["series"] == 2
+            and rollups.process_series("host-a", "nginx", "1m", since=START, now=now) == []
+            and len(rollups.process_series("host-b", "redis", "1m", since=START, now=now + 60)) == 1)
+
+def main():
+    """Run all tests"""
+    print("AI-Eye Watcher Metric Rollups Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_bucket_statistics,
+        test_top_processes,
+        test_ring_and_eviction
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            results.append(test())
+        except Exception as e:
+            print(f"Test failed with error: {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    print(f"Test Results: {sum(results)}/{len(results)} passed")
+
+    if all(results):
+        print("✅ All tests passed!")
+    else:
+        print("❌ Some tests failed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test script for the AI-Eye Watcher process trees
+Feeds them synthetic snapshots and lifecycle events with explicit times; no server needed.
+"""
+
+from process_tree import ProcessTrees
+
+START = 1699999200.0
+
+def process(pid, ppid, name, create_time, user="root"):
+    return {"pid": pid, "ppid": ppid, "name": name, "user": user, "create_time": create_time}
+
+def test_exec_refresh():
+    """Test that a process seen again after an exec takes its new name and user, and a ppid it lacked"""
+    print("Testing exec refresh...")
+
+    trees = ProcessTrees()
+    init, shell = process(1, 0, "init", START), process(200, 1, "bash", START + 1)
+    late = process(300, None, "worker", START + 2)
+    trees.update("host-a", [init, shell, late], now=START + 10)
+    # bash execs python as another user; an exec event older than the snapshot doesn't win
+    trees.update("host-a", [init, process(200, 1, "python3", START + 1, "svc"), dict(late, ppid=200)],
+                 [dict(shell, event="exec", timestamp=START + 15)], now=START + 20)
+    # Reparented after its parent exits: lineage keeps the parent that started it
+    trees.update("host-a", [init, dict(late, ppid=1)], now=START + 30)
+
+    shell_now = trees.lineage("host-a", 200)["process"]
+    worker = trees.ancestry("host-a", 300)
+    print(f"  pid 200: {shell_now['name']} as {shell_now['user']}, pid 300 ancestors: {worker}")
+    return ((shell_now["name"], shell_now["user"]) == ("python3", "svc")
+            and worker == [{"pid": 200, "name": "python3"}, {"pid": 1, "name": "init"}])
+
+def test_event_only_exit():
+    """Test that a process known only from an exec event exits with the next snapshot and then expires"""
+    print("\nTesting processes known only from events...")
+
+    trees = ProcessTrees(retention=60)
+    init = process(1, 0, "init", START)
+    short = process(400, 1, "curl", START + 5)
+    trees.update("host-a", [init], [dict(short, event="exec", timestamp=START + 5)], now=START + 10)
+    running = trees.lineage("host-a", 400)["process"]["running"]
+    # Its exit event was lost
+    trees.update("host-a", [init], now=START + 20)
+    exited = trees.lineage("host-a", 400)["process"]["running"] is False
+    trees.update("host-a", [init], now=START + 100)
+    stats = trees.stats()
+    print(f"  Running after exec: {running}, exited after next snapshot: {exited}, processes left: {stats['processes']}")
+    return running and exited and trees.lineage("host-a", 400) is None and stats["processes"] == 1
+
+def main():
+    """Run all tests"""
+    print("AI-Eye Watcher Process Tree Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_exec_refresh,
+        test_event_only_exit
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            results.append(test())
+        except Exception as e:
+            print(f"Test failed with error: {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    print(f"Test Results: {sum(results)}/{len(results)} passed")
+
+    if all(results):
+        print("✅ All tests passed!")
+    else:
+        print("❌ Some tests failed.")
+
+if __name__ == "__main__":
+    main()
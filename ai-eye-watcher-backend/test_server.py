@@ -5,9 +5,13 @@ Test script for AI-Eye Watcher Central Server
 
 import requests
 import json
+import gzip
 import time
+import threading
 from datetime import datetime
 
+import telemetry_codec
+
 BASE_URL = "http://localhost:9000"
 
 def test_health():
@@ -93,6 +97,386 @@ def test_collect_malicious_telemetry():
     print(f"Malicious telemetry: {response.status_code} - {response.json()}")
     return response.status_code == 200
 
+def test_threat_intel_indicators():
+    """Test command-line and network indicators from the threat intel file"""
+    print("\nTesting threat intel indicators...")
+    
+    hostname = f"intel-host-{int(time.time())}"
+    payload = {
+        "hostname": hostname,
+        "timestamp": datetime.now().isoformat(),
+        "processes": [
+            {"pid": 3001, "name": "powershell.exe", "command_line": "powershell IEX (Invoke-Mimikatz -DumpCreds)"},
+            {"pid": 3002, "name": "xmrig-6.21", "command_line": "./xmrig-6.21 -o pool"},
+            {"pid": 3003, "name": "bash", "command_line": "bash -i"}
+        ],
+        "connections": [
+            {"pid": 3003, "local_address": "10.0.0.5", "local_port": 50123,
+             "remote_address": "198.51.100.23", "remote_port": 443, "status": "ESTABLISHED"}
+        ]
+    }
+    response = requests.post(f"{BASE_URL}/api/v1/collect", json=payload)
+    print(f"Indicator telemetry: {response.status_code} - {response.json()}")
+    
+    alerts = requests.get(f"{BASE_URL}/api/v1/alerts", params={"host": hostname}).json()
+    matches = sorted((a["finding_type"], a["process_pid"], a["indicator"]["type"]) for a in alerts)
+    print(f"  Matches: {matches}")
+    intel = requests.get(f"{BASE_URL}/api/v1/threat-intel").json()
+    print(f"  Loaded indicators: {intel['indicators']}")
+    return matches == [
+        ("threat_intel_match_connection", 3003, "cidr"),
+        ("threat_intel_match_process", 3001, "cmdline_substring"),
+        ("threat_intel_match_process", 3002, "process_glob")
+    ]
+
+def test_short_lived_process():
+    """Test threat intel on a process that started and exited between snapshots"""
+    print("\nTesting short-lived process events...")
+    
+    hostname = f"events-host-{int(time.time())}"
+    started = {"pid": 6161, "create_time": 1700000600.0, "name": "evil.sh",
+               "command_line": "/bin/sh /tmp/evil.sh", "user": "attacker"}
+    payload = {
+        "hostname": hostname,
+        "timestamp": datetime.now().isoformat(),
+        "processes": [{"pid": 100, "name": "launchd", "user": "root"}],
+        "process_events": [
+            dict(started, event="exec", timestamp=time.time() - 3),
+            dict(started, event="exit", timestamp=time.time() - 2)
+        ]
+    }
+    response = requests.post(f"{BASE_URL}/api/v1/collect", json=payload)
+    print(f"Process events: {response.status_code} - {response.json()}")
+    
+    alerts = requests.get(f"{BASE_URL}/api/v1/alerts", params={"host": hostname}).json()
+    commands = requests.get(f"{BASE_URL}/api/v1/commands", params={"host": hostname}).json()
+    print(f"  Alerts: {[(a['process_name'], a.get('source')) for a in alerts]}")
+    print(f"  Commands: {[(c['target'], c['parameters'].get('create_time')) for c in commands]}")
+    return (len(alerts) == 1 and alerts[0]["source"] == "process_event"
+            and len(commands) == 1 and commands[0]["parameters"]["create_time"] == 1700000600.0)
+
+def test_columnar_telemetry():
+    """Test columnar payloads, repeated rows, and the JSON fallback for unknown types"""
+    print("\nTesting columnar telemetry...")
+    
+    hostname = f"columnar-host-{int(time.time())}"
+    payload = {
+        "hostname": hostname,
+        "timestamp": datetime.now().isoformat(),
+        "processes": [
+            {"pid": 100, "name": "launchd", "user": "root", "cpu_percent": 0.0},
+            {"pid": 9999, "name": "nc.exe", "command_line": "nc.exe -l -p 4444", "user": "attacker"}
+        ],
+        "connections": [
+            {"local_address": "10.0.0.5", "local_port": 52000, "remote_address": "93.184.216.34",
+             "remote_port": 443, "status": "ESTABLISHED", "pid": 100}
+        ]
+    }
+    statuses = []
+    for content_type in telemetry_codec.supported_content_types():
+        body = telemetry_codec.dumps(telemetry_codec.encode(payload), content_type)
+        # The second upload repeats every row, so it is served from the row cache
+        for _ in range(2):
+            response = requests.post(f"{BASE_URL}/api/v1/collect", data=body,
+                                     headers={"Content-Type": content_type})
+            print(f"  {content_type}: {response.status_code} - {response.json()}")
+            statuses.append(response.status_code)
+    
+    # Column lengths that disagree are a 400, not a crash
+    document = telemetry_codec.encode(payload)
+    document["processes"]["pid"].pop()
+    response = requests.post(f"{BASE_URL}/api/v1/collect", data=json.dumps(document),
+                             headers={"Content-Type": telemetry_codec.COLUMNAR_JSON})
+    print(f"  Malformed columnar: {response.status_code}")
+    
+    # Every upload detects nc.exe again; the repeats are counted on one alert
+    alerts = requests.get(f"{BASE_URL}/api/v1/alerts", params={"host": hostname}).json()
+    print(f"  Alerts: {[(a['process_name'], a['count']) for a in alerts]}")
+    health = requests.get(f"{BASE_URL}/health").json()
+    return (statuses == [200] * len(statuses) and response.status_code == 400
+            and [(a["process_name"], a["count"]) for a in alerts] == [("nc.exe", len(statuses))]
+            and telemetry_codec.COLUMNAR_JSON in health["telemetry_content_types"])
+
+def test_anomaly_new_process():
+    """Test per-host anomaly detection for newly seen processes"""
+    print("\nTesting anomaly detection...")
+    
+    hostname = f"anomaly-host-{int(time.time())}"
+    baseline = [{"pid": 100, "name": "launchd", "user": "root"}]
+    
+    # Warm up the host's process window
+    for _ in range(10):
+        payload = {
+            "hostname": hostname,
+            "timestamp": datetime.now().isoformat(),
+            "processes": baseline
+        }
+        requests.post(f"{BASE_URL}/api/v1/collect", json=payload)
+    
+    # 'chrome' was reported by other hosts but never by this one
+    payload = {
+        "hostname": hostname,
+        "timestamp": datetime.now().isoformat(),
+        "processes": baseline + [{"pid": 200, "name": "chrome", "user": "testuser"}]
+    }
+    response = requests.post(f"{BASE_URL}/api/v1/collect", json=payload)
+    print(f"Anomalous telemetry: {response.status_code} - {response.json()}")
+    
+    alerts = requests.get(f"{BASE_URL}/api/v1/alerts").json()
+    host_anomalies = [
+        a for a in alerts
+        if a["host"] == hostname and a["finding_type"] == "anomaly_new_process"
+    ]
+    print(f"  Anomaly alerts for {hostname}: {[a['process_name'] for a in host_anomalies]}")
+    return [a["process_name"] for a in host_anomalies] == ["chrome"]
+
+def test_baseline_anomalies():
+    """Test anomalies for a new parent/child pair and a new endpoint on a warmed-up host"""
+    print("\nTesting baseline anomalies...")
+    
+    hostname = f"baseline-host-{int(time.time())}"
+    
+    def snapshot(curl_parent, remote_address):
+        return {
+            "hostname": hostname,
+            "timestamp": datetime.now().isoformat(),
+            "processes": [
+                {"pid": 1, "ppid": 0, "name": "init", "user": "root"},
+                {"pid": 100, "ppid": 1, "name": "bash", "user": "user"},
+                {"pid": 200, "ppid": curl_parent, "name": "curl", "user": "user"}
+            ],
+            "connections": [{"local_address": "10.0.0.2", "local_port": 50000, "remote_address": remote_address,
+                             "remote_port": 443, "status": "ESTABLISHED", "pid": 100}]
+        }
+    
+    for _ in range(10):
+        requests.post(f"{BASE_URL}/api/v1/collect", json=snapshot(1, "10.0.0.5"))
+    
+    # curl is usually started by init; now bash starts it, and bash talks to a new endpoint
+    response = requests.post(f"{BASE_URL}/api/v1/collect", json=snapshot(100, "203.0.113.9"))
+    print(f"Unusual telemetry: {response.status_code} - {response.json()}")
+    
+    alerts = requests.get(f"{BASE_URL}/api/v1/alerts", params={"host": hostname, "include_event": False}).json()
+    findings = sorted((a["finding_type"], a["process_name"], a.get("parent_process_name") or a.get("endpoint"))
+                      for a in alerts)
+    print(f"  Anomaly alerts for {hostname}: {findings}")
+    baselines = requests.get(f"{BASE_URL}/health").json()["baselines"]
+    print(f"  Baselines: {baselines['hosts']} hosts in {baselines['memory_bytes']} bytes")
+    return findings == [("anomaly_new_endpoint", "bash", "203.0.113.9:443"),
+                        ("anomaly_new_lineage", "curl", "bash")]
+
+def test_network_queries():
+    """Test which hosts connected to an address, and where a host connected to"""
+    print("\nTesting connection index queries...")
+    
+    prefix = f"network-host-{int(time.time())}"
+    address = f"198.51.100.{int(time.time()) % 250 + 1}"
+    for number, pid in ((1, 4100), (2, 4200)):
+        payload = {
+            "hostname": f"{prefix}-{number}",
+            "timestamp": datetime.now().isoformat(),
+            "processes": [{"pid": pid, "name": "curl", "user": "user"}],
+            "connections": [{"local_address": "10.0.0.9", "local_port": 51000 + number, "remote_address": address,
+                             "remote_port": 443, "status": "ESTABLISHED", "pid": pid}]
+        }
+        requests.post(f"{BASE_URL}/api/v1/collect", json=payload)
+    
+    destination = requests.get(f"{BASE_URL}/api/v1/network/destinations/{address}", params={"minutes": 60}).json()
+    hosts = sorted((h["host"], h["pids"], h["ports"]) for h in destination["hosts"] if h["host"].startswith(prefix))
+    host_view = requests.get(f"{BASE_URL}/api/v1/network/hosts/{prefix}-1").json()
+    print(f"  Hosts that talked to {address}: {hosts}")
+    print(f"  {prefix}-1 talked to: {[(d['remote_address'], d['hosts']) for d in host_view['destinations']]}")
+    return (hosts == [(f"{prefix}-1", [4100], [443]), (f"{prefix}-2", [4200], [443])]
+            and [(d["remote_address"], d["hosts"]) for d in host_view["destinations"]] == [(address, 2)]
+            and len(host_view["destinations"][0]["active_buckets"]) == 1)
+
+def test_process_lineage():
+    """Test ancestry and descendant queries on the host's process tree, across PID reuse"""
+    print("\nTesting process lineage...")
+    
+    hostname = f"lineage-host-{int(time.time())}"
+    init = {"pid": 1, "create_time": 1000.0, "ppid": 0, "name": "init", "user": "root"}
+    sshd = {"pid": 100, "create_time": 1100.0, "ppid": 1, "name": "sshd", "user": "root"}
+    bash = {"pid": 200, "create_time": 1200.0, "ppid": 100, "name": "bash", "user": "user"}
+    nc = {"pid": 300, "create_time": 1300.0, "ppid": 200, "name": "nc.exe", "user": "user"}
+    cron = {"pid": 200, "create_time": 1400.0, "ppid": 1, "name": "cron", "user": "root"}  # Reuses bash's PID
+    for processes in ([init, sshd, bash, nc], [init, sshd, nc, cron]):
+        requests.post(f"{BASE_URL}/api/v1/collect", json={
+            "hostname": hostname, "timestamp": datetime.now().isoformat(), "processes": processes
+        })
+    
+    url = f"{BASE_URL}/api/v1/hosts/{hostname}/processes"
+    nc_lineage = requests.get(f"{url}/300").json()
+    sshd_lineage = requests.get(f"{url}/100", params={"depth": 2}).json()
+    reused = requests.get(f"{url}/200").json()
+    old_bash = requests.get(f"{url}/200", params={"create_time": 1200.0}).json()
+    unknown = requests.get(f"{url}/999").status_code
+    alerts = requests.get(f"{BASE_URL}/api/v1/alerts", params={"host": hostname, "include_event": False}).json()
+    alert_ancestry = [[a["name"] for a in alert.get("ancestry", [])] for alert in alerts]
+    
+    print(f"  nc.exe ancestors: {[p['name'] for p in nc_lineage['ancestors']]}, alert ancestry: {alert_ancestry}")
+    print(f"  sshd descendants: {[(p['name'], p['depth'], p['running']) for p in sshd_lineage['descendants']]}")
+    print(f"  PID 200 now: {reused['process']['name']}, at 1200.0: {old_bash['process']['name']}; unknown: {unknown}")
+    return ([p["name"] for p in nc_lineage["ancestors"]] == ["bash", "sshd", "init"]
+            and alert_ancestry == [["bash", "sshd", "init"]]
+            and [(p["name"], p["depth"], p["running"]) for p in sshd_lineage["descendants"]]
+                == [("bash", 1, False), ("nc.exe", 2, True)]
+            and reused["process"]["name"] == "cron" and [p["name"] for p in reused["ancestors"]] == ["init"]
+            and old_bash["process"]["name"] == "bash" and unknown == 404)
+
+def test_metric_rollups():
+    """Test the rollup queries; buckets only close once a minute, so this checks tracking and validation"""
+    print("\nTesting metric rollups...")
+    
+    hostname = f"rollup-host-{int(time.time())}"
+    requests.post(f"{BASE_URL}/api/v1/collect", json={
+        "hostname": hostname, "timestamp": datetime.now().isoformat(),
+        "system_info": {"memory_available": 4000000000},
+        "processes": [{"pid": 10, "name": "java", "user": "app", "cpu_percent": 80.0, "memory_percent": 12.0},
+                      {"pid": 11, "name": "sshd", "user": "root", "cpu_percent": 0.0, "memory_percent": 0.1}]
+    })
+    
+    url = f"{BASE_URL}/api/v1/rollups"
+    host = requests.get(f"{url}/hosts/{hostname}", params={"resolution": "1m", "minutes": 60}).json()
+    java = requests.get(f"{url}/hosts/{hostname}/processes/java").json()
+    top = requests.get(f"{url}/top", params={"host": hostname, "resolution": "1m", "minutes": 60}).json()
+    bad_resolution = requests.get(f"{url}/top", params={"resolution": "1d"}).status_code
+    bad_metric = requests.get(f"{url}/top", params={"metric": "disk_percent"}).status_code
+    rollups = requests.get(f"{BASE_URL}/health").json()["rollups"]
+    
+    print(f"  Host buckets: {host['buckets']}, java: {java['buckets']}, top: {top['processes']}")
+    print(f"  Invalid resolution: {bad_resolution}, metric: {bad_metric}; series: "
+          f"{rollups['hosts']['series']} hosts, {rollups['processes']['series']} processes")
+    return (host["host"] == hostname and host["resolution"] == "1m" and isinstance(host["buckets"], list)
+            and java["process_name"] == "java" and isinstance(top["processes"], list)
+            and bad_resolution == 422 and bad_metric == 422
+            and rollups["hosts"]["series"] >= 1 and rollups["processes"]["series"] >= 1)
+
+def test_delta_telemetry():
+    """Test delta telemetry against a sequenced baseline"""
+    print("\nTesting delta telemetry...")
+    
+    hostname = f"delta-host-{int(time.time())}"
+    baseline = {
+        "hostname": hostname,
+        "timestamp": datetime.now().isoformat(),
+        "sequence": 1,
+        "processes": [
+            {"pid": 1234, "create_time": 1700000000.0, "name": "chrome", "user": "testuser", "cpu_percent": 5.2},
+            {"pid": 5678, "create_time": 1700000100.0, "name": "python3", "user": "testuser"}
+        ]
+    }
+    response = requests.post(f"{BASE_URL}/api/v1/collect", json=baseline)
+    print(f"Baseline: {response.status_code} - {response.json()}")
+    
+    delta = {
+        "hostname": hostname,
+        "timestamp": datetime.now().isoformat(),
+        "base_sequence": 1,
+        "sequence": 2,
+        "processes_added": [
+            {"pid": 9999, "create_time": 1700000200.0, "name": "ncat", "user": "attacker"}
+        ],
+        "processes_removed": [{"pid": 5678, "create_time": 1700000100.0}],
+        "processes_changed": [{"pid": 1234, "create_time": 1700000000.0, "cpu_percent": 40.0}]
+    }
+    response = requests.post(f"{BASE_URL}/api/v1/collect/delta", json=delta)
+    print(f"Delta: {response.status_code} - {response.json()}")
+    if response.status_code != 200:
+        return False
+    
+    latest = next(e for e in requests.get(f"{BASE_URL}/api/v1/events").json() if e["hostname"] == hostname)
+    processes = {p["pid"]: p for p in latest["processes"]}
+    print(f"  Reconstructed PIDs: {sorted(processes)}")
+    
+    # Replaying the same delta is out of sequence and must be rejected
+    stale = requests.post(f"{BASE_URL}/api/v1/collect/delta", json=delta)
+    print(f"Stale delta: {stale.status_code} (should be 409)")
+    
+    return (sorted(processes) == [1234, 9999]
+            and processes[1234]["cpu_percent"] == 40.0
+            and processes[1234]["name"] == "chrome"
+            and stale.status_code == 409)
+
+def test_batch_collect():
+    """Test compressed batch ingestion"""
+    print("\nTesting batch telemetry collection...")
+    
+    hostname = f"batch-host-{int(time.time())}"
+    items = [
+        {"kind": "full", "payload": {
+            "hostname": hostname,
+            "timestamp": datetime.now().isoformat(),
+            "sequence": 1,
+            "processes": [{"pid": 1234, "create_time": 1700000000.0, "name": "chrome"}]
+        }},
+        {"kind": "delta", "payload": {
+            "hostname": hostname,
+            "timestamp": datetime.now().isoformat(),
+            "base_sequence": 1,
+            "sequence": 2,
+            "processes_added": [{"pid": 4321, "create_time": 1700000300.0, "name": "curl"}]
+        }},
+        {"kind": "delta", "payload": {
+            "hostname": hostname,
+            "timestamp": datetime.now().isoformat(),
+            "base_sequence": 7,
+            "sequence": 8
+        }}
+    ]
+    body = gzip.compress(json.dumps({"items": items}).encode())
+    response = requests.post(
+        f"{BASE_URL}/api/v1/collect/batch",
+        data=body,
+        headers={"Content-Type": "application/json", "Content-Encoding": "gzip"}
+    )
+    print(f"Batch telemetry: {response.status_code} - {response.json()}")
+    if response.status_code != 200:
+        return False
+    
+    statuses = [r["status"] for r in response.json()["results"]]
+    return statuses == ["processed", "processed", "resync_required"]
+
+def test_ingest_pipeline():
+    """Test that ingestion stays off the event loop and reports its queue"""
+    print("\nTesting ingest pipeline...")
+    
+    response = requests.post(f"{BASE_URL}/api/v1/collect", json={"hostname": "bad-host"})
+    print(f"Invalid payload: {response.status_code}")
+    invalid_ok = response.status_code == 422
+    
+    # A burst of large payloads from several hosts; /health must keep answering
+    processes = [{"pid": pid, "name": f"proc-{pid}", "command_line": f"/usr/bin/proc-{pid} --serve"}
+                 for pid in range(2000)]
+    statuses = []
+    
+    def send(number):
+        payload = {
+            "hostname": f"burst-host-{number}",
+            "timestamp": datetime.now().isoformat(),
+            "processes": processes
+        }
+        result = requests.post(f"{BASE_URL}/api/v1/collect", json=payload, timeout=30)
+        statuses.append((result.status_code, result.headers.get("Retry-After")))
+    
+    senders = [threading.Thread(target=send, args=(number,)) for number in range(8)]
+    for sender in senders:
+        sender.start()
+    started = time.time()
+    health = requests.get(f"{BASE_URL}/health", timeout=10)
+    health_latency = time.time() - started
+    for sender in senders:
+        sender.join()
+    
+    ingest = requests.get(f"{BASE_URL}/health").json()["ingest"]
+    print(f"  Burst statuses: {sorted(statuses, key=str)}")
+    print(f"  /health during burst: {health.status_code} in {health_latency * 1000:.0f}ms")
+    print(f"  Ingest stats: {ingest}")
+    statuses_ok = all(status == 200 or (status == 429 and retry_after) for status, retry_after in statuses)
+    # Rejected payloads are counted as invalid, not as server errors
+    return (invalid_ok and statuses_ok and health.status_code == 200 and ingest["processed"] > 0
+            and ingest["invalid"] > 0 and ingest["errors"] == 0)
+
 def test_dashboard_stats():
     """Test dashboard stats endpoint"""
     print("\nTesting dashboard stats...")
@@ -105,8 +489,32 @@ def test_dashboard_stats():
         print(f"  Alerts: {stats['alert_count']}")
         print(f"  Unique hosts: {stats['unique_hosts']}")
         print(f"  Alert breakdown: {stats['alert_severity_breakdown']}")
+        print(f"  Events per minute: {stats['events_per_minute']}")
     return response.status_code == 200
 
+def test_dashboard_timeseries():
+    """Test per-minute dashboard trend counters"""
+    print("\nTesting dashboard timeseries...")
+    
+    response = requests.get(f"{BASE_URL}/api/v1/dashboard/timeseries", params={"minutes": 5})
+    print(f"Dashboard timeseries: {response.status_code}")
+    if response.status_code != 200:
+        return False
+    
+    series = response.json()
+    print(f"  Events per minute: {series['events']}")
+    print(f"  Alerts per minute: {series['alerts']}")
+    
+    host_series = requests.get(
+        f"{BASE_URL}/api/v1/dashboard/timeseries",
+        params={"minutes": 5, "host": "test-host-02"}
+    ).json()
+    print(f"  test-host-02 alerts per minute: {host_series['alerts']}")
+    
+    return (len(series["events"]) == 5
+            and series["events"][-1] > 0
+            and sum(host_series["alerts"]) >= 2)
+
 def test_alerts():
     """Test alerts endpoint"""
     print("\nTesting alerts endpoint...")
@@ -120,6 +528,73 @@ def test_alerts():
             print(f"    - {alert['severity']}: {alert['details']}")
     return response.status_code == 200
 
+def test_filtered_pagination():
+    """Test filtered, cursor-paginated alerts and events"""
+    print("\nTesting filtered pagination...")
+    
+    hostname = f"paging-host-{int(time.time())}"
+    for pid in (101, 102, 103):
+        payload = {
+            "hostname": hostname,
+            "timestamp": datetime.now().isoformat(),
+            "processes": [{"pid": pid, "name": "ncat", "user": "attacker"}]
+        }
+        requests.post(f"{BASE_URL}/api/v1/collect", json=payload)
+    
+    params = {"host": hostname, "severity": "HIGH", "limit": 2}
+    first = requests.get(f"{BASE_URL}/api/v1/alerts", params=params)
+    cursor = first.headers.get("X-Next-Cursor")
+    second = requests.get(f"{BASE_URL}/api/v1/alerts", params=dict(params, cursor=cursor))
+    alert_pids = [a["process_pid"] for a in first.json() + second.json()]
+    print(f"  Alert pages: {alert_pids} (cursor {cursor}, last page cursor {second.headers.get('X-Next-Cursor')})")
+    
+    events = requests.get(f"{BASE_URL}/api/v1/events", params={"host": hostname, "limit": 2})
+    event_cursor = events.headers.get("X-Next-Cursor")
+    older = requests.get(f"{BASE_URL}/api/v1/events",
+                         params={"host": hostname, "limit": 2, "cursor": event_cursor})
+    event_pids = [e["processes"][0]["pid"] for e in events.json() + older.json()]
+    print(f"  Event pages: {event_pids}")
+    
+    return (alert_pids == [103, 102, 101]
+            and "X-Next-Cursor" not in second.headers
+            and event_pids == [103, 102, 101])
+
+def sse_events(response):
+    """Yield (event, data) pairs from a streaming Server-Sent Events response."""
+    buffer = ""
+    for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+        buffer += chunk
+        while "\n\n" in buffer:
+            message, buffer = buffer.split("\n\n", 1)
+            fields = dict(line.split(": ", 1) for line in message.split("\n") if ": " in line)
+            if "event" in fields:
+                yield fields["event"], json.loads(fields["data"])
+
+def test_live_stream():
+    """Test the live alert stream snapshot and push"""
+    print("\nTesting live stream...")
+    
+    hostname = f"stream-host-{int(time.time())}"
+    with requests.get(f"{BASE_URL}/api/v1/stream", params={"topics": "alert"},
+                      stream=True, timeout=10) as response:
+        events = sse_events(response)
+        first_event, snapshot = next(events)
+        print(f"  First event: {first_event} with {len(snapshot.get('alerts', []))} alerts")
+        
+        payload = {
+            "hostname": hostname,
+            "timestamp": datetime.now().isoformat(),
+            "processes": [{"pid": 4444, "name": "netcat", "user": "attacker"}]
+        }
+        requests.post(f"{BASE_URL}/api/v1/collect", json=payload)
+        event, alert = next(events)
+        print(f"  Pushed event: {event} for {alert.get('host')} ({alert.get('process_name')})")
+    
+    return (first_event == "snapshot"
+            and event == "alert"
+            and alert.get("host") == hostname
+            and "original_event" not in alert)
+
 def test_commands():
     """Test commands endpoint"""
     print("\nTesting commands endpoint...")
@@ -142,6 +617,137 @@ def test_commands():
     
     return True
 
+def test_command_long_poll():
+    """Test that a long-polling agent is woken as soon as a command is queued"""
+    print("\nTesting command long-poll...")
+    
+    hostname = f"longpoll-host-{int(time.time())}"
+    result = {}
+    
+    def long_poll():
+        started = time.time()
+        response = requests.get(f"{BASE_URL}/api/v1/commands",
+                                params={"host": hostname, "wait": 20}, timeout=30)
+        result["latency"] = time.time() - started
+        result["commands"] = response.json()
+    
+    poller = threading.Thread(target=long_poll)
+    poller.start()
+    time.sleep(1)
+    
+    payload = {
+        "hostname": hostname,
+        "timestamp": datetime.now().isoformat(),
+        "processes": [{"pid": 7777, "name": "evil.sh", "user": "attacker"}]
+    }
+    requests.post(f"{BASE_URL}/api/v1/collect", json=payload)
+    poller.join(30)
+    
+    commands = result.get("commands", [])
+    print(f"  Long-poll returned {len(commands)} command(s) after {result.get('latency', 0):.2f}s")
+    return len(commands) == 1 and commands[0]["target"] == "7777" and result["latency"] < 5
+
+def test_alert_aggregation():
+    """Test that repeated detections are coalesced into one alert per incident"""
+    print("\nTesting alert aggregation...")
+    
+    hostname = f"aggregate-host-{int(time.time())}"
+    updates = []
+    
+    def listen():
+        with requests.get(f"{BASE_URL}/api/v1/stream", params={"topics": "alert"}, stream=True, timeout=15) as response:
+            for event, data in sse_events(response):
+                if event == "alert_update":
+                    updates.append(data)
+                    if data["count"] >= 5:
+                        return
+    
+    listener = threading.Thread(target=listen, daemon=True)
+    listener.start()
+    time.sleep(0.5)
+    
+    for _ in range(5):
+        payload = {
+            "hostname": hostname,
+            "timestamp": datetime.now().isoformat(),
+            "processes": [{"pid": 31337, "name": "mimikatz.exe", "user": "attacker"},
+                          {"pid": 31338, "name": "ncat", "user": "attacker"}]
+        }
+        requests.post(f"{BASE_URL}/api/v1/collect", json=payload)
+    listener.join(10)
+    
+    alerts = requests.get(f"{BASE_URL}/api/v1/alerts", params={"host": hostname, "include_event": False}).json()
+    summary = sorted((a["process_name"], a["count"]) for a in alerts)
+    print(f"  5 identical snapshots -> {len(alerts)} alerts: {summary}")
+    print(f"  Live updates: {len(updates)}, last count {updates[-1]['count'] if updates else None}")
+    first = alerts[0] if alerts else {}
+    return (summary == [("mimikatz.exe", 5), ("ncat", 5)]
+            and first.get("first_seen") is not None and first.get("last_seen") >= first.get("first_seen")
+            and updates and updates[-1]["count"] == 5)
+
+def test_command_results():
+    """Test command deduplication, leases and result reporting"""
+    print("\nTesting command results...")
+    
+    hostname = f"results-host-{int(time.time())}"
+    payload = {
+        "hostname": hostname,
+        "timestamp": datetime.now().isoformat(),
+        "processes": [{"pid": 4242, "name": "nc.exe", "user": "attacker", "create_time": 1000.0}]
+    }
+    # Repeated detections of the same process queue one command
+    for _ in range(3):
+        requests.post(f"{BASE_URL}/api/v1/collect", json=payload)
+    commands = requests.get(f"{BASE_URL}/api/v1/commands", params={"host": hostname}).json()
+    again = requests.get(f"{BASE_URL}/api/v1/commands", params={"host": hostname}).json()
+    print(f"  3 detections -> {len(commands)} command(s); second poll during the lease -> {len(again)}")
+    if len(commands) != 1 or again:
+        return False
+    command_id = commands[0]["command_id"]
+    
+    delivered = requests.get(f"{BASE_URL}/api/v1/commands/{command_id}").json()["status"]
+    report = {"host": hostname, "status": "succeeded", "finished_at": datetime.now().isoformat()}
+    first = requests.post(f"{BASE_URL}/api/v1/commands/{command_id}/result", json=report).json()
+    repeat = requests.post(f"{BASE_URL}/api/v1/commands/{command_id}/result", json=report).json()
+    status = requests.get(f"{BASE_URL}/api/v1/commands/{command_id}").json()
+    wrong_host = requests.post(f"{BASE_URL}/api/v1/commands/{command_id}/result",
+                               json=dict(report, host="other-host")).status_code
+    bad_status = requests.post(f"{BASE_URL}/api/v1/commands/{command_id}/result",
+                               json=dict(report, status="maybe")).status_code
+    print(f"  Status {delivered} -> {status['status']}; reports: {first['status']}, {repeat['status']}; "
+          f"wrong host {wrong_host}, bad status {bad_status}")
+    
+    # Once a kill has succeeded, a new detection queues a new command
+    requests.post(f"{BASE_URL}/api/v1/collect", json=payload)
+    commands_after = requests.get(f"{BASE_URL}/api/v1/commands", params={"host": hostname}).json()
+    print(f"  Detection after success -> {len(commands_after)} new command(s)")
+    return (delivered == "delivered" and status["status"] == "succeeded" and status["result"] is not None
+            and first["status"] == "recorded" and repeat["status"] == "duplicate"
+            and wrong_host == 404 and bad_status == 400
+            and len(commands_after) == 1 and commands_after[0]["command_id"] != command_id)
+
+def test_metrics():
+    """Test the Prometheus metrics endpoint"""
+    print("\nTesting metrics...")
+    
+    response = requests.get(f"{BASE_URL}/metrics")
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    print(f"Metrics: {response.status_code}, {response.headers.get('content-type')}, {len(samples)} samples")
+    
+    parsed = samples.get('aieye_ingest_stage_seconds_count{stage="parse"}', 0)
+    stored = samples.get('aieye_ingest_stage_seconds_count{stage="store"}', 0)
+    malicious = samples.get('aieye_alerts_total{finding_type="threat_intel_match_process",severity="HIGH"}', 0)
+    delivered = samples.get("aieye_command_delivery_seconds_count", 0)
+    print(f"  Parsed {parsed:.0f}, stored {stored:.0f}, malicious process alerts {malicious:.0f}, "
+          f"commands delivered {delivered:.0f}")
+    return (response.status_code == 200 and response.headers["content-type"].startswith("text/plain")
+            and parsed > 0 and stored > 0 and malicious > 0 and delivered > 0
+            and 'aieye_hot_cache_capacity{buffer="events"}' in samples)
+
 def main():
     """Run all tests"""
     print("AI-Eye Watcher Central Server Test Suite")
@@ -151,9 +757,27 @@ def main():
         test_health,
         test_collect_normal_telemetry,
         test_collect_malicious_telemetry,
+        test_threat_intel_indicators,
+        test_short_lived_process,
+        test_columnar_telemetry,
+        test_anomaly_new_process,
+        test_baseline_anomalies,
+        test_network_queries,
+        test_process_lineage,
+        test_metric_rollups,
+        test_delta_telemetry,
+        test_batch_collect,
+        test_ingest_pipeline,
         test_dashboard_stats,
+        test_dashboard_timeseries,
         test_alerts,
-        test_commands
+        test_filtered_pagination,
+        test_live_stream,
+        test_commands,
+        test_command_long_poll,
+        test_command_results,
+        test_alert_aggregation,
+        test_metrics
     ]
     
     results = []
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for the AI-Eye Watcher local state backend
+Uses short TTLs in real time; no server needed.
+"""
+
+import time
+
+from state_backend import LocalStateBackend
+
+def kill_command(command_id, pid):
+    return {"command_id": command_id, "action": "kill_process", "target": str(pid), "parameters": {}}
+
+def test_command_dedup():
+    """Test that a dedup key blocks a second command until the first succeeds"""
+    print("Testing command deduplication...")
+
+    backend = LocalStateBackend()
+    first = backend.queue_command("host-a", kill_command("cmd-1", 42), ttl=60, dedup_key="kill_process:42")
+    repeat = backend.queue_command("host-a", kill_command("cmd-2", 42), ttl=60, dedup_key="kill_process:42")
+    other_host = backend.queue_command("host-b", kill_command("cmd-3", 42), ttl=60, dedup_key="kill_process:42")
+    backend.complete_command("cmd-1", {"status": "succeeded"})
+    after_success = backend.queue_command("host-a", kill_command("cmd-4", 42), ttl=60, dedup_key="kill_process:42")
+    backend.complete_command("cmd-4", {"status": "failed"})
+    after_failure = backend.queue_command("host-a", kill_command("cmd-5", 42), ttl=60, dedup_key="kill_process:42")
+    print(f"  Queued: first {first}, repeat {repeat}, other host {other_host}, "
+          f"after success {after_success}, after failure {after_failure}")
+    return first and not repeat and other_host and after_success and not after_failure
+
+def test_dedup_keys_expire():
+    """Test that dedup keys of failed, expired and never polled commands are forgotten after their TTL"""
+    print("\nTesting dedup key expiry...")
+
+    backend = LocalStateBackend(command_retention=60)
+    backend.queue_command("host-a", kill_command("cmd-1", 1), ttl=0.1, dedup_key="kill_process:1")
+    backend.queue_command("host-a", kill_command("cmd-2", 2), ttl=0.1, dedup_key="kill_process:2")
+    backend.complete_command("cmd-2", {"status": "failed"})
+    backend.queue_command("host-b", kill_command("cmd-3", 3), ttl=0.1, dedup_key="kill_process:3")
+    backend.lease_commands("host-b", lease_seconds=30)
+    during_ttl = len(backend._dedup)
+    time.sleep(0.2)
+
+    requeued = backend.queue_command("host-a", kill_command("cmd-4", 1), ttl=0.1, dedup_key="kill_process:1")
+    time.sleep(0.2)
+    backend.queue_command("host-c", kill_command("cmd-5", 5), ttl=60)
+    print(f"  Dedup keys during TTL: {during_ttl}, requeued after TTL: {requeued}, "
+          f"left after TTL: {len(backend._dedup)}")
+    return during_ttl == 3 and requeued and len(backend._dedup) == 0
+
+def test_redelivery_reported():
+    """Test that a command leased again after its lease lapsed is reported as a redelivery"""
+    print("\nTesting redelivery reporting...")
+
+    backend = LocalStateBackend()
+    backend.queue_command("host-a", kill_command("cmd-1", 42), ttl=60)
+    first = backend.lease_commands("host-a", lease_seconds=0.1)
+    while_leased = backend.lease_commands("host-a", lease_seconds=0.1)
+    time.sleep(0.2)
+    again = backend.lease_commands("host-a", lease_seconds=30)
+    print(f"  First lease: {[c['redelivered'] for c in first]}, while leased: {len(while_leased)}, "
+          f"after lapse: {[c['redelivered'] for c in again]}")
+    return ([c["redelivered"] for c in first] == [False] and while_leased == []
+            and [c["redelivered"] for c in again] == [True])
+
+def main():
+    """Run all tests"""
+    print("AI-Eye Watcher State Backend Test Suite")
+    print("=" * 50)
+
+    tests = [
+        test_command_dedup,
+        test_dedup_keys_expire,
+        test_redelivery_reported
+    ]
+
+    results = []
+    for test in tests:
+        try:
+            results.append(test())
+        except Exception as e:
+            print(f"Test failed with error: {e}")
+            results.append(False)
+
+    print("\n" + "=" * 50)
+    print(f"Test Results: {sum(results)}/{len(results)} passed")
+
+    if all(results):
+        print("✅ All tests passed!")
+    else:
+        print("❌ Some tests failed.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+AI-Eye Watcher threat intelligence
+Loads indicators from a local CSV file and compiles them into a matcher that
+evaluates a payload's processes and connections in a single pass:
+
+- exact process names, file hashes and remote ports: hash sets
+- command-line substrings: one Aho-Corasick automaton
+- process-name globs: an Aho-Corasick prefilter on each glob's longest
+  literal, so fnmatch only runs on candidate globs
+- remote IPs and CIDRs: one hash table per prefix length, probed from the
+  longest prefix down
+
+Indicator file format (one per line, '#' starts a comment):
+
+    type,value[,severity]
+
+where type is one of process_name, process_glob, cmdline_substring,
+sha256, ip, cidr, port.
+"""
+
+import os
+import csv
+import time
+import fnmatch
+import logging
+import ipaddress
+import threading
+from bisect import bisect_right
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDICATOR_TYPES = ("process_name", "process_glob", "cmdline_substring", "sha256", "ip", "cidr", "port")
+SEVERITIES = ("LOW", "MEDIUM", "HIGH", "CRITICAL")
+
+
+class Indicator:
+    __slots__ = ("type", "value", "severity")
+
+    def __init__(self, indicator_type: str, value: str, severity: str = "HIGH"):
+        self.type = indicator_type
+        self.value = value
+        self.severity = severity
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"type": self.type, "value": self.value, "severity": self.severity}
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher; finds every pattern occurrence in one scan."""
+
+    def __init__(self, patterns: Iterable[Tuple[str, Any]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Any]] = [[]]
+        for pattern, value in patterns:
+            if pattern:
+                self._add(pattern, value)
+        self._build()
+
+    def __bool__(self) -> bool:
+        return len(self._goto) > 1
+
+    def _add(self, pattern: str, value: Any):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = next_state
+        self._out[state].append(value)
+
+    def _build(self):
+        # Breadth-first fail links; outputs are merged along them so a scan
+        # never has to follow the fail chain to report matches
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def scan(self, text: str):
+        """Yield (end position, value) for every pattern occurrence in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                for value in out[state]:
+                    yield position, value
+
+
+class PrefixTable:
+    """Longest-prefix match over IPv4/IPv6 networks using one dict per prefix length."""
+
+    def __init__(self):
+        self._tables: Dict[Tuple[int, int], Dict[int, Indicator]] = {}  # (version, prefix) -> network -> indicator
+        self._prefixes: Dict[int, List[int]] = {4: [], 6: []}  # longest first
+
+    def add(self, network: str, indicator: Indicator):
+        net = ipaddress.ip_network(network, strict=False)
+        key = (net.version, net.prefixlen)
+        self._tables.setdefault(key, {})[int(net.network_address)] = indicator
+        if net.prefixlen not in self._prefixes[net.version]:
+            self._prefixes[net.version].append(net.prefixlen)
+            self._prefixes[net.version].sort(reverse=True)
+
+    def __len__(self) -> int:
+        return sum(len(table) for table in self._tables.values())
+
+    def lookup(self, address: str) -> Optional[Indicator]:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return None
+        bits = 32 if ip.version == 4 else 128
+        value = int(ip)
+        for prefix in self._prefixes[ip.version]:
+            indicator = self._tables[(ip.version, prefix)].get(value >> (bits - prefix) << (bits - prefix))
+            if indicator is not None:
+                return indicator
+        return None
+
+
+class ThreatIntelEngine:
+    """An immutable, compiled set of indicators."""
+
+    def __init__(self, indicators: Iterable[Indicator]):
+        self.names: Dict[str, Indicator] = {}
+        self.hashes: Dict[str, Indicator] = {}
+        self.ports: Dict[int, Indicator] = {}
+        self.networks = PrefixTable()
+        self.counts = {indicator_type: 0 for indicator_type in INDICATOR_TYPES}
+        substrings = []
+        self._globs: List[Tuple[str, Indicator]] = []
+        self._literal_free_globs: List[int] = []
+
+        for indicator in indicators:
+            self.counts[indicator.type] += 1
+            value = indicator.value
+            if indicator.type == "process_name":
+                self.names[value.lower()] = indicator
+            elif indicator.type == "sha256":
+                self.hashes[value.lower()] = indicator
+            elif indicator.type == "port":
+                self.ports[int(value)] = indicator
+            elif indicator.type in ("ip", "cidr"):
+                self.networks.add(value, indicator)
+            elif indicator.type == "cmdline_substring":
+                substrings.append((value.lower(), indicator))
+            elif indicator.type == "process_glob":
+                self._globs.append((value.lower(), indicator))
+
+        self.substrings = AhoCorasick(substrings)
+        glob_literals = []
+        for number, (pattern, _) in enumerate(self._globs):
+            literal = self._longest_literal(pattern)
+            if literal:
+                glob_literals.append((literal, number))
+            else:
+                self._literal_free_globs.append(number)
+        self.glob_prefilter = AhoCorasick(glob_literals)
+
+    @staticmethod
+    def _longest_literal(pattern: str) -> str:
+        """Longest run of characters with no glob syntax; every match must contain it."""
+        literal, best, depth = "", "", 0
+        for char in pattern:
+            if char == "[":
+                depth += 1
+            if depth or char in "*?[]":
+                literal = ""
+            else:
+                literal += char
+                best = max(best, literal, key=len)
+            if char == "]" and depth:
+                depth -= 1
+        return best
+
+    def _match_glob(self, name: str) -> Optional[Indicator]:
+        candidates = {number for _, number in self.glob_prefilter.scan(name)}
+        candidates.update(self._literal_free_globs)
+        for number in sorted(candidates):
+            pattern, indicator = self._globs[number]
+            if fnmatch.fnmatchcase(name, pattern):
+                return indicator
+        return None
+
+    def match(self, processes: List[Any], connections: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Evaluate a payload's processes and connections.
+
+        Returns:
+            list: {"kind": "process"|"connection", "item": <process/connection>,
+                   "indicator": Indicator} matches, at most one per item
+        """
+        matches = []
+        matched = set()
+
+        # All command lines are scanned as one text, separated by NULs
+        command_lines, starts = [], []
+        offset = 0
+        for number, process in enumerate(processes):
+            name = process.name.lower()
+            indicator = self.names.get(name)
+            sha256 = getattr(process, "sha256", None)
+            if indicator is None and sha256:
+                indicator = self.hashes.get(sha256.lower())
+            if indicator is None and self._globs:
+                indicator = self._match_glob(name)
+            if indicator is not None:
+                matches.append({"kind": "process", "item": process, "indicator": indicator})
+                matched.add(number)
+            elif self.substrings and process.command_line:
+                command_line = process.command_line.lower()
+                starts.append(offset)
+                command_lines.append((number, command_line))
+                offset += len(command_line) + 1
+
+        if command_lines:
+            text = "\0".join(command_line for _, command_line in command_lines)
+            for position, indicator in self.substrings.scan(text):
+                number = command_lines[bisect_right(starts, position) - 1][0]
+                if number not in matched:
+                    matched.add(number)
+                    matches.append({"kind": "process", "item": processes[number], "indicator": indicator})
+
+        for connection in connections:
+            indicator = None
+            if connection.remote_address:
+                indicator = self.networks.lookup(connection.remote_address)
+            if indicator is None and connection.remote_port is not None:
+                indicator = self.ports.get(connection.remote_port)
+            if indicator is not None:
+                matches.append({"kind": "connection", "item": connection, "indicator": indicator})
+
+        return matches
+
+
+def load_indicators(path: str) -> List[Indicator]:
+    """Read indicators from a CSV file, skipping comments and invalid rows."""
+    indicators = []
+    with open(path, newline="") as f:
+        for line_number, row in enumerate(csv.reader(f), start=1):
+            if not row or row[0].strip().startswith("#"):
+                continue
+            indicator_type = row[0].strip().lower()
+            value = row[1].strip() if len(row) > 1 else ""
+            severity = row[2].strip().upper() if len(row) > 2 and row[2].strip() else "HIGH"
+            if indicator_type not in INDICATOR_TYPES or not value:
+                logger.warning(f"{path}:{line_number}: skipping invalid indicator {row}")
+                continue
+            if severity not in SEVERITIES:
+                logger.warning(f"{path}:{line_number}: skipping indicator with invalid severity '{severity}'")
+                continue
+            try:
+                if indicator_type == "port":
+                    int(value)
+                elif indicator_type in ("ip", "cidr"):
+                    ipaddress.ip_network(value, strict=False)
+            except ValueError:
+                logger.warning(f"{path}:{line_number}: skipping invalid {indicator_type} '{value}'")
+                continue
+            indicators.append(Indicator(indicator_type, value, severity))
+    return indicators
+
+
+class ThreatIntel:
+    """
+    Holds the current engine and hot-reloads it when the indicator file
+    changes. Reloads compile in a background thread and swap the engine
+    reference when done, so ingestion never waits on a compile.
+    """
+
+    def __init__(self, path: str, builtin: Iterable[Indicator] = (), check_interval: float = 10.0):
+        self.path = path
+        self.builtin = list(builtin)
+        self.check_interval = check_interval
+        self.engine = ThreatIntelEngine(self.builtin)
+        self.loaded_at: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._reloading = threading.Lock()
+        self.reload(background=False)
+
+    def reload(self, background: bool = True) -> bool:
+        """Recompile from the indicator file; False if a reload is already running."""
+        if not self._reloading.acquire(blocking=False):
+            return False
+        if background:
+            threading.Thread(target=self._reload, name="threat-intel-reload", daemon=True).start()
+        else:
+            self._reload()
+        return True
+
+    def _reload(self):
+        try:
+            started = time.perf_counter()
+            try:
+                mtime = os.path.getmtime(self.path)
+                indicators = load_indicators(self.path)
+            except FileNotFoundError:
+                mtime, indicators = None, []
+            engine = ThreatIntelEngine(self.builtin + indicators)
+            self.engine = engine  # Atomic swap; in-flight matches keep the old engine
+            self._mtime = mtime
+            self.loaded_at = time.time()
+            self.load_seconds = time.perf_counter() - started
+            logger.info(f"Loaded {len(indicators)} threat intel indicators in {self.load_seconds:.2f}s")
+        except Exception as e:
+            logger.error(f"Failed to load threat intel from {self.path}: {e}")
+        finally:
+            self._reloading.release()
+
+    def maybe_reload(self):
+        """Start a background reload if the indicator file changed (checked at most every check_interval)."""
+        now = time.time()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self.reload()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "indicators": dict(self.engine.counts),
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds
+        }
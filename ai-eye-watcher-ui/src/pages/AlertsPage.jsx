@@ -34,11 +34,16 @@ const AlertsPage = () => {
   // Backend API URL
   const API_BASE_URL = 'http://localhost:9000';
 
-  // Function to fetch alerts
+  // Number of alerts kept in the table
+  const MAX_ALERTS = 100;
+
+  // Function to fetch alerts (manual refresh)
   const fetchAlerts = async () => {
     try {
       setError(null);
-      const response = await axios.get(`${API_BASE_URL}/api/v1/alerts`);
+      const response = await axios.get(`${API_BASE_URL}/api/v1/alerts`, {
+        params: { limit: MAX_ALERTS, include_event: false },
+      });
       setAlerts(response.data);
       setLoading(false);
     } catch (err) {
@@ -48,16 +53,37 @@ const AlertsPage = () => {
     }
   };
 
-  // Effect for initial load and periodic refresh
+  // Effect for the live alerts stream
   useEffect(() => {
-    // Initial fetch
-    fetchAlerts();
+    // The server sends recent alerts as a snapshot on connect, then each new alert.
+    // EventSource reconnects on its own and resumes from the last event it saw.
+    const source = new EventSource(`${API_BASE_URL}/api/v1/stream?topics=alert`);
 
-    // Set up periodic refresh every 30 seconds
-    const interval = setInterval(fetchAlerts, 30000);
+    source.addEventListener('snapshot', (event) => {
+      setAlerts(JSON.parse(event.data).alerts);
+      setError(null);
+      setLoading(false);
+    });
+    source.addEventListener('alert', (event) => {
+      const alert = JSON.parse(event.data);
+      setAlerts((current) => [alert, ...current].slice(0, MAX_ALERTS));
+      setError(null);
+    });
+    // A repeated detection updates its open alert's last_seen and count
+    source.addEventListener('alert_update', (event) => {
+      const update = JSON.parse(event.data);
+      setAlerts((current) =>
+        current.map((alert) => (alert.alert_id === update.alert_id ? { ...alert, ...update } : alert))
+      );
+    });
+    source.onerror = () => {
+      console.error('Alerts stream disconnected, retrying...');
+      setError('Lost connection to the live alerts stream. Make sure the backend server is running.');
+      setLoading(false);
+    };
 
-    // Cleanup interval on component unmount
-    return () => clearInterval(interval);
+    // Close the stream on component unmount
+    return () => source.close();
   }, []);
 
   // Function to get severity color
@@ -161,11 +187,16 @@ const AlertsPage = () => {
                 ) : (
                   // Show actual alerts
                   alerts.map((alert, index) => (
-                    <TableRow key={index} hover>
+                    <TableRow key={alert.alert_id ?? index} hover>
                       <TableCell>
                         <Typography variant="body2">
                           {formatTimestamp(alert.timestamp)}
                         </Typography>
+                        {alert.count > 1 && (
+                          <Typography variant="caption" display="block" color="text.secondary">
+                            Seen {alert.count} times, last {formatTimestamp(alert.last_seen)}
+                          </Typography>
+                        )}
                       </TableCell>
                       <TableCell>
                         <Chip
@@ -212,7 +243,7 @@ const AlertsPage = () => {
             Showing {alerts.length} alert{alerts.length !== 1 ? 's' : ''}
           </Typography>
           <Typography variant="body2" color="text.secondary">
-            Auto-refresh every 30 seconds
+            Live updates
           </Typography>
         </Box>
       )}
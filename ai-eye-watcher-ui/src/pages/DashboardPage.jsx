@@ -6,7 +6,6 @@ import {
   NetworkCheck as NetworkIcon,
 } from '@mui/icons-material';
 import { useState, useEffect } from 'react';
-import axios from 'axios';
 import StatCard from '../components/StatCard';
 
 const DashboardPage = () => {
@@ -18,64 +17,65 @@ const DashboardPage = () => {
   // Backend API URL
   const API_BASE_URL = 'http://localhost:9000';
 
-  // Function to fetch dashboard stats
-  const fetchDashboardStats = async () => {
-    try {
-      setError(null);
-      const response = await axios.get(`${API_BASE_URL}/api/v1/dashboard/stats`);
-      const data = response.data;
-      
-      // Transform backend data to match our UI format
-      const transformedStats = [
-        {
-          title: 'Connected Hosts',
-          value: data.unique_hosts?.toString() || '0',
-          trend: `${data.event_count} events collected`,
-          icon: DevicesIcon,
-          trendColor: 'info.main',
-        },
-        {
-          title: 'Active Alerts',
-          value: data.alert_count?.toString() || '0',
-          trend: `${data.alert_severity_breakdown?.HIGH || 0} high severity`,
-          icon: SecurityIcon,
-          trendColor: data.alert_severity_breakdown?.HIGH > 0 ? 'error.main' : 'success.main',
-        },
-        {
-          title: 'Total Events',
-          value: data.event_count?.toString() || '0',
-          trend: 'Real-time monitoring',
-          icon: NetworkIcon,
-          trendColor: 'success.main',
-        },
-        {
-          title: 'Pending Commands',
-          value: data.pending_command_hosts?.toString() || '0',
-          trend: 'Automated responses',
-          icon: BlockIcon,
-          trendColor: data.pending_command_hosts > 0 ? 'warning.main' : 'success.main',
-        },
-      ];
-      
-      setStatsData(transformedStats);
-      setLoading(false);
-    } catch (err) {
-      console.error('Error fetching dashboard stats:', err);
-      setError('Failed to fetch dashboard data. Make sure the backend server is running.');
-      setLoading(false);
-    }
-  };
+  // Transform backend stats to match our UI format
+  const transformStats = (data) => [
+    {
+      title: 'Connected Hosts',
+      value: data.unique_hosts?.toString() || '0',
+      trend: `${data.event_count} events collected`,
+      icon: DevicesIcon,
+      trendColor: 'info.main',
+    },
+    {
+      title: 'Active Alerts',
+      value: data.alert_count?.toString() || '0',
+      trend: `${data.alert_severity_breakdown?.HIGH || 0} high severity · ${data.alerts_last_hour || 0} in the last hour`,
+      icon: SecurityIcon,
+      trendColor: data.alert_severity_breakdown?.HIGH > 0 ? 'error.main' : 'success.main',
+    },
+    {
+      title: 'Total Events',
+      value: data.event_count?.toString() || '0',
+      trend: `${data.events_per_minute ?? 0} events/min (5 min avg)`,
+      icon: NetworkIcon,
+      trendColor: 'success.main',
+    },
+    {
+      title: 'Pending Commands',
+      value: data.pending_command_hosts?.toString() || '0',
+      trend: 'Automated responses',
+      icon: BlockIcon,
+      trendColor: data.pending_command_hosts > 0 ? 'warning.main' : 'success.main',
+    },
+  ];
 
-  // Effect for initial load and periodic refresh
+  // Effect for the live stats stream
   useEffect(() => {
-    // Initial fetch
-    fetchDashboardStats();
+    // The server pushes a full snapshot on connect, then only the fields that change.
+    // EventSource reconnects on its own and resumes from the last event it saw.
+    let stats = {};
+    const source = new EventSource(`${API_BASE_URL}/api/v1/stream?topics=stats`);
 
-    // Set up periodic refresh every 15 seconds
-    const interval = setInterval(fetchDashboardStats, 15000);
+    const applyStats = (data) => {
+      stats = { ...stats, ...data };
+      setStatsData(transformStats(stats));
+      setError(null);
+      setLoading(false);
+    };
+
+    source.addEventListener('snapshot', (event) => {
+      stats = {};
+      applyStats(JSON.parse(event.data).stats);
+    });
+    source.addEventListener('stats', (event) => applyStats(JSON.parse(event.data)));
+    source.onerror = () => {
+      console.error('Dashboard stats stream disconnected, retrying...');
+      setError('Lost connection to the live stats stream. Make sure the backend server is running.');
+      setLoading(false);
+    };
 
-    // Cleanup interval on component unmount
-    return () => clearInterval(interval);
+    // Close the stream on component unmount
+    return () => source.close();
   }, []);
 
   // Loading skeleton component